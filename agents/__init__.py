@@ -7,9 +7,28 @@ from .agent_universel import (
     AgentProduitUniversel,
     analyser_produits
 )
+from .cache import CacheResultats
+from .deduplication import Deduplicateur
+from .instrumentation import Instrumentation
+from .partitions import AgentPartitionne
+from .requete import Requete
+from .scoring import ProfilScoring
+from .statistiques import StatistiquesCourantes
+from .stockage import StockageListe, StockageColonnes
+from .stockage_sqlite import StockageSQLite
 
 __all__ = [
     'Produit',
     'AgentProduitUniversel',
-    'analyser_produits'
+    'analyser_produits',
+    'AgentPartitionne',
+    'CacheResultats',
+    'Deduplicateur',
+    'Instrumentation',
+    'ProfilScoring',
+    'Requete',
+    'StatistiquesCourantes',
+    'StockageListe',
+    'StockageColonnes',
+    'StockageSQLite'
 ]
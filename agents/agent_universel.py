@@ -11,135 +11,67 @@ Auteur : Claude
 Date : 2026-02-08
 """
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Callable
+from contextlib import nullcontext
+import hashlib
 import json
+import pickle
 from datetime import datetime
 
+from .produit import Produit
+from .cache import CacheResultats
+from .deduplication import Deduplicateur, ajouter_offre
+from .flux import (
+    MAX_ERREURS_AFFICHEES, RapportChargement, charger_fichier, compression_du_fichier,
+    ecrire_export, ErreurFormat
+)
+from .index import (
+    IndexTrie, IndexMarques, IndexCaracteristiques, CRITERES_TRI, top_ids
+)
+from .instantane import ecrire_instantane, ouvrir_instantane
+from .instrumentation import Instrumentation
+from .offres import IndexOffres, OffresProduit, regrouper_offres, top_offres
+from .parallele import ajouter_en_parallele, produits_depuis_colonnes, signaler_rejets
+from .requete import Requete
+from .scoring import PROFIL_DEFAUT, ProfilScoring, profil_scoring, scorer_produits
+from .statistiques import RepartitionPrix, StatistiquesCourantes
+from .stockage import VueProduits, creer_stockage
 
-# ============================================================================
-# CLASSES DE DONNÉES
-# ============================================================================
 
-@dataclass
-class Produit:
-    """
-    Classe universelle pour représenter N'IMPORTE QUEL produit
-    
-    Attributs obligatoires :
-        nom: Nom du produit
-        marque: Marque
-        prix: Prix en euros
-    
-    Attributs optionnels (adaptez selon vos besoins) :
-        note: Note utilisateurs (sur 5)
-        nb_avis: Nombre d'avis
-        caracteristiques: Liste de caractéristiques
-        url: Lien vers le produit
-        source: D'où vient le produit
-        image_url: URL de l'image
-        stock: Disponibilité
-        ... ajoutez ce que vous voulez !
-    """
-    # Obligatoires
-    nom: str
-    marque: str
-    prix: float
-    
-    # Optionnels (avec valeurs par défaut)
-    note: float = 4.0
-    nb_avis: int = 0
-    caracteristiques: List[str] = field(default_factory=list)
-    url: str = ""
-    source: str = ""
-    image_url: str = ""
-    stock: bool = True
-    
-    # Métadonnées (automatiques)
-    date_ajout: str = field(default_factory=lambda: datetime.now().isoformat())
-    
-    # Attributs personnalisés (dict flexible)
-    extra: Dict[str, Any] = field(default_factory=dict)
-    
-    def __post_init__(self):
-        """Calculer le score automatiquement à la création"""
-        self._score = self._calculer_score()
-    
-    @property
-    def score_qualite_prix(self) -> float:
-        """Score qualité/prix calculé automatiquement"""
-        return self._score
-    
-    def _calculer_score(self) -> float:
-        """
-        Calcule un score de 0 à 100
-        
-        Système de scoring adaptatif :
-        - 40% : Note utilisateurs
-        - 30% : Prix (bonus si raisonnable)
-        - 20% : Nombre d'avis (popularité)
-        - 10% : Bonus caractéristiques
-        
-        PERSONNALISABLE : Modifiez les poids selon vos besoins !
-        """
-        score = 0
-        
-        # 1. Score basé sur note (40 points max)
-        if self.note > 0:
-            score += (self.note / 5) * 40
-        
-        # 2. Score basé sur prix (30 points max)
-        # Plus le prix est bas (par rapport à 500€), meilleur c'est
-        # Adaptez le seuil selon votre type de produit !
-        prix_reference = self.extra.get('prix_reference', 500)
-        if self.prix > 0:
-            ratio_prix = max(0, 1 - (self.prix / prix_reference))
-            score += ratio_prix * 30
-        
-        # 3. Score basé sur nombre d'avis (20 points max)
-        if self.nb_avis >= 200:
-            score += 20
-        elif self.nb_avis >= 100:
-            score += 15
-        elif self.nb_avis >= 50:
-            score += 10
-        elif self.nb_avis >= 10:
-            score += 5
-        
-        # 4. Bonus caractéristiques (10 points max)
-        nb_caracteristiques = len(self.caracteristiques)
-        score += min(nb_caracteristiques * 2, 10)
-        
-        return min(score, 100)  # Plafonner à 100
-    
-    @property
-    def categorie_prix(self) -> str:
-        """Catégoriser le prix (adaptable)"""
-        if self.prix < 50:
-            return "💰 Entrée de gamme"
-        elif self.prix < 150:
-            return "💵 Milieu de gamme"
-        elif self.prix < 300:
-            return "💎 Haut de gamme"
-        else:
-            return "👑 Premium"
-    
-    def to_dict(self) -> Dict:
-        """Convertir en dictionnaire"""
-        return {
-            'nom': self.nom,
-            'marque': self.marque,
-            'prix': self.prix,
-            'note': self.note,
-            'nb_avis': self.nb_avis,
-            'score_qualite_prix': self.score_qualite_prix,
-            'categorie_prix': self.categorie_prix,
-            'caracteristiques': self.caracteristiques,
-            'url': self.url,
-            'source': self.source,
-            'stock': self.stock,
-            'extra': self.extra
-        }
+# Nombre de produits scorés ensemble lors d'un ajout en masse
+TAILLE_LOT = 10000
+
+# Proportion de produits ajoutés ou de prix modifiés entre deux contrôles
+# des prix de référence tirés du catalogue, lors des ajouts et mises à
+# jour produit par produit
+CROISSANCE_CONTROLE_PRIX = 0.01
+
+# Champs modifiables en place (cf. mettre_a_jour)
+CHAMPS_MODIFIABLES = ('prix', 'note', 'nb_avis', 'stock')
+
+# Méthodes mesurées sur un agent instrumenté, avec le nombre d'éléments
+# traités déduit de leur résultat (None : aucun)
+METHODES_INSTRUMENTEES: Dict[str, Optional[Callable[[Any], int]]] = {
+    'ajouter_produit': lambda produit: 1,
+    'ajouter_produits_depuis_dict': int,
+    'ajouter_produits_depuis_json': int,
+    'mettre_a_jour': lambda produit: 1,
+    'filtrer_par_budget': len,
+    'filtrer_par_prix': len,
+    'filtrer_par_marque': len,
+    'filtrer_par_note': len,
+    'filtrer_par_caracteristique': len,
+    'filtrer_personnalise': len,
+    'obtenir_top': len,
+    'obtenir_offres': len,
+    'obtenir_statistiques': lambda stats: stats.get('nb_produits', 0),
+    'obtenir_recommandations': lambda resultat: resultat['nb_produits_trouves'],
+    'generer_rapport_texte': None,
+    'exporter_json': None,
+}
+
+# Chronomètre sans effet (agent non instrumenté)
+_SANS_MESURE = nullcontext()
 
 
 # ============================================================================
@@ -154,18 +86,250 @@ class AgentProduitUniversel:
         agent = AgentProduitUniversel(type_produit="smartphone")
         agent.ajouter_produit(nom="iPhone 15", marque="Apple", prix=999)
         recommandations = agent.obtenir_recommandations(budget=1000)
+    
+    Gros catalogues :
+        agent = AgentProduitUniversel(type_produit="smartphone", stockage="colonnes")
+    
+    Catalogues sur disque (SQLite) :
+        agent = AgentProduitUniversel("smartphone",
+                                      stockage=StockageSQLite("catalogue.sqlite"))
     """
     
-    def __init__(self, type_produit: str = "produit"):
+    def __init__(self, type_produit: str = "produit", stockage='liste',
+                 deduplication=False, cache_resultats=False, instrumentation=False,
+                 profil=None):
         """
         Initialiser l'agent
         
         Args:
             type_produit: Type de produit (pour logs et rapports)
+            stockage: 'liste' (par défaut), 'colonnes' (stockage colonnaire
+                      compact, les `Produit` sont créés à la demande),
+                      'sqlite' (base en mémoire) ou un stockage construit
+                      (ex. StockageSQLite('catalogue.sqlite'))
+            deduplication: Fusionner les fiches d'un même produit venant
+                           de plusieurs sites (True, ou un Deduplicateur
+                           configuré, cf. agents/deduplication.py)
+            cache_resultats: Conserver les recommandations déjà calculées
+                             jusqu'à la prochaine modification du catalogue
+                             (True, ou un CacheResultats configuré, cf.
+                             agents/cache.py)
+            instrumentation: Compter appels, éléments traités et durées
+                             de chaque opération (True, ou une
+                             Instrumentation, cf. agents/instrumentation.py)
+            profil: Profil de scoring (ProfilScoring, dict déclaratif ou
+                    type de produit enregistré, ex. 'smartphone') ;
+                    par défaut PROFIL_DEFAUT (cf. agents/scoring.py)
         """
         self.type_produit = type_produit
-        self.produits: List[Produit] = []
+        self._stockage = creer_stockage(stockage)
+        # Stockage SQL : filtres, tris et agrégats sont délégués à la base
+        self._sql = getattr(self._stockage, 'sql', False)
+        self._profil = PROFIL_DEFAUT if profil is None else profil_scoring(profil)
+        self._stockage.profil = self._profil
+        self._index_tries: Dict[str, IndexTrie] = {}
+        self._index_marques = IndexMarques()
+        self._index_caracteristiques = IndexCaracteristiques()
+        self._statistiques = StatistiquesCourantes()
+        self._index_offres = IndexOffres()
+        self._repartition_prix = RepartitionPrix()
+        if deduplication is True:
+            deduplication = Deduplicateur()
+        elif deduplication is False:
+            deduplication = None
+        self.deduplicateur: Optional[Deduplicateur] = deduplication
+        if cache_resultats is True:
+            cache_resultats = CacheResultats()
+        elif cache_resultats is False:
+            cache_resultats = None
+        self.cache_resultats: Optional[CacheResultats] = cache_resultats
+        # Incrémentée à chaque modification du catalogue par l'agent
+        self.version = 0
         self.historique_recherches: List[Dict] = []
+        self._instrumentation: Optional[Instrumentation] = None
+        self.instrumentation = instrumentation
+        if self._sql and len(self._stockage):
+            self._rescorer_base()
+    
+    def _rescorer_base(self):
+        """
+        Rescorer une base SQLite rouverte si ses produits ont été scorés
+        avec un autre profil que celui de l'agent : un même catalogue ne
+        mélange pas deux formules
+        """
+        profil = self._profil
+        if profil.centile_prix is not None:
+            profil = self._ajuster_profil(profil, seuil=0) or profil
+        if profil != self._stockage.profil_base:
+            self._rescorer(profil)
+        else:
+            self._profil = self._stockage.profil = profil
+    
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """Instrumentation de l'agent (None si désactivée)"""
+        return self._instrumentation
+    
+    @instrumentation.setter
+    def instrumentation(self, instrumentation):
+        """
+        Activer (True ou une Instrumentation) ou désactiver (None, False)
+        
+        Les méthodes de METHODES_INSTRUMENTEES sont enveloppées sur
+        l'instance seulement : désactivée, l'instrumentation ne coûte rien.
+        """
+        if instrumentation is True:
+            instrumentation = Instrumentation()
+        elif instrumentation is False:
+            instrumentation = None
+        for nom in METHODES_INSTRUMENTEES:
+            self.__dict__.pop(nom, None)
+        self._instrumentation = instrumentation
+        if instrumentation is not None:
+            for nom, elements in METHODES_INSTRUMENTEES.items():
+                setattr(self, nom, instrumentation.envelopper(nom, getattr(self, nom), elements))
+    
+    def metriques(self, format: str = 'dict'):
+        """
+        Compteurs de l'instrumentation, par opération
+        
+        Args:
+            format: 'dict' ({opération: {appels, elements, duree,
+                    duree_max, duree_moyenne}}, durées en secondes) ou
+                    'prometheus' (format texte d'exposition)
+        
+        Exemple:
+            agent = AgentProduitUniversel("smartphone", instrumentation=True)
+            ...
+            print(agent.metriques()['obtenir_top'])
+        """
+        if self._instrumentation is None:
+            raise ValueError("Instrumentation désactivée (cf. paramètre instrumentation)")
+        if format == 'dict':
+            return self._instrumentation.to_dict()
+        if format == 'prometheus':
+            return self._instrumentation.prometheus(
+                etiquettes={'type_produit': self.type_produit})
+        raise ValueError(f"Format de métriques inconnu : {format!r}")
+    
+    def _mesurer(self, phase: str, elements: int = 0):
+        """Chronomètre d'une phase interne (sans effet si non instrumenté)"""
+        if self._instrumentation is None:
+            return _SANS_MESURE
+        return self._instrumentation.mesurer(phase, elements)
+    
+    def _mesuree(self, phase: str, fonction: Callable) -> Callable:
+        """Fonction comptée à chaque appel (un élément) si instrumenté"""
+        if self._instrumentation is None:
+            return fonction
+        return self._instrumentation.envelopper(phase, fonction, lambda resultat: 1)
+    
+    @property
+    def profil(self) -> ProfilScoring:
+        """Profil de scoring des produits (cf. appliquer_profil pour en changer)"""
+        return self._profil
+    
+    def appliquer_profil(self, profil) -> int:
+        """
+        Changer de profil de scoring et recalculer tous les scores
+        
+        Args:
+            profil: ProfilScoring, dict déclaratif ou type de produit
+                    enregistré (cf. agents/scoring.py)
+        
+        Returns:
+            Nombre de produits rescorés
+        
+        Les scores sont recalculés en un passage sur les colonnes du
+        stockage, sans reconstruire les produits ; l'index trié par
+        score et les statistiques sont reconstruits à la requête
+        suivante.
+        
+        Avec `centile_prix`, les prix de référence sont tirés du
+        catalogue dès maintenant, puis recalculés après les ajouts
+        quand ils dérivent de plus de `seuil_recalcul` (tous les scores
+        sont alors recalculés en un passage).
+        
+        Exemple:
+            agent.appliquer_profil(ProfilScoring(poids_note=50, poids_prix=20))
+            agent.appliquer_profil({'prix_reference': 1000})
+            agent.appliquer_profil({'centile_prix': 0.9, 'par_marque': True})
+        """
+        profil = profil_scoring(profil)
+        if profil.centile_prix is not None:
+            profil = self._ajuster_profil(profil, seuil=0) or profil
+        return self._rescorer(profil)
+    
+    def _rescorer(self, profil: ProfilScoring) -> int:
+        """Recalculer tous les scores avec un profil (cf. appliquer_profil)"""
+        with self._mesurer('scoring', len(self._stockage)):
+            erreurs = self._stockage.scorer(profil)
+        if erreurs:
+            # Un bilan et les premiers produits, pas une ligne par produit
+            nom = self._stockage.acces('nom')
+            premieres = sorted(erreurs, key=lambda erreur: erreur[0])[:MAX_ERREURS_AFFICHEES]
+            RapportChargement(nb_erreurs=len(erreurs),
+                              erreurs=[(i, nom(i), str(e)) for i, e in premieres]
+                              ).afficher_erreurs(f"{len(erreurs)} produit(s) non rescoré(s)")
+        self._profil = profil
+        
+        # Index et agrégats calculés sur les scores
+        self._index_tries.pop('score', None)
+        self._statistiques.vider()
+        self.version += 1
+        return len(self._stockage) - len(erreurs)
+    
+    def _ajuster_profil(self, profil: ProfilScoring,
+                        seuil: Optional[float] = None) -> Optional[ProfilScoring]:
+        """Profil aux prix de référence du catalogue actuel (cf. ProfilScoring.ajuster)"""
+        repartition = self._synchroniser(self._repartition_prix)
+        repartition.nb_modifies = 0
+        reference, marques = repartition.references(profil.centile_prix,
+                                                    profil.min_produits_centile)
+        return profil.ajuster(reference, marques, seuil)
+    
+    def _ajuster_references(self, croissance_min: float = 0.0):
+        """
+        Recalculer tous les scores, en un passage, si les prix de
+        référence tirés du catalogue (ProfilScoring.centile_prix) ont
+        dérivé de plus de `seuil_recalcul`
+        
+        Args:
+            croissance_min: Ne rien contrôler tant que la proportion de
+                            produits ajoutés ou de prix modifiés depuis
+                            le contrôle précédent ne l'a pas dépassée
+        """
+        if self._profil.centile_prix is None:
+            return
+        repartition = self._repartition_prix
+        nouveautes = len(self._stockage) - repartition.nb_indexes + repartition.nb_modifies
+        if nouveautes <= repartition.nb_indexes * croissance_min:
+            return
+        profil = self._ajuster_profil(self._profil)
+        if profil is not None:
+            self._rescorer(profil)
+    
+    @property
+    def produits(self):
+        """
+        Produits de l'agent, en lecture seule (séquence paresseuse en
+        mode colonnes)
+        
+        Les champs d'un produit se modifient par `mettre_a_jour()` : les
+        index de l'agent ne voient pas une réaffectation directe
+        (`agent.produits[i].prix = ...`).
+        """
+        produits = self._stockage.produits
+        return VueProduits(produits) if isinstance(produits, list) else produits
+    
+    @produits.setter
+    def produits(self, produits):
+        self.vider()
+        produits = list(produits)
+        scorer_produits(produits, profil=self._profil)  # Données invalides : erreur à la lecture
+        self._stockage.ajouter_lot(produits)
+        self.version += 1
+        self._ajuster_references()
     
     # ========================================================================
     # MÉTHODES D'AJOUT DE PRODUITS
@@ -199,18 +363,75 @@ class AgentProduitUniversel:
             )
         """
         produit = Produit(nom=nom, marque=marque, prix=prix, **kwargs)
-        self.produits.append(produit)
+        produit._profil = self._profil
+        produit.score_qualite_prix  # Valider les données dès l'ajout
+        if self.deduplicateur is not None:
+            self._stockage.ajouter_lot(self._fusionner_doublons([produit]))
+        else:
+            self._stockage.ajouter(produit)
+        self.version += 1
+        self._ajuster_references(CROISSANCE_CONTROLE_PRIX)
         return produit
     
-    def ajouter_produits_depuis_dict(self, produits_data: List[Dict]) -> int:
+    def mettre_a_jour(self, id: int, **champs) -> Produit:
+        """
+        Modifier le prix, la note, le nombre d'avis ou la disponibilité
+        d'un produit (ex. relevé d'un suivi de prix)
+        
+        Args:
+            id: Identifiant du produit (sa position dans `agent.produits`)
+            **champs: Nouvelles valeurs (cf. CHAMPS_MODIFIABLES)
+        
+        Returns:
+            Le produit à jour
+        
+        Seul ce produit est rescoré, avec le profil de l'agent. Les
+        index triés, les statistiques courantes et la répartition des
+        prix sont corrigés sur place (par bisection pour les index) ;
+        les résultats en cache sont périmés (nouvelle version du
+        catalogue). Les offres rangées par la déduplication
+        (`extra['offres']`) ne sont pas modifiées.
+        
+        Exemple:
+            agent.mettre_a_jour(42, prix=879.0, stock=True)
+        """
+        inconnus = sorted(set(champs) - set(CHAMPS_MODIFIABLES))
+        if inconnus:
+            raise ValueError(f"Champs non modifiables : {', '.join(inconnus)} "
+                             f"(modifiables : {', '.join(CHAMPS_MODIFIABLES)})")
+        if not 0 <= id < len(self._stockage):
+            raise IndexError(f"Produit {id} inexistant")
+        
+        with self._mesurer('scoring', 1):
+            avant, apres = self._stockage.modifier(id, champs)
+        self.version += 1
+        
+        for index in self._index_tries.values():
+            index.modifier(id, avant[index.champ], apres[index.champ])
+        self._statistiques.modifier(id, avant, apres)
+        if avant['prix'] != apres['prix']:
+            self._repartition_prix.modifier(id, self._stockage.acces('marque')(id),
+                                            avant['prix'], apres['prix'])
+            self._ajuster_references(CROISSANCE_CONTROLE_PRIX)
+        return self._stockage.produit(id)
+    
+    def ajouter_produits_depuis_dict(self,
+                                     produits_data: Iterable[Dict],
+                                     taille_lot: Optional[int] = None,
+                                     nb_processus: Optional[int] = None) -> int:
         """
         Ajouter plusieurs produits depuis une liste de dictionnaires
         
         Args:
-            produits_data: Liste de dicts avec infos produits
+            produits_data: Liste (ou itérable) de dicts avec infos produits
+            taille_lot: Nombre de produits scorés ensemble (défaut TAILLE_LOT)
+            nb_processus: Construire et scorer les produits sur plusieurs
+                          processus (expérimental, gain non démontré :
+                          cf. agents/parallele.py)
         
         Returns:
-            Nombre de produits ajoutés
+            Nombre de produits ajoutés (avec la déduplication : ajoutés
+            ou fusionnés avec un produit existant)
         
         Exemple:
             data = [
@@ -218,41 +439,182 @@ class AgentProduitUniversel:
                 {'nom': 'Produit 2', 'marque': 'LG', 'prix': 399}
             ]
             agent.ajouter_produits_depuis_dict(data)
+        
+        Les scores sont calculés en lot (cf. agents/scoring.py). Les
+        produits rejetés sont affichés en fin d'ajout : leur nombre, puis
+        les premiers dans l'ordre des données.
+        """
+        rapport = RapportChargement()
+        count = self._ajouter_flux(enumerate(produits_data, 1), rapport.signaler,
+                                   taille_lot=taille_lot, nb_processus=nb_processus)
+        rapport.afficher_erreurs(f"{rapport.nb_erreurs} produit(s) ignoré(s)")
+        return count
+    
+    def _ajouter_flux(self,
+                      enregistrements: Iterable[Tuple[int, Dict]],
+                      signaler: Callable[[int, str, Exception], None],
+                      apres_lot: Optional[Callable[[int], None]] = None,
+                      taille_lot: Optional[int] = None,
+                      nb_processus: Optional[int] = None) -> int:
         """
+        Ajouter des produits depuis un flux de (numéro, dict), par lots
+        
+        Args:
+            enregistrements: Flux de (numéro d'enregistrement, dict produit) ;
+                             une exception à la place du dict rejette
+                             l'enregistrement (illisible)
+            signaler: Fonction (numéro, nom, message) appelée pour chaque
+                      enregistrement rejeté, dans l'ordre des numéros
+            apres_lot: Fonction appelée avec le nombre de produits ajoutés
+                       après chaque lot
+            taille_lot: Nombre de produits scorés ensemble (défaut TAILLE_LOT)
+            nb_processus: Au-delà de 1, les lots sont préparés en parallèle
+                          (expérimental, cf. agents/parallele.py)
+        
+        Returns:
+            Nombre de produits ajoutés
+        
+        Les prix de référence tirés du catalogue ne sont contrôlés
+        qu'une fois le flux entièrement ajouté : tous ses lots sont
+        scorés avec le même profil.
+        """
+        taille_lot = taille_lot or TAILLE_LOT
+        if nb_processus is not None and nb_processus > 1:
+            count = ajouter_en_parallele(self, enregistrements, signaler, apres_lot,
+                                         taille_lot, nb_processus)
+            self._ajuster_references()
+            return count
+        
         count = 0
-        for data in produits_data:
+        lot, numeros, rejets = [], [], []
+        for numero, data in enregistrements:
             try:
-                self.ajouter_produit(**data)
-                count += 1
+                if isinstance(data, Exception):
+                    raise data
+                lot.append(Produit(**data))
+                numeros.append(numero)
             except Exception as e:
-                print(f"Erreur ajout produit {data.get('nom', '?')}: {e}")
+                nom = data.get('nom', '?') if isinstance(data, dict) else '?'
+                rejets.append((numero, nom, str(e)))
+            
+            if len(lot) >= taille_lot:
+                ajoutes = self._ajouter_lot(lot, numeros, rejets, signaler)
+                count += ajoutes
+                if apres_lot is not None:
+                    apres_lot(ajoutes)
+                lot, numeros, rejets = [], [], []
         
+        if lot:
+            ajoutes = self._ajouter_lot(lot, numeros, rejets, signaler)
+            count += ajoutes
+            if apres_lot is not None:
+                apres_lot(ajoutes)
+        else:
+            signaler_rejets(rejets, signaler)
+        
+        self._ajuster_references()
         return count
     
-    def ajouter_produits_depuis_json(self, fichier_json: str) -> int:
+    def _ajouter_lot(self, lot: List[Produit], numeros: List[int],
+                     rejets: List[Tuple[int, str, str]], signaler) -> int:
+        """
+        Scorer un lot de produits en un passage, puis les ajouter ; les
+        rejets du lot (construction, puis scoring) sont signalés ensemble
+        """
+        with self._mesurer('scoring', len(lot)):
+            erreurs = dict(scorer_produits(lot, profil=self._profil))
+        signaler_rejets(rejets + [(numeros[k], lot[k].nom, str(e)) for k, e in erreurs.items()],
+                        signaler)
+        
+        valides = [p for k, p in enumerate(lot) if k not in erreurs]
+        if self.deduplicateur is not None:
+            with self._mesurer('deduplication', len(valides)):
+                valides = self._fusionner_doublons(valides)
+        with self._mesurer('stockage', len(valides)):
+            self._stockage.ajouter_lot(valides)
+        self.version += 1
+        return len(lot) - len(erreurs)
+    
+    def _integrer_colonnes(self, colonnes) -> int:
+        """Ajouter un lot préparé en colonnes (cf. agents/parallele.py)"""
+        self.version += 1
+        if self.deduplicateur is None:
+            with self._mesurer('stockage', len(colonnes[0])):
+                return self._stockage.etendre(colonnes)
+        produits = produits_depuis_colonnes(colonnes, self._profil)
+        with self._mesurer('deduplication', len(produits)):
+            nouveaux = self._fusionner_doublons(produits)
+        with self._mesurer('stockage', len(nouveaux)):
+            self._stockage.ajouter_lot(nouveaux)
+        return len(produits)
+    
+    def _fusionner_doublons(self, produits: List[Produit]) -> List[Produit]:
+        """
+        Écarter les doublons d'un lot (cf. agents/deduplication.py)
+        
+        L'offre de chaque doublon est rangée dans le produit retenu, qu'il
+        soit déjà au catalogue ou plus tôt dans le lot.
+        
+        Returns:
+            Les produits nouveaux, à ajouter
+        """
+        debut = len(self._stockage)
+        nouveaux: List[Produit] = []
+        modifies: Dict[int, Produit] = {}
+        for produit in produits:
+            i = self.deduplicateur.identifier(produit, debut + len(nouveaux))
+            if i == debut + len(nouveaux):
+                nouveaux.append(produit)
+            elif i >= debut:
+                ajouter_offre(nouveaux[i - debut], produit)
+            else:
+                canonique = modifies.get(i)
+                if canonique is None:
+                    canonique = modifies[i] = self._stockage.produit(i)
+                ajouter_offre(canonique, produit)
+        
+        for i, canonique in modifies.items():
+            self._stockage.modifier_extra(i, canonique.extra)
+        return nouveaux
+    
+    def ajouter_produits_depuis_json(self,
+                                     fichier_json: str,
+                                     taille_lot: Optional[int] = None,
+                                     progression: Optional[Callable] = None,
+                                     nb_processus: Optional[int] = None) -> int:
         """
         Charger produits depuis fichier JSON
         
+        Le fichier est lu en flux : JSON Lines (.jsonl), tableau JSON ou
+        objet {"produits": [...]}, sans être chargé entier en mémoire.
+        Pour le détail des erreurs, utilisez agents.flux.charger_fichier.
+        
         Args:
             fichier_json: Chemin vers fichier JSON
+            taille_lot: Nombre de produits ajoutés ensemble (défaut TAILLE_LOT)
+            progression: Fonction appelée avec le RapportChargement après
+                         chaque lot (optionnel)
+            nb_processus: Nombre de processus (cf. agents/parallele.py)
         
         Returns:
             Nombre de produits chargés
         """
         try:
-            with open(fichier_json, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if isinstance(data, list):
-                return self.ajouter_produits_depuis_dict(data)
-            elif isinstance(data, dict) and 'produits' in data:
-                return self.ajouter_produits_depuis_dict(data['produits'])
-            else:
-                print("Format JSON non reconnu")
-                return 0
+            rapport = charger_fichier(self, fichier_json, taille_lot, progression,
+                                      nb_processus=nb_processus)
+        except ErreurFormat as e:
+            print(e)
+            return 0
         except Exception as e:
             print(f"Erreur lecture JSON: {e}")
             return 0
+        
+        if rapport.erreur_fatale:
+            print(f"Erreur lecture JSON: {rapport.erreur_fatale}")
+        rapport.afficher_erreurs(f"{rapport.nb_erreurs} produit(s) ignoré(s) "
+                                 f"sur {rapport.nb_lus} lus")
+        
+        return rapport.nb_ajoutes
     
     # ========================================================================
     # MÉTHODES DE FILTRAGE
@@ -260,24 +622,37 @@ class AgentProduitUniversel:
     
     def filtrer_par_budget(self, budget_max: float) -> List[Produit]:
         """Filtrer produits dans le budget"""
-        return [p for p in self.produits if p.prix <= budget_max]
+        return self.filtrer_par_prix(prix_max=budget_max)
+    
+    def filtrer_par_prix(self,
+                         prix_min: Optional[float] = None,
+                         prix_max: Optional[float] = None) -> List[Produit]:
+        """
+        Filtrer par fourchette de prix (bornes incluses, None = pas de borne)
+        
+        Répond par bisection dans l'index des prix : le coût dépend du
+        nombre de produits retournés, pas de la taille du catalogue.
+        Les produits sont retournés dans leur ordre d'ajout.
+        
+        Exemple:
+            produits = agent.filtrer_par_prix(100, 500)
+        """
+        return self._produits_ids(self._ids_par_prix(prix_min, prix_max))
     
     def filtrer_par_marque(self, marques: List[str]) -> List[Produit]:
         """Filtrer par marques"""
-        marques_lower = [m.lower() for m in marques]
-        return [p for p in self.produits if p.marque.lower() in marques_lower]
+        return self._produits_ids(self._ids_par_marque(marques))
     
     def filtrer_par_note(self, note_min: float = 4.0) -> List[Produit]:
         """Filtrer par note minimale"""
-        return [p for p in self.produits if p.note >= note_min]
+        return self._produits_ids(self._ids_par_note(note_min))
     
     def filtrer_par_caracteristique(self, caracteristique: str) -> List[Produit]:
-        """Filtrer par caractéristique"""
-        carac_lower = caracteristique.lower()
-        return [
-            p for p in self.produits 
-            if any(carac_lower in c.lower() for c in p.caracteristiques)
-        ]
+        """Filtrer par caractéristique (sous-chaîne, insensible à la casse)"""
+        if self._sql:
+            return self.requete().caracteristique(caracteristique).produits()
+        index = self._synchroniser(self._index_caracteristiques)
+        return self._produits_ids(index.rechercher(caracteristique))
     
     def filtrer_personnalise(self, fonction_filtre) -> List[Produit]:
         """
@@ -291,6 +666,110 @@ class AgentProduitUniversel:
         """
         return [p for p in self.produits if fonction_filtre(p)]
     
+    # ------------------------------------------------------------------------
+    # Filtres sur identifiants (travaillent directement sur les colonnes)
+    # ------------------------------------------------------------------------
+    
+    def _produits_ids(self, ids) -> List[Produit]:
+        """Matérialiser les produits correspondant à des identifiants"""
+        if self._sql:
+            return self._stockage.produits_ids(ids)
+        produit = self._stockage.produit
+        return [produit(i) for i in ids]
+    
+    def _ids_par_prix(self,
+                      prix_min: Optional[float] = None,
+                      prix_max: Optional[float] = None) -> List[int]:
+        """Identifiants des produits dans la fourchette de prix (index des prix)"""
+        if self._sql:
+            return self.requete().prix(prix_min, prix_max).ids()
+        return self._index_trie('prix').plage(prix_min, prix_max)
+    
+    def _ids_par_budget(self, budget_max: float, ids=None) -> List[int]:
+        """Identifiants des produits dans le budget"""
+        if ids is None:
+            return self._ids_par_prix(prix_max=budget_max)
+        prix = self._stockage.acces('prix')
+        return [i for i in ids if prix(i) <= budget_max]
+    
+    def _ids_par_marque(self, marques: List[str], ids=None) -> List[int]:
+        """Identifiants des produits des marques données (insensible à la casse)"""
+        if self._sql and ids is None:
+            return self.requete().marques(marques).ids()
+        ids_marques = self._synchroniser(self._index_marques).rechercher(marques)
+        if ids is None:
+            return ids_marques
+        ids_marques = set(ids_marques)
+        return [i for i in ids if i in ids_marques]
+    
+    def _ids_par_note(self, note_min: float, ids=None) -> List[int]:
+        """Identifiants des produits ayant au moins la note donnée"""
+        if self._sql and ids is None:
+            return self.requete().note_min(note_min).ids()
+        if ids is None:
+            notes = self._stockage.colonne('note')
+            return [i for i, n in enumerate(notes) if n >= note_min]
+        note = self._stockage.acces('note')
+        return [i for i in ids if note(i) >= note_min]
+    
+    def _compter_budget(self, budget_max: float, selection: Optional[Requete] = None) -> int:
+        """Nombre de produits dans le budget (sans les matérialiser)"""
+        if selection is None and self._sql:
+            selection = self.requete()
+        if selection is not None:
+            return len(selection.prix(max=budget_max))
+        debut, fin = self._index_trie('prix').bornes(valeur_max=budget_max)
+        return fin - debut
+    
+    def _index_trie(self, critere: str) -> IndexTrie:
+        """Index trié (à jour) pour un critère de CRITERES_TRI"""
+        index = self._index_tries.get(critere)
+        if index is None:
+            champ, decroissant = CRITERES_TRI[critere]
+            index = self._index_tries[critere] = IndexTrie(champ, decroissant)
+        return self._synchroniser(index)
+    
+    def _synchroniser(self, index):
+        """Mettre un index à jour avec les derniers produits ajoutés"""
+        if self._instrumentation is None or index.nb_indexes == len(self._stockage):
+            index.synchroniser(self._stockage)
+            return index
+        phase = 'index:' + getattr(index, 'champ', type(index).__name__)
+        with self._mesurer(phase, abs(len(self._stockage) - index.nb_indexes)):
+            index.synchroniser(self._stockage)
+        return index
+    
+    def _version_catalogue(self) -> Tuple[int, int]:
+        """
+        Version du catalogue pour les résultats conservés : le compteur
+        de modifications, et le nombre de produits
+        """
+        return self.version, len(self._stockage)
+    
+    def _tous_les_index(self) -> List:
+        """Tous les index de l'agent"""
+        return [*self._index_tries.values(), self._index_marques,
+                self._index_caracteristiques, self._statistiques, self._index_offres,
+                self._repartition_prix]
+    
+    # ========================================================================
+    # REQUÊTES COMPOSABLES
+    # ========================================================================
+    
+    def requete(self) -> Requete:
+        """
+        Nouvelle requête paresseuse sur les produits de l'agent
+        
+        Exemple:
+            selection = (agent.requete()
+                         .prix(max=500)
+                         .marques(['Samsung', 'Apple'])
+                         .note_min(4.0)
+                         .top(5, 'score'))
+            print(agent.generer_rapport_texte(selection=selection))
+        """
+        return Requete(self)
+    
     # ========================================================================
     # MÉTHODES D'ANALYSE
     # ========================================================================
@@ -298,7 +777,9 @@ class AgentProduitUniversel:
     def obtenir_top(self, 
                     n: int = 3, 
                     budget_max: Optional[float] = None,
-                    critere: str = 'score') -> List[Produit]:
+                    critere: str = 'score',
+                    selection: Optional[Requete] = None,
+                    par_offre: bool = False) -> List[Produit]:
         """
         Obtenir le top N des produits
         
@@ -306,46 +787,159 @@ class AgentProduitUniversel:
             n: Nombre de produits à retourner
             budget_max: Budget maximum (optionnel)
             critere: 'score', 'prix', 'note', 'popularite'
+            selection: Requête restreignant les produits considérés (optionnel)
+            par_offre: Classer chaque produit une seule fois, selon sa
+                       meilleure offre disponible parmi tous les sites
+                       (cf. obtenir_offres) ; le produit retourné est la
+                       ligne qui porte cette offre
         
         Returns:
             Liste des N meilleurs produits
+        
+        Le classement s'appuie sur un index trié par critère, construit à
+        la première requête puis tenu à jour : une requête parcourt
+        l'index depuis le meilleur produit et s'arrête dès que n produits
+        dans le budget ont été trouvés. Si le budget est très sélectif,
+        les produits du budget (index des prix) sont départagés par un tas.
+        Sur un stockage SQLite, le top N est une requête SQL (cf. Requete).
         """
-        # Filtrer par budget si spécifié
-        produits = self.produits if budget_max is None else self.filtrer_par_budget(budget_max)
-        
-        # Trier selon critère
-        if critere == 'score':
-            produits_tries = sorted(produits, key=lambda p: p.score_qualite_prix, reverse=True)
-        elif critere == 'prix':
-            produits_tries = sorted(produits, key=lambda p: p.prix)
-        elif critere == 'note':
-            produits_tries = sorted(produits, key=lambda p: p.note, reverse=True)
-        elif critere == 'popularite':
-            produits_tries = sorted(produits, key=lambda p: p.nb_avis, reverse=True)
-        else:
-            produits_tries = produits
+        if par_offre:
+            groupes = top_offres(self.obtenir_offres(selection), n, critere,
+                                 self._stockage, budget_max)
+            return self._produits_ids([g.id for g in groupes])
+        
+        if selection is None and self._sql:
+            selection = self.requete()
+        if selection is not None:
+            return selection.prix(max=budget_max).top(n, critere).produits()
+        
+        if critere not in CRITERES_TRI:
+            ids = range(len(self._stockage))
+            if budget_max is not None:
+                ids = self._ids_par_budget(budget_max)
+            return self._produits_ids(list(ids)[:n])
         
-        return produits_tries[:n]
+        index = self._index_trie(critere)
+        if budget_max is None:
+            return self._produits_ids(index.ids[:max(n, 0)])
+        
+        # Parcourir l'index coûte ~ n * N / m (m produits dans le budget),
+        # le tas sur les m produits du budget coûte ~ m : on prend le moins cher
+        index_prix = self._index_trie('prix')
+        debut, fin = index_prix.bornes(valeur_max=budget_max)
+        nb_dans_budget = fin - debut
+        if nb_dans_budget * nb_dans_budget < n * len(index):
+            ids = index_prix.ids[debut:fin]
+            return self._produits_ids(top_ids(ids, n, critere, self._stockage.acces))
+        
+        prix = self._stockage.acces('prix')
+        top = []
+        if n > 0:
+            for i in index.ids:
+                if prix(i) <= budget_max:
+                    top.append(i)
+                    if len(top) >= n:
+                        break
+                elif critere == 'prix':
+                    break  # Index croissant : tous les suivants sont hors budget
+        
+        return self._produits_ids(top)
     
-    def obtenir_statistiques(self) -> Dict[str, Any]:
-        """Obtenir statistiques sur les produits"""
-        if not self.produits:
-            return {}
+    def obtenir_offres(self,
+                       selection: Optional[Requete] = None,
+                       en_stock: bool = True) -> List[OffresProduit]:
+        """
+        Offres regroupées par produit, tous sites confondus
         
-        prix = [p.prix for p in self.produits]
-        notes = [p.note for p in self.produits if p.note > 0]
-        scores = [p.score_qualite_prix for p in self.produits]
+        Args:
+            selection: Requête restreignant les produits considérés (optionnel)
+            en_stock: Ne retenir que les offres disponibles
         
-        return {
-            'nb_produits': len(self.produits),
-            'prix_moyen': sum(prix) / len(prix) if prix else 0,
-            'prix_min': min(prix) if prix else 0,
-            'prix_max': max(prix) if prix else 0,
-            'note_moyenne': sum(notes) / len(notes) if notes else 0,
-            'score_moyen': sum(scores) / len(scores) if scores else 0,
-            'marques': list(set(p.marque for p in self.produits)),
-            'nb_marques': len(set(p.marque for p in self.produits))
-        }
+        Returns:
+            Un OffresProduit par produit (prix_min, prix_median,
+            meilleure_source, offres triées par prix), dans l'ordre du
+            catalogue
+        
+        Les lignes d'un même produit (même marque, même nom normalisé) et
+        les offres des fiches fusionnées (`extra['offres']`) sont
+        regroupées en une passe (cf. agents/offres.py).
+        
+        Exemple:
+            for groupe in agent.obtenir_offres():
+                print(groupe.nom, groupe.prix_min, groupe.meilleure_source)
+        """
+        index = self._synchroniser(self._index_offres)
+        ids = range(len(self._stockage)) if selection is None else selection.ids()
+        return regrouper_offres(self._stockage, index.codes, ids, en_stock)
+    
+    def obtenir_statistiques(self,
+                             selection: Optional[Requete] = None,
+                             quantiles: bool = False) -> Dict[str, Any]:
+        """
+        Obtenir statistiques sur les produits (ou sur une sélection)
+        
+        Args:
+            selection: Requête restreignant les produits considérés (optionnel)
+            quantiles: Ajouter la médiane et le 90e centile des prix
+                       ('prix_median', 'prix_p90', à 1% près)
+        
+        Les agrégats du catalogue complet sont tenus à jour au fil des
+        ajouts (cf. agents/statistiques.py) : seuls les produits ajoutés
+        depuis l'appel précédent sont intégrés. Sur un stockage SQLite, ils
+        sont calculés par la base (quantiles exacts).
+        """
+        if self._sql:
+            return self._statistiques_sql(selection, quantiles)
+        if selection is not None:
+            return self._statistiques_ids(selection.ids(), quantiles)
+        return self.statistiques_courantes().to_dict(quantiles)
+    
+    def statistiques_courantes(self) -> StatistiquesCourantes:
+        """
+        Agrégats (à jour) du catalogue, fusionnables avec ceux d'un autre agent
+        
+        Exemple:
+            stats = StatistiquesCourantes()
+            for agent in agents:
+                stats.fusionner(agent.statistiques_courantes())
+            print(stats.to_dict(quantiles=True))
+        """
+        if self._sql:
+            stats = self._stockage.statistiques()
+            self._stockage.remplir_quantiles(stats)
+            return stats
+        stats = self._synchroniser(self._statistiques)
+        if stats.bornes_perimees:
+            # Prix min/max relus aux extrémités de l'index trié par prix
+            ids = self._index_trie('prix').ids
+            prix = self._stockage.acces('prix')
+            stats.prix_min, stats.prix_max = prix(ids[0]), prix(ids[-1])
+            stats.bornes_perimees = False
+        return stats
+    
+    def _statistiques_sql(self, selection: Optional[Requete], quantiles: bool) -> Dict[str, Any]:
+        """Statistiques calculées par la base (stockage SQLite)"""
+        conditions = [] if selection is None else selection.conditions_sql()
+        if conditions is None:
+            return self._statistiques_ids(selection.ids(), quantiles)
+        stats = self._stockage.statistiques(conditions).to_dict()
+        if quantiles and stats:
+            stats['prix_median'] = self._stockage.quantile_prix(0.5, conditions)
+            stats['prix_p90'] = self._stockage.quantile_prix(0.9, conditions)
+        return stats
+    
+    def _statistiques_ids(self, ids: List[int], quantiles: bool = False) -> Dict[str, Any]:
+        """Statistiques sur un sous-ensemble de produits"""
+        if self._sql:
+            return self._stockage.statistiques_ids(ids).to_dict(quantiles)
+        acces = self._stockage.acces
+        prix_de, note_de, score_de, marque_de = (
+            acces('prix'), acces('note'), acces('score'), acces('marque')
+        )
+        stats = StatistiquesCourantes()
+        for i in ids:
+            stats.ajouter(prix_de(i), note_de(i), score_de(i), marque_de(i))
+        return stats.to_dict(quantiles)
     
     # ========================================================================
     # RECOMMANDATIONS
@@ -355,7 +949,8 @@ class AgentProduitUniversel:
                                 budget_max: Optional[float] = None,
                                 marques_preferees: Optional[List[str]] = None,
                                 note_min: float = 3.5,
-                                top_n: int = 3) -> Dict[str, Any]:
+                                top_n: int = 3,
+                                par_offre: bool = False) -> Dict[str, Any]:
         """
         Obtenir recommandations personnalisées
         
@@ -364,34 +959,116 @@ class AgentProduitUniversel:
             marques_preferees: Liste de marques préférées
             note_min: Note minimale
             top_n: Nombre de recommandations
+            par_offre: Regrouper les offres d'un même produit vendu par
+                       plusieurs sites (cf. obtenir_offres) : chaque produit
+                       recommandé porte son résumé d'offres ('offres') et
+                       'meilleur_prix' est la meilleure offre disponible
         
         Returns:
             Dict avec recommandations et analyses
+        
+        Avec un cache de résultats (paramètre `cache_resultats`), une
+        même requête n'est recalculée qu'après une modification du
+        catalogue ; le résultat servi est partagé, à ne pas modifier.
         """
-        # Filtrer
-        produits = self.produits
+        if self.cache_resultats is None:
+            return self._calculer_recommandations(budget_max, marques_preferees, note_min,
+                                                  top_n, par_offre)
         
+        cle = ('recommandations', budget_max or None,
+               tuple(sorted(set(m.lower() for m in marques_preferees)))
+               if marques_preferees else None,
+               note_min, top_n, par_offre)
+        resultat = self.cache_resultats.obtenir(
+            cle, self._version_catalogue(),
+            lambda: self._calculer_recommandations(budget_max, marques_preferees, note_min,
+                                                   top_n, par_offre))
+        # Les critères sont ceux de l'appel, pas de celui qui a rempli le cache
+        return dict(resultat, criteres={
+            'budget_max': budget_max,
+            'marques_preferees': marques_preferees,
+            'note_min': note_min
+        })
+    
+    def _calculer_recommandations(self, budget_max, marques_preferees, note_min,
+                                  top_n, par_offre) -> Dict[str, Any]:
+        """Recommandations (cf. obtenir_recommandations), sans cache"""
+        # Filtrer (en une passe, cf. Requete)
+        requete = self.requete().note_min(note_min)
+        if marques_preferees:
+            requete = requete.marques(marques_preferees)
+        if par_offre:
+            return self._recommandations_offres(requete, budget_max, marques_preferees,
+                                                note_min, top_n)
         if budget_max:
-            produits = [p for p in produits if p.prix <= budget_max]
+            requete = requete.prix(max=budget_max)
+        if self._sql:
+            return self._recommandations_sql(requete, budget_max, marques_preferees,
+                                             note_min, top_n)
+        ids = requete.ids()
         
-        if marques_preferees:
-            marques_lower = [m.lower() for m in marques_preferees]
-            produits = [p for p in produits if p.marque.lower() in marques_lower]
+        # Top N par score (sélection partielle)
+        top = top_ids(ids, top_n, 'score', self._stockage.acces)
         
-        produits = [p for p in produits if p.note >= note_min]
+        prix = self._stockage.acces('prix')
+        notes = self._stockage.acces('note')
+        dict_produit = self._mesuree('serialisation', self._stockage.dict_produit)
         
-        # Trier par score
-        produits_tries = sorted(produits, key=lambda p: p.score_qualite_prix, reverse=True)
+        return {
+            'nb_produits_trouves': len(ids),
+            'top_recommandations': [dict_produit(i) for i in top],
+            'meilleur_produit': dict_produit(top[0]) if top else None,
+            'meilleur_prix': dict_produit(min(ids, key=prix)) if ids else None,
+            'meilleure_note': dict_produit(max(ids, key=notes)) if ids else None,
+            'criteres': {
+                'budget_max': budget_max,
+                'marques_preferees': marques_preferees,
+                'note_min': note_min
+            }
+        }
+    
+    def _recommandations_offres(self, requete: Requete, budget_max, marques_preferees,
+                                note_min, top_n) -> Dict[str, Any]:
+        """Recommandations sur les offres regroupées par produit"""
+        groupes = self.obtenir_offres(requete)
+        if budget_max:
+            # Budget appliqué à la meilleure offre, pas au prix de chaque ligne
+            groupes = [g for g in groupes if g.prix_min <= budget_max]
+        top = top_offres(groupes, top_n, 'score', self._stockage)
+        meilleur_prix = top_offres(groupes, 1, 'prix', self._stockage)
+        meilleure_note = top_offres(groupes, 1, 'note', self._stockage)
+        
+        def decrire(groupe: OffresProduit) -> Dict[str, Any]:
+            return dict(self._stockage.dict_produit(groupe.id), offres=groupe.to_dict())
         
-        # Top N
-        top = produits_tries[:top_n]
+        recommandations = [decrire(g) for g in top]
+        return {
+            'nb_produits_trouves': len(groupes),
+            'top_recommandations': recommandations,
+            'meilleur_produit': recommandations[0] if recommandations else None,
+            'meilleur_prix': decrire(meilleur_prix[0]) if meilleur_prix else None,
+            'meilleure_note': decrire(meilleure_note[0]) if meilleure_note else None,
+            'criteres': {
+                'budget_max': budget_max,
+                'marques_preferees': marques_preferees,
+                'note_min': note_min
+            }
+        }
+    
+    def _recommandations_sql(self, requete: Requete, budget_max, marques_preferees,
+                             note_min, top_n) -> Dict[str, Any]:
+        """Recommandations calculées par la base : une requête par rubrique"""
+        dicts_produits = self._stockage.dicts_produits
+        top = list(dicts_produits(requete.top(top_n, 'score').ids()))
+        meilleur_prix = list(dicts_produits(requete.top(1, 'prix').ids()))
+        meilleure_note = list(dicts_produits(requete.top(1, 'note').ids()))
         
         return {
-            'nb_produits_trouves': len(produits),
-            'top_recommandations': [p.to_dict() for p in top],
-            'meilleur_produit': top[0].to_dict() if top else None,
-            'meilleur_prix': min(produits, key=lambda p: p.prix).to_dict() if produits else None,
-            'meilleure_note': max(produits, key=lambda p: p.note).to_dict() if produits else None,
+            'nb_produits_trouves': len(requete),
+            'top_recommandations': top,
+            'meilleur_produit': top[0] if top else None,
+            'meilleur_prix': meilleur_prix[0] if meilleur_prix else None,
+            'meilleure_note': meilleure_note[0] if meilleure_note else None,
             'criteres': {
                 'budget_max': budget_max,
                 'marques_preferees': marques_preferees,
@@ -405,11 +1082,19 @@ class AgentProduitUniversel:
     
     def generer_rapport_texte(self, 
                               budget_max: Optional[float] = None,
-                              top_n: int = 5) -> str:
-        """Générer rapport texte lisible"""
+                              top_n: int = 5,
+                              selection: Optional[Requete] = None) -> str:
+        """
+        Générer rapport texte lisible
         
-        stats = self.obtenir_statistiques()
-        top = self.obtenir_top(n=top_n, budget_max=budget_max)
+        Args:
+            budget_max: Budget maximum (optionnel)
+            top_n: Nombre de produits dans le top
+            selection: Requête restreignant les produits analysés (optionnel)
+        """
+        
+        stats = self.obtenir_statistiques(selection)
+        top = self.obtenir_top(n=top_n, budget_max=budget_max, selection=selection)
         
         lignes = []
         lignes.append("=" * 80)
@@ -420,8 +1105,7 @@ class AgentProduitUniversel:
         
         if budget_max:
             lignes.append(f"💰 Budget max : {budget_max}€")
-            produits_budget = self.filtrer_par_budget(budget_max)
-            lignes.append(f"✅ Dans le budget : {len(produits_budget)}")
+            lignes.append(f"✅ Dans le budget : {self._compter_budget(budget_max, selection)}")
         
         lignes.append(f"\n💵 Prix moyen : {stats.get('prix_moyen', 0):.2f}€")
         lignes.append(f"📊 Prix min-max : {stats.get('prix_min', 0):.2f}€ - {stats.get('prix_max', 0):.2f}€")
@@ -454,37 +1138,113 @@ class AgentProduitUniversel:
         
         return "\n".join(lignes)
     
-    def exporter_json(self, fichier: str, budget_max: Optional[float] = None):
-        """Exporter résultats en JSON"""
-        top = self.obtenir_top(budget_max=budget_max, n=10)
-        stats = self.obtenir_statistiques()
+    def exporter_json(self,
+                      fichier: str,
+                      budget_max: Optional[float] = None,
+                      selection: Optional[Requete] = None,
+                      flux: bool = False,
+                      format: str = 'json',
+                      compression: Optional[str] = None):
+        """
+        Exporter résultats en JSON
+        
+        Args:
+            fichier: Chemin du fichier à écrire
+            budget_max: Budget maximum (optionnel)
+            selection: Requête restreignant les produits exportés (optionnel)
+            flux: Écrire les produits un par un, à mémoire constante
+                  (recommandé pour les gros catalogues)
+            format: 'json' ou 'jsonl' (JSON Lines, implique flux=True)
+            compression: 'gzip' ou 'zstd' (implique flux=True) ; déduite
+                         de l'extension .gz / .zst si non précisée
+        """
+        top = self.obtenir_top(budget_max=budget_max, n=10, selection=selection)
+        stats = self.obtenir_statistiques(selection)
+        ids = range(len(self._stockage)) if selection is None else selection.ids()
         
-        data = {
+        entete = {
             'metadata': {
                 'type_produit': self.type_produit,
                 'date': datetime.now().isoformat(),
                 'budget_max': budget_max
             },
             'statistiques': stats,
-            'top_produits': [p.to_dict() for p in top],
-            'tous_produits': [p.to_dict() for p in self.produits]
+            'top_produits': [p.to_dict() for p in top]
         }
         
-        with open(fichier, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        en_flux = flux or format != 'json' or compression or compression_du_fichier(fichier)
+        if self._sql:
+            produits = self._stockage.dicts_produits(ids)
+        elif en_flux:
+            # Produits écrits tels quels, déjà encodés (cf. Produit.to_json)
+            produits = map(self._mesuree('serialisation', self._stockage.json_produit), ids)
+        else:
+            produits = map(self._mesuree('serialisation', self._stockage.dict_produit), ids)
+        
+        if en_flux:
+            ecrire_export(fichier, entete, produits, format, compression)
+        else:
+            data = dict(entete, tous_produits=list(produits))
+            with open(fichier, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
         
         print(f"✅ Résultats exportés : {fichier}")
     
+    # ========================================================================
+    # INSTANTANÉS
+    # ========================================================================
+    
+    def sauvegarder_instantane(self, fichier: str):
+        """
+        Sauvegarder les produits dans un instantané binaire
+        (cf. agents/instantane.py), avec les index triés déjà construits
+        et les statistiques courantes
+        
+        Exemple:
+            agent.sauvegarder_instantane('data/catalogue.inst')
+        """
+        index_tries = {critere: self._index_trie(critere) for critere in self._index_tries}
+        ecrire_instantane(self._stockage, fichier, index_tries, self.statistiques_courantes(),
+                          {'type_produit': self.type_produit, 'profil': self._profil.to_dict()})
+    
+    @classmethod
+    def depuis_instantane(cls, fichier: str,
+                          type_produit: Optional[str] = None) -> 'AgentProduitUniversel':
+        """
+        Rouvrir un agent depuis un instantané binaire
+        
+        Le fichier est projeté en mémoire : l'ouverture ne lit ni ne
+        décode les produits, et les index sauvegardés sont réutilisés
+        tels quels. Le stockage est colonnaire.
+        
+        Exemple:
+            agent = AgentProduitUniversel.depuis_instantane('data/catalogue.inst')
+            top = agent.obtenir_top(n=5, budget_max=500)
+        """
+        instantane = ouvrir_instantane(fichier)
+        # Profil des scores sauvegardés (PROFIL_DEFAUT pour un ancien instantané)
+        agent = cls(type_produit or instantane.metadata.get('type_produit', 'produit'),
+                    stockage=instantane.stockage, profil=instantane.metadata.get('profil'))
+        agent._index_tries.update(instantane.index_tries)
+        if instantane.statistiques is not None:
+            agent._statistiques = instantane.statistiques
+        return agent
+    
     def vider(self):
         """Vider la liste des produits"""
-        self.produits = []
+        self.version += 1
+        self._stockage.vider()
+        for index in self._tous_les_index():
+            index.vider()
+        if self.deduplicateur is not None:
+            self.deduplicateur.vider()
     
     def __len__(self):
         """Nombre de produits"""
-        return len(self.produits)
+        return len(self._stockage)
     
     def __repr__(self):
-        return f"<AgentProduitUniversel({self.type_produit}): {len(self.produits)} produits>"
+        return f"<AgentProduitUniversel({self.type_produit}): {len(self._stockage)} produits>"
 
 
 # ============================================================================
@@ -493,7 +1253,8 @@ class AgentProduitUniversel:
 
 def analyser_produits(produits_data: List[Dict], 
                      budget_max: float,
-                     type_produit: str = "produit") -> Dict[str, Any]:
+                     type_produit: str = "produit",
+                     cache: bool = False) -> Dict[str, Any]:
     """
     Fonction ultra-simple pour analyse rapide
     
@@ -501,6 +1262,9 @@ def analyser_produits(produits_data: List[Dict],
         produits_data: Liste de dicts avec vos produits
         budget_max: Budget maximum
         type_produit: Type de produit
+        cache: Réutiliser le résultat d'un appel précédent sur les mêmes
+               données (reconnues à leur empreinte) ; le résultat servi
+               est partagé, à ne pas modifier
     
     Returns:
         Recommandations complètes
@@ -513,6 +1277,19 @@ def analyser_produits(produits_data: List[Dict],
         )
         print(resultats['meilleur_produit'])
     """
-    agent = AgentProduitUniversel(type_produit)
-    agent.ajouter_produits_depuis_dict(produits_data)
-    return agent.obtenir_recommandations(budget_max=budget_max)
+    def analyser():
+        agent = AgentProduitUniversel(type_produit)
+        agent.ajouter_produits_depuis_dict(produits_data)
+        return agent.obtenir_recommandations(budget_max=budget_max)
+    
+    if not cache:
+        return analyser()
+    try:
+        empreinte = hashlib.blake2b(pickle.dumps(produits_data, protocol=4)).digest()
+    except Exception:  # Données non sérialisables : pas de cache
+        return analyser()
+    return _CACHE_ANALYSES.obtenir((empreinte, budget_max, type_produit), 0, analyser)
+
+
+# Résultats de `analyser_produits(..., cache=True)`
+_CACHE_ANALYSES = CacheResultats()
@@ -0,0 +1,101 @@
+"""
+CACHE DE RÉSULTATS
+==================
+
+Cache borné (LRU) à durée de vie (TTL) pour les réponses répétées de
+l'agent :
+
+    agent = AgentProduitUniversel("smartphone", cache_resultats=True)
+    agent.obtenir_recommandations(budget_max=500)   # calculé
+    agent.obtenir_recommandations(budget_max=500)   # servi par le cache
+    print(agent.cache_resultats.stats())
+
+Chaque entrée est rangée avec la version du catalogue qui l'a produite
+(cf. AgentProduitUniversel.version) : tout ajout, mise à jour ou
+vidage change la version, et les entrées plus anciennes sont ignorées
+à la lecture suivante. La durée de vie couvre les modifications que
+l'agent ne voit pas (produits modifiés directement).
+
+Les résultats servis sont partagés entre les appels : ils ne doivent
+pas être modifiés.
+"""
+
+from collections import OrderedDict
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+# Nombre maximal de résultats conservés
+TAILLE_CACHE = 1024
+
+# Durée de vie d'un résultat (s), None = illimitée
+DUREE_CACHE = 300.0
+
+
+class CacheResultats:
+    """
+    Cache LRU/TTL de résultats, invalidé par version
+
+    Attributs :
+        taille_max: Nombre maximal d'entrées
+        duree: Durée de vie d'une entrée (s), None = illimitée
+        nb_succes: Lectures servies par le cache
+        nb_echecs: Lectures à calculer (absentes, expirées ou périmées)
+    """
+
+    def __init__(self,
+                 taille_max: int = TAILLE_CACHE,
+                 duree: Optional[float] = DUREE_CACHE,
+                 horloge: Callable[[], float] = time.monotonic):
+        self.taille_max = taille_max
+        self.duree = duree
+        self._horloge = horloge
+        self._entrees: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.nb_succes = 0
+        self.nb_echecs = 0
+
+    def obtenir(self, cle: Hashable, version: Hashable, calculer: Callable[[], Any]) -> Any:
+        """
+        Résultat en cache pour la clé, sinon `calculer()` (mis en cache)
+
+        Args:
+            cle: Paramètres normalisés de la requête
+            version: Version des données (une entrée d'une autre version
+                     est périmée)
+            calculer: Fonction sans argument produisant le résultat
+        """
+        maintenant = self._horloge()
+        entree = self._entrees.get(cle)
+        if entree is not None:
+            version_entree, expiration, resultat = entree
+            if version_entree == version and (expiration is None or maintenant < expiration):
+                self._entrees.move_to_end(cle)
+                self.nb_succes += 1
+                return resultat
+            del self._entrees[cle]
+
+        self.nb_echecs += 1
+        resultat = calculer()
+        expiration = None if self.duree is None else maintenant + self.duree
+        self._entrees[cle] = (version, expiration, resultat)
+        if len(self._entrees) > self.taille_max:
+            self._entrees.popitem(last=False)
+        return resultat
+
+    def vider(self):
+        """Oublier tous les résultats (les compteurs sont conservés)"""
+        self._entrees.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du cache"""
+        lectures = self.nb_succes + self.nb_echecs
+        return {
+            'taille': len(self._entrees),
+            'taille_max': self.taille_max,
+            'succes': self.nb_succes,
+            'echecs': self.nb_echecs,
+            'taux_succes': self.nb_succes / lectures if lectures else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entrees)
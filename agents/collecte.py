@@ -0,0 +1,315 @@
+"""
+COLLECTE ASYNCHRONE
+===================
+
+Pipeline asyncio entre le scraping et l'agent :
+
+    rapport = collecter(agent, urls, analyser_page, max_par_hote=4)
+
+- des coroutines récupèrent les pages en parallèle, avec une limite de
+  requêtes simultanées par site (et une limite globale) ;
+- chaque page est analysée (`analyser_page(page)` -> dicts produits) ;
+- les produits passent par une file bornée (un site rapide ne remplit pas
+  la mémoire) et sont ajoutés à l'agent par lots.
+
+L'analyse des pages et l'ajout des lots (code synchrone, coûteux en
+calcul) s'exécutent hors de la boucle asyncio, dans un thread dédié à
+la collecte : les téléchargements continuent pendant ce temps. Ce
+thread est unique, les appels à `analyser_page`, à l'agent et à
+`apres_lot` ne sont donc jamais simultanés.
+
+Les sites sont traités indépendamment : un site lent ne bloque pas les
+autres, la durée totale est celle du site le plus lent et non la somme.
+
+La récupération est interchangeable : toute coroutine `url -> Page`
+convient (client HTTP maison, aiohttp, stub pour les tests...). Par
+défaut, un RecuperateurHTTP (connexions persistantes par site, cf.
+agents/recuperation.py) est utilisé. Les pages marquées `inchangee` ne
+sont pas analysées.
+"""
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from .recuperation import Page, RecuperateurHTTP
+
+
+# Requêtes simultanées par site
+MAX_PAR_HOTE = 4
+
+# Requêtes simultanées au total
+MAX_TOTAL = 32
+
+# Produits en attente d'ajout (au-delà, les analyseurs patientent)
+TAILLE_FILE = 10000
+
+# Produits ajoutés ensemble à l'agent
+TAILLE_LOT_COLLECTE = 1000
+
+# Délai maximal (s) avant l'ajout d'un lot incomplet
+DELAI_LOT = 0.5
+
+# Nombre maximal d'erreurs conservées en détail
+MAX_ERREURS_DETAILLEES = 1000
+
+_FIN = object()
+
+# Suit dans la file le dernier produit d'une page
+_FIN_PAGE = object()
+
+
+Recuperateur = Callable[[str], Awaitable[Page]]
+
+
+@dataclass
+class RapportCollecte:
+    """
+    Bilan d'une collecte
+
+    Attributs :
+        nb_pages: Pages récupérées et analysées
+        nb_inchangees: Pages inchangées depuis la dernière collecte
+                       (ni analysées, ni ajoutées)
+        nb_echecs: Pages en échec (réseau, statut HTTP, analyse) et
+                   lots dont l'ajout a échoué
+        nb_produits_lus: Produits extraits des pages
+        nb_ajoutes: Produits ajoutés à l'agent
+        duree: Durée totale (s)
+        durees_hotes: Durée de collecte de chaque site (s)
+        erreurs: Détail des premières erreurs (url, message)
+    """
+    nb_pages: int = 0
+    nb_inchangees: int = 0
+    nb_echecs: int = 0
+    nb_produits_lus: int = 0
+    nb_ajoutes: int = 0
+    duree: float = 0.0
+    durees_hotes: Dict[str, float] = field(default_factory=dict)
+    erreurs: List[Tuple[str, str]] = field(default_factory=list)
+
+    def signaler(self, url: str, erreur: Any):
+        """Enregistrer l'échec d'une page"""
+        self.nb_echecs += 1
+        if len(self.erreurs) < MAX_ERREURS_DETAILLEES:
+            self.erreurs.append((url, str(erreur)))
+
+
+def hote(url: str) -> str:
+    """Site d'une URL (hôte[:port])"""
+    return urlsplit(url).netloc
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class PipelineCollecte:
+    """
+    Récupération concurrente de pages, analyse et ajout par lots à un agent
+
+    Exemple:
+        def analyser_page(page):
+            soup = BeautifulSoup(page.contenu, 'html.parser')
+            yield {'nom': ..., 'marque': ..., 'prix': ..., 'url': page.url}
+
+        pipeline = PipelineCollecte(agent, analyser_page, max_par_hote=2)
+        rapport = await pipeline.executer(urls)
+    """
+
+    def __init__(self,
+                 agent,
+                 analyser_page: Callable[[Page], Iterable[Dict]],
+                 recuperer: Optional[Recuperateur] = None,
+                 max_par_hote: int = MAX_PAR_HOTE,
+                 max_total: int = MAX_TOTAL,
+                 taille_file: int = TAILLE_FILE,
+                 taille_lot: int = TAILLE_LOT_COLLECTE,
+                 delai_lot: float = DELAI_LOT,
+                 apres_lot: Optional[Callable[[List[Dict]], None]] = None):
+        """
+        Args:
+            agent: AgentProduitUniversel alimenté (None : les lots ne
+                   sont transmis qu'à `apres_lot`)
+            analyser_page: Fonction Page -> dicts produits
+            recuperer: Coroutine url -> Page (défaut : RecuperateurHTTP) ;
+                       si elle a une méthode `confirmer(page)`, celle-ci
+                       est appelée une fois tous les produits de la page
+                       ajoutés à l'agent (une page dont l'ajout échoue
+                       sera donc récupérée à nouveau)
+            max_par_hote: Requêtes simultanées par site
+            max_total: Requêtes simultanées au total
+            taille_file: Produits en attente d'ajout au maximum
+            taille_lot: Produits ajoutés ensemble à l'agent
+            delai_lot: Délai maximal (s) avant l'ajout d'un lot incomplet
+            apres_lot: Fonction appelée avec chaque lot de dicts produits
+                       après son ajout (ex. SuiviPrix.observer)
+        """
+        self.agent = agent
+        self.analyser_page = analyser_page
+        self.recuperer = recuperer or RecuperateurHTTP()
+        self.max_par_hote = max_par_hote
+        self.max_total = max_total
+        self.taille_file = taille_file
+        self.taille_lot = taille_lot
+        self.delai_lot = delai_lot
+        self.apres_lot = apres_lot
+
+    async def executer(self, urls: Iterable[str]) -> RapportCollecte:
+        """Collecter les URLs et alimenter l'agent"""
+        rapport = RapportCollecte()
+        debut = time.perf_counter()
+
+        # Une file d'URLs par site, chaque site a ses propres collecteurs
+        par_hote: Dict[str, List[str]] = OrderedDict()
+        for url in urls:
+            par_hote.setdefault(hote(url), []).append(url)
+
+        file = asyncio.Queue(self.taille_file)
+        limite = asyncio.Semaphore(self.max_total)
+        with ThreadPoolExecutor(1, thread_name_prefix='collecte') as executeur:
+            ajout = asyncio.ensure_future(self._ajouter(file, rapport, executeur))
+            collecte = asyncio.ensure_future(asyncio.gather(
+                *(self._collecter_hote(nom, liste, file, limite, rapport, executeur)
+                  for nom, liste in par_hote.items())))
+            try:
+                termines, _ = await asyncio.wait((collecte, ajout),
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                if ajout in termines:
+                    # L'ajout s'est arrêté sur une erreur : plus personne ne
+                    # vide la file, les collecteurs y resteraient bloqués
+                    collecte.cancel()
+                    await asyncio.gather(collecte, return_exceptions=True)
+                    ajout.result()
+                await collecte
+            finally:
+                collecte.cancel()
+                if not ajout.done():
+                    await file.put(_FIN)
+                await ajout
+
+        rapport.duree = time.perf_counter() - debut
+        return rapport
+
+    async def _collecter_hote(self, nom: str, urls: List[str], file: asyncio.Queue,
+                              limite: asyncio.Semaphore, rapport: RapportCollecte,
+                              executeur: ThreadPoolExecutor):
+        """Collecter les pages d'un site avec au plus max_par_hote requêtes simultanées"""
+        debut = time.perf_counter()
+        restantes = iter(urls)
+
+        async def collecteur():
+            for url in restantes:
+                async with limite:
+                    try:
+                        page = await self.recuperer(url)
+                    except Exception as e:
+                        rapport.signaler(url, e)
+                        continue
+                await self._traiter(page, file, rapport, executeur)
+
+        await asyncio.gather(*(collecteur() for _ in range(min(self.max_par_hote, len(urls)))))
+        rapport.durees_hotes[nom] = time.perf_counter() - debut
+
+    async def _traiter(self, page: Page, file: asyncio.Queue, rapport: RapportCollecte,
+                       executeur: ThreadPoolExecutor):
+        """
+        Analyser une page et mettre ses produits dans la file, chacun
+        avec sa page, puis la fin de la page (cf. _ajouter)
+        """
+        if getattr(page, 'inchangee', False):
+            rapport.nb_inchangees += 1
+            return
+        if not 200 <= page.statut < 300:
+            rapport.signaler(page.url, f"HTTP {page.statut}")
+            return
+        try:
+            produits = await asyncio.get_running_loop().run_in_executor(
+                executeur, self._analyser, page)
+        except Exception as e:
+            rapport.signaler(page.url, e)
+            return
+        rapport.nb_pages += 1
+        rapport.nb_produits_lus += len(produits)
+        for produit in produits:
+            await file.put((page, produit))
+        await file.put((page, _FIN_PAGE))
+
+    def _analyser(self, page: Page) -> List[Dict]:
+        return list(self.analyser_page(page))
+
+    async def _ajouter(self, file: asyncio.Queue, rapport: RapportCollecte,
+                       executeur: ThreadPoolExecutor):
+        """
+        Vider la file dans l'agent, par lots
+
+        Un lot dont l'ajout échoue est compté dans le rapport, la
+        collecte continue.
+
+        Une page est confirmée (cf. RecuperateurHTTP.confirmer) quand sa
+        fin sort de la file, tous ses produits étant alors ajoutés ; pas
+        si l'un des lots qui les portaient a échoué.
+        """
+        boucle = asyncio.get_running_loop()
+        confirmer = getattr(self.recuperer, 'confirmer', None)
+        en_echec: Set[str] = set()  # Pages dont un lot a échoué
+        termine = False
+        while not termine:
+            lot, pages_lot, terminees = [], set(), []
+            echeance = boucle.time() + self.delai_lot
+            while len(lot) < self.taille_lot:
+                attente = echeance - boucle.time()
+                try:
+                    if attente > 0:
+                        element = await asyncio.wait_for(file.get(), attente)
+                    else:
+                        element = file.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if element is _FIN:
+                    termine = True
+                    break
+                page, produit = element
+                if produit is _FIN_PAGE:
+                    terminees.append(page)
+                else:
+                    lot.append(produit)
+                    pages_lot.add(page.url)
+            if lot:
+                try:
+                    if self.agent is not None:
+                        rapport.nb_ajoutes += await boucle.run_in_executor(
+                            executeur, self.agent.ajouter_produits_depuis_dict, lot)
+                    if self.apres_lot is not None:
+                        await boucle.run_in_executor(executeur, self.apres_lot, lot)
+                except Exception as e:
+                    rapport.signaler(f"(lot de {len(lot)} produits)", e)
+                    en_echec.update(pages_lot)
+            for page in terminees:
+                if page.url in en_echec:
+                    en_echec.discard(page.url)
+                elif confirmer is not None:
+                    confirmer(page)
+
+
+def collecter(agent,
+              urls: Iterable[str],
+              analyser_page: Callable[[Page], Iterable[Dict]],
+              **options) -> RapportCollecte:
+    """
+    Collecter des URLs et alimenter un agent (version synchrone)
+
+    Args:
+        agent: AgentProduitUniversel alimenté (ou None, cf. PipelineCollecte)
+        urls: URLs à récupérer
+        analyser_page: Fonction Page -> dicts produits
+        **options: cf. PipelineCollecte (recuperer, max_par_hote, ...)
+
+    Returns:
+        RapportCollecte
+    """
+    return asyncio.run(PipelineCollecte(agent, analyser_page, **options).executer(urls))
@@ -0,0 +1,258 @@
+"""
+DÉDUPLICATION
+=============
+
+Rapprochement des fiches d'un même produit publiées par plusieurs sites
+(« Samsung Galaxy S23 128 Go » chez l'un, « GALAXY S23 - 128GB » chez
+l'autre) :
+
+    agent = AgentProduitUniversel("smartphone", deduplication=True)
+    agent.ajouter_produits_depuis_dict(produits_site_a)
+    agent.ajouter_produits_depuis_dict(produits_site_b)   # doublons fusionnés
+
+Pour chaque produit ajouté :
+
+1. normalisation du nom et des caractéristiques (casse, accents,
+   ponctuation, unités : "128 Go" -> "128gb", la marque est retirée du nom) ;
+2. blocage par marque : seules les fiches de même marque sont comparées ;
+3. signature MinHash des jetons, découpée en bandes (LSH) : les fiches
+   partageant une bande sont candidates, en temps constant quelle que
+   soit la taille du catalogue ;
+4. vérification des candidates : similarité de Jaccard des jetons au
+   moins égale au seuil, et aucun jeton distinctif du nom (nombre,
+   « pro », « max »...) absent de l'autre fiche.
+
+Un doublon n'est pas ajouté au catalogue : son offre est rangée dans
+`extra['offres']` du produit retenu, sous la forme
+{source: {'prix': ..., 'url': ..., 'note': ..., 'nb_avis': ..., 'stock': ...}}
+(cf. agents/offres.py pour la vue regroupée).
+"""
+
+from functools import lru_cache
+import random
+import re
+import unicodedata
+import zlib
+from typing import Dict, FrozenSet, List, Tuple
+
+from .produit import Produit
+
+
+# Fonctions de hachage de la signature MinHash
+NB_PERMUTATIONS = 40
+
+# Bandes LSH (NB_PERMUTATIONS / NB_BANDES valeurs par bande) : deux fiches
+# de similarité s sont candidates avec une probabilité 1 - (1 - s^4)^10
+# (94% pour s = 0.7, 99,5% pour s = 0.8)
+NB_BANDES = 10
+
+# Similarité de Jaccard minimale entre deux fiches d'un même produit
+SEUIL_SIMILARITE = 0.7
+
+# Fiches d'un même seau LSH vérifiées au plus (les plus récentes)
+MAX_CANDIDATS_SEAU = 100
+
+# Mots ignorés dans les noms
+MOTS_VIDES = frozenset({
+    'de', 'du', 'des', 'le', 'la', 'les', 'et', 'avec', 'pour', 'en', 'un', 'une',
+    'the', 'with', 'for', 'and', 'neuf', 'new',
+})
+
+# Mots de gamme : comme les nombres, ils distinguent deux modèles
+# (« iPhone 15 » / « iPhone 15 Pro ») et doivent se retrouver dans l'autre fiche
+MOTS_DISTINCTIFS = frozenset({
+    'pro', 'max', 'plus', 'ultra', 'mini', 'lite', 'air', 'se', 'fe', 'xl',
+})
+
+_PREMIER = (1 << 61) - 1
+
+_UNITES = {
+    'go': 'gb', 'gb': 'gb', 'to': 'tb', 'tb': 'tb', 'mo': 'mb', 'mb': 'mb',
+    'mah': 'mah', 'ghz': 'ghz', 'hz': 'hz', 'w': 'w', 'kg': 'kg', 'g': 'g',
+    'l': 'l', 'cm': 'cm', 'mm': 'mm', 'pouces': 'in', 'pouce': 'in', '"': 'in',
+}
+_RE_UNITE = re.compile(
+    r'(\d+(?:[.,]\d+)?)\s*(' + '|'.join(sorted(map(re.escape, _UNITES), key=len, reverse=True))
+    + r')(?![a-z])')
+_RE_JETON = re.compile(r'[a-z0-9]+(?:\.[0-9]+[a-z]*)?')
+
+
+def _sans_accents(texte: str) -> str:
+    if texte.isascii():
+        return texte
+    decompose = unicodedata.normalize('NFKD', texte)
+    return ''.join(c for c in decompose if not unicodedata.combining(c))
+
+
+def normaliser(texte: str) -> List[str]:
+    """
+    Jetons normalisés d'un texte
+
+    Exemple:
+        normaliser('Galaxy S23 - 128 Go, Écran 6,1"')
+        # ['galaxy', 's23', '128gb', 'ecran', '6.1in']
+    """
+    texte = _sans_accents(str(texte)).lower()
+    texte = _RE_UNITE.sub(lambda m: m.group(1).replace(',', '.') + _UNITES[m.group(2)], texte)
+    return _RE_JETON.findall(texte)
+
+
+@lru_cache(maxsize=100000)
+def _normaliser_frequent(texte: str) -> Tuple[str, ...]:
+    """`normaliser` mémorisé, pour les textes répétés (marques, caractéristiques)"""
+    return tuple(normaliser(texte))
+
+
+def normaliser_marque(marque: str) -> str:
+    """Clé de blocage d'une marque"""
+    return ' '.join(_normaliser_frequent(marque))
+
+
+def jetons_produit(nom: str, marque: str,
+                   caracteristiques: List[str]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Jetons d'une fiche produit
+
+    Returns:
+        (jetons du nom et des caractéristiques, jetons distinctifs du nom :
+        nombres et mots de gamme)
+    """
+    ignores = MOTS_VIDES.union(_normaliser_frequent(marque))
+    jetons_nom = [j for j in normaliser(nom) if j not in ignores]
+    jetons = set(jetons_nom)
+    for caracteristique in caracteristiques:
+        jetons.update(_normaliser_frequent(caracteristique))
+    distinctifs = frozenset(j for j in jetons_nom
+                            if j in MOTS_DISTINCTIFS or any(c.isdigit() for c in j))
+    return frozenset(jetons), distinctifs
+
+
+def _offre(produit: Produit) -> Dict:
+    return {'prix': produit.prix, 'url': produit.url, 'note': produit.note,
+            'nb_avis': produit.nb_avis, 'stock': produit.stock}
+
+
+def ajouter_offre(canonique: Produit, doublon: Produit):
+    """Ranger l'offre d'un doublon (source, prix, URL...) dans le produit retenu"""
+    extra = dict(canonique.extra)
+    offres = dict(extra.get('offres') or {})
+    if not offres:
+        offres[canonique.source] = _offre(canonique)
+    offres[doublon.source] = _offre(doublon)
+    extra['offres'] = offres
+    canonique.extra = extra
+
+
+# ============================================================================
+# DÉDUPLICATEUR
+# ============================================================================
+
+class Deduplicateur:
+    """
+    Index MinHash/LSH des fiches déjà vues, bloqué par marque
+
+    Attributs :
+        seuil: Similarité de Jaccard minimale pour fusionner
+        nb_fiches: Fiches examinées
+        nb_fusions: Fiches reconnues comme doublons
+    """
+
+    def __init__(self,
+                 seuil: float = SEUIL_SIMILARITE,
+                 nb_permutations: int = NB_PERMUTATIONS,
+                 nb_bandes: int = NB_BANDES,
+                 graine: int = 1):
+        if nb_permutations % nb_bandes:
+            raise ValueError("nb_permutations doit être un multiple de nb_bandes")
+        self.seuil = seuil
+        self.nb_bandes = nb_bandes
+        self._lignes = nb_permutations // nb_bandes
+        r = random.Random(graine)
+        self._permutations = [(r.randrange(1, _PREMIER), r.randrange(_PREMIER))
+                              for _ in range(nb_permutations)]
+        self._hachages: Dict[str, Tuple[int, ...]] = {}
+        self.vider()
+
+    def vider(self):
+        """Oublier toutes les fiches"""
+        self._seaux: Dict[int, object] = {}
+        self._fiches: Dict[int, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self.nb_fiches = 0
+        self.nb_fusions = 0
+
+    def _hachage(self, jeton: str) -> Tuple[int, ...]:
+        """Valeurs du jeton pour chaque permutation (mémorisées)"""
+        valeurs = self._hachages.get(jeton)
+        if valeurs is None:
+            h = zlib.crc32(jeton.encode('utf-8'))
+            valeurs = self._hachages[jeton] = tuple(
+                (a * h + b) % _PREMIER for a, b in self._permutations)
+        return valeurs
+
+    def signature(self, jetons: FrozenSet[str]) -> Tuple[int, ...]:
+        """Signature MinHash d'un ensemble de jetons"""
+        return tuple(map(min, zip(*map(self._hachage, jetons))))
+
+    def _cles_bandes(self, marque: str, signature: Tuple[int, ...]) -> List[int]:
+        lignes = self._lignes
+        return [hash((marque, b, signature[b * lignes:(b + 1) * lignes]))
+                for b in range(self.nb_bandes)]
+
+    def _similaire(self, fiche, autre) -> float:
+        """Jaccard des jetons, 0 si un jeton distinctif manque à l'autre fiche"""
+        (jetons, distinctifs), (jetons_autre, distinctifs_autre) = fiche, autre
+        if not distinctifs <= jetons_autre or not distinctifs_autre <= jetons:
+            return 0.0
+        return len(jetons & jetons_autre) / len(jetons | jetons_autre)
+
+    def identifier(self, produit: Produit, i: int) -> int:
+        """
+        Rechercher un doublon du produit parmi les fiches déjà vues
+
+        Args:
+            produit: Fiche à examiner
+            i: Identifiant attribué au produit s'il est nouveau
+
+        Returns:
+            Identifiant du produit existant dont la fiche est un doublon,
+            sinon `i` (la fiche est alors retenue sous cet identifiant)
+        """
+        self.nb_fiches += 1
+        fiche = jetons_produit(produit.nom, produit.marque, produit.caracteristiques)
+        if not fiche[0]:
+            return i
+        cles = self._cles_bandes(normaliser_marque(produit.marque), self.signature(fiche[0]))
+
+        meilleur, similarite = None, self.seuil
+        vus = set()
+        for cle in cles:
+            seau = self._seaux.get(cle)
+            if seau is None:
+                continue
+            for candidat in (seau[-MAX_CANDIDATS_SEAU:] if isinstance(seau, list) else (seau,)):
+                if candidat in vus:
+                    continue
+                vus.add(candidat)
+                s = self._similaire(fiche, self._fiches[candidat])
+                if s > similarite or (s == similarite and (meilleur is None or candidat < meilleur)):
+                    meilleur, similarite = candidat, s
+
+        if meilleur is not None:
+            self.nb_fusions += 1
+            return meilleur
+
+        self._fiches[i] = fiche
+        seaux = self._seaux
+        for cle in cles:
+            seau = seaux.get(cle)
+            if seau is None:
+                seaux[cle] = i
+            elif isinstance(seau, list):
+                seau.append(i)
+            else:
+                seaux[cle] = [seau, i]
+        return i
+
+    def __len__(self):
+        """Nombre de fiches retenues"""
+        return len(self._fiches)
@@ -0,0 +1,500 @@
+"""
+LECTURE ET ÉCRITURE EN FLUX
+===========================
+
+Chargement de gros fichiers de produits sans les charger en mémoire :
+
+- JSON Lines (un produit JSON par ligne, extensions .jsonl / .ndjson)
+- Tableau JSON `[{...}, {...}]`
+- Objet JSON `{"produits": [{...}, ...]}` (ou un export `tous_produits`)
+
+Les tableaux sont lus par morceaux et décodés élément par élément
+(`json.JSONDecoder.raw_decode`), la mémoire utilisée dépend donc de la
+taille d'un produit et non de celle du fichier.
+
+Symétriquement, `ecrire_export` écrit un export produit par produit.
+
+Les fichiers .gz (gzip) et .zst (zstd, paquet `zstandard` requis) sont
+compressés / décompressés à la volée.
+"""
+
+import gzip
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # zstd est optionnel
+    zstandard = None
+
+
+# Taille des morceaux lus dans le fichier (caractères)
+TAILLE_MORCEAU = 1 << 16
+
+# Taille des morceaux examinés pour détecter le format d'un fichier
+TAILLE_DETECTION = 8192
+
+# Taille maximale d'un élément JSON (au-delà, le fichier est jugé invalide
+# plutôt que d'être chargé entièrement en mémoire)
+TAILLE_MAX_ELEMENT = 64 << 20
+
+# Nombre maximal d'erreurs conservées en détail dans un rapport
+MAX_ERREURS_DETAILLEES = 1000
+
+# Nombre d'erreurs détaillées à l'écran (cf. RapportChargement.afficher_erreurs)
+MAX_ERREURS_AFFICHEES = 10
+
+# Nombre de produits encodés avant chaque écriture
+TAILLE_BLOC_ECRITURE = 1000
+
+# Clés de l'objet racine pouvant contenir la liste des produits
+CLES_PRODUITS = ('produits', 'tous_produits')
+
+# Champs calculés présents dans les exports, ignorés au rechargement
+CHAMPS_CALCULES = ('score_qualite_prix', 'categorie_prix')
+
+_ESPACES = ' \t\n\r'
+
+_EXTENSIONS_COMPRESSION = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+class ErreurFormat(ValueError):
+    """Le fichier n'est pas dans un format JSON de produits reconnu"""
+
+
+# ============================================================================
+# RAPPORT DE CHARGEMENT
+# ============================================================================
+
+@dataclass
+class RapportChargement:
+    """
+    Bilan d'un chargement
+
+    Attributs :
+        nb_lus: Enregistrements lus
+        nb_ajoutes: Produits ajoutés à l'agent
+        nb_erreurs: Enregistrements rejetés
+        erreurs: Détail des premières erreurs (numéro, nom, message)
+        erreur_fatale: Erreur ayant interrompu la lecture (fichier mal
+                       formé), les produits lus avant restent ajoutés
+    """
+    nb_lus: int = 0
+    nb_ajoutes: int = 0
+    nb_erreurs: int = 0
+    erreurs: List[Tuple[int, str, str]] = field(default_factory=list)
+    erreur_fatale: Optional[str] = None
+
+    def signaler(self, numero: int, nom: str, erreur: Exception):
+        """Enregistrer une erreur sur un enregistrement"""
+        self.nb_erreurs += 1
+        if len(self.erreurs) < MAX_ERREURS_DETAILLEES:
+            self.erreurs.append((numero, nom, str(erreur)))
+
+    def afficher_erreurs(self, bilan: str, nb_max: int = MAX_ERREURS_AFFICHEES):
+        """Afficher une ligne de bilan puis le détail des nb_max premières erreurs"""
+        if not self.nb_erreurs:
+            return
+        print(bilan)
+        for numero, nom, message in self.erreurs[:nb_max]:
+            print(f"   n°{numero} {nom} : {message}")
+
+
+# ============================================================================
+# FICHIERS (COMPRESSÉS OU NON)
+# ============================================================================
+
+def compression_du_fichier(fichier: str) -> Optional[str]:
+    """Compression déduite de l'extension : 'gzip', 'zstd' ou None"""
+    for extension, compression in _EXTENSIONS_COMPRESSION.items():
+        if fichier.endswith(extension):
+            return compression
+    return None
+
+
+def ouvrir_texte(fichier: str, mode: str = 'r', compression: Optional[str] = None):
+    """
+    Ouvrir un fichier texte UTF-8, compressé ou non
+
+    Args:
+        fichier: Chemin du fichier
+        mode: 'r' ou 'w'
+        compression: 'gzip', 'zstd', None (déduite de l'extension)
+    """
+    compression = compression or compression_du_fichier(fichier)
+    encodage = 'utf-8-sig' if mode == 'r' else 'utf-8'
+
+    if compression is None:
+        return open(fichier, mode, encoding=encodage)
+    if compression == 'gzip':
+        return gzip.open(fichier, mode + 't', encoding=encodage)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Compression zstd : installez le paquet 'zstandard'")
+        brut = open(fichier, mode + 'b')
+        if mode == 'r':
+            flux = zstandard.ZstdDecompressor().stream_reader(brut, closefd=True)
+        else:
+            flux = zstandard.ZstdCompressor().stream_writer(brut, closefd=True)
+        return io.TextIOWrapper(flux, encoding=encodage)
+    raise ValueError(f"Compression inconnue : {compression!r}")
+
+
+# ============================================================================
+# LECTEURS
+# ============================================================================
+
+def detecter_format(fichier: str) -> str:
+    """
+    Détecter le format d'un fichier : 'lignes', 'tableau' ou 'objet'
+
+    Les extensions .jsonl / .ndjson désignent des JSON Lines ; sinon le
+    début du fichier est examiné, par morceaux de TAILLE_DETECTION
+    caractères (jamais le fichier entier) :
+    - '[' : tableau ;
+    - '{' : JSON Lines si la première ligne est un objet complet (sans
+      clé 'produits') ou, si elle dépasse un morceau, si la ligne
+      suivante commence aussi par '{' ; objet sinon.
+    """
+    nom = fichier
+    for extension in _EXTENSIONS_COMPRESSION:
+        if nom.endswith(extension):
+            nom = nom[:-len(extension)]
+    if nom.endswith(('.jsonl', '.ndjson')):
+        return 'lignes'
+
+    with ouvrir_texte(fichier) as f:
+        debut = _premier_non_blanc(f, '')
+        if debut.startswith('['):
+            return 'tableau'
+        if not debut.startswith('{'):
+            raise ErreurFormat("Format JSON non reconnu")
+
+        fin_ligne = debut.find('\n')
+        if fin_ligne >= 0:
+            # Première ligne entière dans le morceau : décodée (taille bornée)
+            try:
+                objet = json.loads(debut[:fin_ligne])
+            except ValueError:
+                return 'objet'
+            if any(cle in objet for cle in CLES_PRODUITS):
+                return 'objet'
+            return 'lignes'
+
+        # Première ligne plus longue qu'un morceau (objet minifié ou
+        # long produit JSON Lines) : parcourue sans être conservée
+        lus = len(debut)
+        while fin_ligne < 0:
+            morceau = f.read(TAILLE_DETECTION)
+            lus += len(morceau)
+            if not morceau or lus > TAILLE_MAX_ELEMENT:
+                return 'objet'
+            fin_ligne = morceau.find('\n')
+        suite = _premier_non_blanc(f, morceau[fin_ligne + 1:])
+    return 'lignes' if suite.startswith('{') else 'objet'
+
+
+def _premier_non_blanc(f, morceau: str) -> str:
+    """Suite du texte à partir du premier caractère non blanc ('' en fin de fichier)"""
+    morceau = morceau.lstrip(_ESPACES)
+    while not morceau:
+        morceau = f.read(TAILLE_DETECTION)
+        if not morceau:
+            return ''
+        morceau = morceau.lstrip(_ESPACES)
+    return morceau
+
+
+def iterer_lignes(fichier: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Lire un fichier JSON Lines
+
+    Yields:
+        (numéro de ligne, objet décodé) ; une ligne invalide donne
+        (numéro, exception) sans interrompre la lecture
+    """
+    with ouvrir_texte(fichier) as f:
+        for numero, ligne in enumerate(f, 1):
+            if not ligne.strip():
+                continue
+            try:
+                yield numero, json.loads(ligne)
+            except ValueError as e:
+                yield numero, e
+
+
+def iterer_lignes_brutes(fichier: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Lire un fichier JSON Lines sans décoder les produits
+
+    Yields:
+        (numéro de ligne, ligne brute) ; une ligne pouvant être un en-tête
+        d'export est décodée, comme avec `iterer_lignes`
+    """
+    with ouvrir_texte(fichier) as f:
+        for numero, ligne in enumerate(f, 1):
+            if not ligne.strip():
+                continue
+            if '"metadata"' not in ligne:
+                yield numero, ligne
+                continue
+            try:
+                yield numero, json.loads(ligne)
+            except ValueError as e:
+                yield numero, e
+
+
+class _Lecteur:
+    """Tampon de lecture glissant sur un fichier texte"""
+
+    def __init__(self, f, taille_morceau: int):
+        self.f = f
+        self.taille_morceau = taille_morceau
+        self.tampon = ''
+        self.pos = 0
+        self.fin = False
+        self.decodeur = json.JSONDecoder()
+
+    def completer(self) -> bool:
+        """Lire un morceau de plus ; False à la fin du fichier"""
+        if self.fin:
+            return False
+        if self.pos > len(self.tampon) // 2:
+            self.tampon = self.tampon[self.pos:]
+            self.pos = 0
+        morceau = self.f.read(self.taille_morceau)
+        if not morceau:
+            self.fin = True
+            return False
+        self.tampon += morceau
+        return True
+
+    def caractere(self) -> str:
+        """Prochain caractère significatif (sans le consommer), '' en fin de fichier"""
+        while True:
+            while self.pos < len(self.tampon) and self.tampon[self.pos] in _ESPACES:
+                self.pos += 1
+            if self.pos < len(self.tampon):
+                return self.tampon[self.pos]
+            if not self.completer():
+                return ''
+
+    def attendre(self, attendus: str) -> str:
+        """Consommer un caractère parmi `attendus`"""
+        c = self.caractere()
+        if not c or c not in attendus:
+            raise ErreurFormat(f"'{attendus}' attendu, trouvé {c!r}")
+        self.pos += 1
+        return c
+
+    def valeur(self) -> Any:
+        """Décoder la prochaine valeur JSON complète"""
+        self.caractere()
+        while True:
+            try:
+                valeur, fin = self.decodeur.raw_decode(self.tampon, self.pos)
+            except ValueError:
+                # Valeur coupée par la fin du tampon : lire la suite
+                if len(self.tampon) - self.pos < TAILLE_MAX_ELEMENT and self.completer():
+                    continue
+                raise
+            if fin == len(self.tampon) and self.completer():
+                continue  # Un nombre pourrait se poursuivre dans le morceau suivant
+            self.pos = fin
+            return valeur
+
+
+def iterer_tableau(fichier: str,
+                   cle: Union[str, Tuple[str, ...], None] = None,
+                   taille_morceau: int = TAILLE_MORCEAU) -> Iterator[Tuple[int, Any]]:
+    """
+    Lire les éléments d'un tableau JSON un par un
+
+    Args:
+        fichier: Chemin du fichier
+        cle: Si donnée, le tableau est la valeur de cette clé (ou de la
+             première de ces clés) dans l'objet racine (ex. 'produits') ;
+             les autres clés sont ignorées
+        taille_morceau: Taille des lectures
+
+    Yields:
+        (position dans le tableau, élément décodé)
+    """
+    cles = (cle,) if isinstance(cle, str) else cle
+    with ouvrir_texte(fichier) as f:
+        lecteur = _Lecteur(f, taille_morceau)
+
+        if cles is not None:
+            lecteur.attendre('{')
+            while True:
+                if lecteur.caractere() == '}':
+                    raise ErreurFormat(f"Clé '{cles[0]}' absente")
+                nom = lecteur.valeur()
+                lecteur.attendre(':')
+                if nom in cles:
+                    break
+                lecteur.valeur()  # Valeur ignorée
+                if lecteur.attendre(',}') == '}':
+                    raise ErreurFormat(f"Clé '{cles[0]}' absente")
+
+        lecteur.attendre('[')
+        if lecteur.caractere() == ']':
+            return
+        numero = 0
+        while True:
+            numero += 1
+            yield numero, lecteur.valeur()
+            if lecteur.attendre(',]') == ']':
+                return
+
+
+def iterer_produits(fichier: str, format: Optional[str] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Lire les enregistrements d'un fichier de produits, quel que soit son format
+
+    Args:
+        fichier: Chemin du fichier
+        format: 'lignes', 'tableau', 'objet' (détecté si None)
+    """
+    format = format or detecter_format(fichier)
+    if format == 'lignes':
+        return iterer_lignes(fichier)
+    if format == 'tableau':
+        return iterer_tableau(fichier)
+    if format == 'objet':
+        return iterer_tableau(fichier, cle=CLES_PRODUITS)
+    raise ErreurFormat(f"Format inconnu : {format!r}")
+
+
+# ============================================================================
+# CHARGEMENT DANS UN AGENT
+# ============================================================================
+
+def charger_fichier(agent,
+                    fichier: str,
+                    taille_lot: Optional[int] = None,
+                    progression: Optional[Callable[[RapportChargement], None]] = None,
+                    format: Optional[str] = None,
+                    nb_processus: Optional[int] = None) -> RapportChargement:
+    """
+    Charger un fichier de produits dans un agent, par lots, en flux
+
+    Args:
+        agent: AgentProduitUniversel cible
+        fichier: Chemin du fichier (JSON Lines, tableau ou {"produits": [...]})
+        taille_lot: Nombre de produits ajoutés (et scorés) ensemble
+        progression: Fonction appelée avec le rapport après chaque lot
+        format: cf. `iterer_produits`
+        nb_processus: Construire et scorer les produits sur plusieurs
+                      processus (cf. agents/parallele.py) ; pour un
+                      fichier JSON Lines, le décodage est aussi parallélisé
+
+    Returns:
+        RapportChargement (les erreurs par enregistrement y sont
+        consignées au lieu d'être affichées)
+    """
+    rapport = RapportChargement()
+
+    format = format or detecter_format(fichier)
+    if nb_processus and nb_processus > 1 and format == 'lignes':
+        lecture = iterer_lignes_brutes(fichier)
+    else:
+        lecture = iterer_produits(fichier, format)
+
+    def enregistrements() -> Iterator[Tuple[int, Dict]]:
+        try:
+            for numero, data in lecture:
+                rapport.nb_lus += 1
+                # Les enregistrements illisibles suivent le flux (une
+                # exception) : les rejets sont signalés dans l'ordre
+                if isinstance(data, (str, Exception)):
+                    yield numero, data  # Ligne brute, décodée par un processus
+                elif not isinstance(data, dict):
+                    yield numero, ErreurFormat("objet JSON attendu")
+                elif 'metadata' in data and 'nom' not in data:
+                    rapport.nb_lus -= 1  # En-tête d'un export JSON Lines
+                else:
+                    for champ in CHAMPS_CALCULES:
+                        data.pop(champ, None)
+                    yield numero, data
+        except ValueError as e:
+            # Fichier mal formé : on garde ce qui a été lu
+            rapport.erreur_fatale = str(e)
+
+    def apres_lot(nb_ajoutes: int):
+        rapport.nb_ajoutes += nb_ajoutes
+        if progression is not None:
+            progression(rapport)
+
+    agent._ajouter_flux(enregistrements(), rapport.signaler, apres_lot, taille_lot, nb_processus)
+    return rapport
+
+
+# ============================================================================
+# ÉCRITURE
+# ============================================================================
+
+def ecrire_export(fichier: str,
+                  entete: Dict[str, Any],
+                  produits: Iterable[Dict],
+                  format: str = 'json',
+                  compression: Optional[str] = None) -> int:
+    """
+    Écrire un export produit par produit, à mémoire constante
+
+    Args:
+        fichier: Chemin du fichier (.gz / .zst : compressé)
+        entete: Clés écrites avant les produits (metadata, statistiques...)
+        produits: Flux de dicts produits (écrits dans 'tous_produits'), ou
+                  de produits déjà encodés en JSON (chaînes écrites telles
+                  quelles, cf. Produit.to_json)
+        format: 'json' (un objet, un produit par ligne dans
+                'tous_produits') ou 'jsonl' (en-tête sur la première
+                ligne, puis un produit par ligne)
+        compression: 'gzip', 'zstd', None (déduite de l'extension)
+
+    Returns:
+        Nombre de produits écrits
+    """
+    if format not in ('json', 'jsonl'):
+        raise ValueError(f"Format d'export inconnu : {format!r}")
+
+    encoder = json.JSONEncoder(ensure_ascii=False).encode
+
+    def encoder_produit(produit) -> str:
+        return produit if isinstance(produit, str) else encoder(produit)
+
+    nb = 0
+    with ouvrir_texte(fichier, 'w', compression) as f:
+        if format == 'jsonl':
+            f.write(encoder(entete) + '\n')
+        else:
+            f.write('{\n')
+            for cle, valeur in entete.items():
+                f.write(f'  {encoder(cle)}: {encoder(valeur)},\n')
+            f.write('  "tous_produits": [\n')
+
+        for bloc in _par_blocs(produits, TAILLE_BLOC_ECRITURE):
+            if format == 'jsonl':
+                f.write('\n'.join(map(encoder_produit, bloc)) + '\n')
+            else:
+                f.write((',\n' if nb else '') + ',\n'.join(map(encoder_produit, bloc)))
+            nb += len(bloc)
+
+        if format == 'json':
+            f.write('\n  ]\n}\n')
+    return nb
+
+
+def _par_blocs(elements: Iterable, taille: int) -> Iterator[List]:
+    """Regrouper un flux en listes de `taille` éléments"""
+    bloc = []
+    for element in elements:
+        bloc.append(element)
+        if len(bloc) >= taille:
+            yield bloc
+            bloc = []
+    if bloc:
+        yield bloc
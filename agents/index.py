@@ -0,0 +1,327 @@
+"""
+INDEX DE L'AGENT
+================
+
+Structures d'index maintenues par `AgentProduitUniversel` pour éviter de
+re-parcourir (ou re-trier) tout le catalogue à chaque requête.
+
+Les index travaillent sur les identifiants de produits (leur position
+dans le stockage) et se synchronisent paresseusement : les produits
+ajoutés depuis la dernière requête sont intégrés au moment de la
+requête suivante, en une seule passe.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Critères de tri : critère -> (champ, ordre décroissant)
+CRITERES_TRI: Dict[str, Tuple[str, bool]] = {
+    'score': ('score', True),
+    'prix': ('prix', False),
+    'note': ('note', True),
+    'popularite': ('nb_avis', True),
+}
+
+# Au-delà de ce nombre de nouveaux produits, l'index est refusionné en
+# bloc plutôt que par insertions successives
+SEUIL_INSERTIONS = 64
+
+
+# ============================================================================
+# SÉLECTION PARTIELLE
+# ============================================================================
+
+def top_ids(ids: Iterable[int], n: int, critere: str, acces) -> List[int]:
+    """
+    Sélectionner les n meilleurs identifiants selon un critère (tas)
+
+    Complexité O(N log n), même ordre qu'un tri stable complet.
+
+    Args:
+        ids: Identifiants candidats (dans l'ordre d'insertion)
+        n: Nombre d'identifiants à retourner
+        critere: 'score', 'prix', 'note', 'popularite'
+        acces: Fonction (champ) -> (fonction i -> valeur), cf. stockage.acces
+    """
+    if critere not in CRITERES_TRI:
+        return list(ids)[:n]
+
+    champ, decroissant = CRITERES_TRI[critere]
+    valeur = acces(champ)
+    if decroissant:
+        return heapq.nsmallest(n, ids, key=lambda i: (-valeur(i), i))
+    return heapq.nsmallest(n, ids, key=lambda i: (valeur(i), i))
+
+
+# ============================================================================
+# INDEX TRIÉ
+# ============================================================================
+
+class IndexTrie:
+    """
+    Identifiants de produits triés selon un champ numérique
+
+    Les égalités sont départagées par ordre d'insertion, comme avec un
+    tri stable. Les clés sont conservées (négativées pour un ordre
+    décroissant) pour permettre les insertions par bisection.
+
+    Attributs :
+        champ: Champ trié ('score', 'prix', 'note', 'nb_avis')
+        decroissant: Ordre décroissant
+        ids: Identifiants triés (array('q'))
+        cles: Clé de tri de chaque identifiant de `ids` (array('d'))
+    """
+
+    def __init__(self, champ: str, decroissant: bool = False):
+        self.champ = champ
+        self.decroissant = decroissant
+        self.vider()
+
+    def vider(self):
+        """Oublier tous les produits indexés"""
+        self.ids = array('q')
+        self.cles = array('d')
+        self.nb_indexes = 0
+
+    def synchroniser(self, stockage):
+        """Intégrer les produits ajoutés au stockage depuis le dernier appel"""
+        n = len(stockage)
+        if n < self.nb_indexes:
+            # Le stockage a été vidé puis rempli à nouveau
+            self.vider()
+        if n == self.nb_indexes:
+            return
+
+        nouveaux = n - self.nb_indexes
+        if nouveaux <= SEUIL_INSERTIONS:
+            self._inserer(stockage.colonne(self.champ, self.nb_indexes))
+        else:
+            self._refusionner(stockage.colonne(self.champ))
+        self.nb_indexes = n
+
+    def _rendre_modifiable(self):
+        """Copier en mémoire un index lu dans un instantané (cf. agents/instantane.py)"""
+        if not isinstance(self.ids, array):
+            self.ids = array('q', self.ids.tolist())
+            self.cles = array('d', self.cles.tolist())
+
+    def _inserer(self, valeurs):
+        """Insérer quelques produits par bisection"""
+        self._rendre_modifiable()
+        signe = -1 if self.decroissant else 1
+        for i, valeur in enumerate(valeurs, self.nb_indexes):
+            cle = signe * valeur
+            # bisect_right : un nouveau produit passe après ses égaux
+            position = bisect_right(self.cles, cle)
+            self.cles.insert(position, cle)
+            self.ids.insert(position, i)
+
+    def modifier(self, i: int, ancienne: float, nouvelle: float):
+        """
+        Déplacer un produit déjà indexé après un changement de valeur
+
+        Les positions sont trouvées par bisection (à clé égale, les
+        identifiants sont croissants). Pour un petit déplacement, seuls
+        les produits rangés entre l'ancienne et la nouvelle position
+        sont décalés ; sinon l'entrée est retirée puis réinsérée. Un
+        produit pas encore indexé sera intégré à la prochaine
+        synchronisation.
+        """
+        if i >= self.nb_indexes or ancienne == nouvelle:
+            return
+        self._rendre_modifiable()
+        signe = -1 if self.decroissant else 1
+        cle = signe * nouvelle
+        depart = self._position(signe * ancienne, i)
+        arrivee = self._position(cle, i)
+        cles, ids = self.cles, self.ids
+        # Décalage : copie puis recopie de l'écart ; retrait et
+        # réinsertion : déplacement de la fin du tableau, deux fois
+        if 2 * abs(arrivee - depart) > 2 * len(cles) - depart - arrivee:
+            del cles[depart]
+            del ids[depart]
+            if arrivee > depart:
+                arrivee -= 1
+            cles.insert(arrivee, cle)
+            ids.insert(arrivee, i)
+            return
+        if arrivee > depart:
+            # L'ancienne entrée libère une place avant la nouvelle position
+            arrivee -= 1
+            cles[depart:arrivee] = cles[depart + 1:arrivee + 1]
+            ids[depart:arrivee] = ids[depart + 1:arrivee + 1]
+        else:
+            cles[arrivee + 1:depart + 1] = cles[arrivee:depart]
+            ids[arrivee + 1:depart + 1] = ids[arrivee:depart]
+        cles[arrivee] = cle
+        ids[arrivee] = i
+
+    def _position(self, cle: float, i: int) -> int:
+        """Position de l'identifiant i parmi les produits de clé `cle`"""
+        debut = bisect_left(self.cles, cle)
+        fin = bisect_right(self.cles, cle, debut)
+        return bisect_left(self.ids, i, debut, fin)
+
+    def _refusionner(self, valeurs):
+        """
+        Refusionner l'index avec un gros bloc de nouveaux produits
+
+        Les identifiants déjà triés forment une séquence que le tri de
+        Python (timsort) fusionne en temps quasi linéaire.
+        """
+        candidats = self.ids.tolist()
+        candidats.extend(range(self.nb_indexes, len(valeurs)))
+        ordre = sorted(candidats, key=valeurs.__getitem__, reverse=self.decroissant)
+
+        self.ids = array('q', ordre)
+        if self.decroissant:
+            self.cles = array('d', [-valeurs[i] for i in ordre])
+        else:
+            self.cles = array('d', [valeurs[i] for i in ordre])
+
+    def bornes(self, valeur_min: Optional[float] = None,
+               valeur_max: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Positions [debut, fin) des produits dont la valeur est dans
+        l'intervalle [valeur_min, valeur_max] (bornes incluses), par bisection
+        """
+        if self.decroissant:
+            valeur_min, valeur_max = (
+                None if valeur_max is None else -valeur_max,
+                None if valeur_min is None else -valeur_min,
+            )
+        debut = 0 if valeur_min is None else bisect_left(self.cles, valeur_min)
+        fin = len(self.cles) if valeur_max is None else bisect_right(self.cles, valeur_max)
+        return debut, max(debut, fin)
+
+    def plage(self, valeur_min: Optional[float] = None,
+              valeur_max: Optional[float] = None) -> List[int]:
+        """Identifiants dont la valeur est dans [valeur_min, valeur_max], par ordre d'insertion"""
+        debut, fin = self.bornes(valeur_min, valeur_max)
+        return sorted(self.ids[debut:fin])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+# ============================================================================
+# INDEX INVERSÉS
+# ============================================================================
+
+class IndexInverse:
+    """
+    Index inversé : terme (en minuscules) -> identifiants des produits
+
+    Les listes d'identifiants (array('q')) sont en ordre d'insertion.
+    Les sous-classes définissent les termes d'un produit via `_termes`.
+
+    Attributs :
+        champ: Champ indexé
+        postings: Dictionnaire terme -> identifiants
+    """
+
+    def __init__(self, champ: str):
+        self.champ = champ
+        self.vider()
+
+    def vider(self):
+        """Oublier tous les produits indexés"""
+        self.postings: Dict[str, array] = {}
+        self.nb_indexes = 0
+
+    def synchroniser(self, stockage):
+        """Intégrer les produits ajoutés au stockage depuis le dernier appel"""
+        n = len(stockage)
+        if n < self.nb_indexes:
+            self.vider()
+        if n == self.nb_indexes:
+            return
+
+        postings = self.postings
+        for i, valeur in enumerate(stockage.colonne(self.champ, self.nb_indexes), self.nb_indexes):
+            for terme in self._termes(valeur):
+                ids = postings.get(terme)
+                if ids is None:
+                    ids = postings[terme] = array('q')
+                    self._nouveau_terme(terme)
+                ids.append(i)
+        self.nb_indexes = n
+
+    def _termes(self, valeur) -> Iterable[str]:
+        """Termes indexés pour une valeur du champ"""
+        return (valeur.lower(),)
+
+    def _nouveau_terme(self, terme: str):
+        """Appelé la première fois qu'un terme apparaît"""
+
+    def ids(self, termes: Iterable[str]) -> List[int]:
+        """Identifiants ayant au moins un des termes, par ordre d'insertion"""
+        listes = [self.postings[t] for t in set(termes) if t in self.postings]
+        if not listes:
+            return []
+        if len(listes) == 1:
+            return listes[0].tolist()
+        return sorted(set().union(*listes))
+
+
+class IndexMarques(IndexInverse):
+    """Index marque (insensible à la casse) -> identifiants"""
+
+    def __init__(self):
+        super().__init__('marque')
+
+    def rechercher(self, marques: Iterable[str]) -> List[int]:
+        """Identifiants des produits des marques données"""
+        return self.ids(m.lower() for m in marques)
+
+
+class IndexCaracteristiques(IndexInverse):
+    """
+    Index caractéristique -> identifiants, avec recherche par sous-chaîne
+
+    Chaque caractéristique distincte (en minuscules) est un terme. Pour
+    les recherches par sous-chaîne ("5G", "128gb"...), un index de
+    trigrammes sur le vocabulaire réduit les termes à vérifier : seuls
+    les termes contenant tous les trigrammes de la recherche sont testés.
+    """
+
+    def __init__(self):
+        super().__init__('caracteristiques')
+
+    def vider(self):
+        super().vider()
+        self.trigrammes: Dict[str, set] = {}
+
+    def _termes(self, valeur) -> Iterable[str]:
+        return set(c.lower() for c in valeur)
+
+    def _nouveau_terme(self, terme: str):
+        for trigramme in _trigrammes(terme):
+            self.trigrammes.setdefault(trigramme, set()).add(terme)
+
+    def termes_contenant(self, sous_chaine: str) -> List[str]:
+        """Termes du vocabulaire contenant la sous-chaîne (en minuscules)"""
+        sous_chaine = sous_chaine.lower()
+        if len(sous_chaine) < 3:
+            candidats = self.postings
+        else:
+            ensembles = []
+            for trigramme in _trigrammes(sous_chaine):
+                ensemble = self.trigrammes.get(trigramme)
+                if not ensemble:
+                    return []
+                ensembles.append(ensemble)
+            ensembles.sort(key=len)
+            candidats = set(ensembles[0]).intersection(*ensembles[1:])
+        return [t for t in candidats if sous_chaine in t]
+
+    def rechercher(self, sous_chaine: str) -> List[int]:
+        """Identifiants des produits dont une caractéristique contient la sous-chaîne"""
+        return self.ids(self.termes_contenant(sous_chaine))
+
+
+def _trigrammes(texte: str) -> set:
+    return set(texte[k:k + 3] for k in range(len(texte) - 2))
@@ -0,0 +1,278 @@
+"""
+INSTANTANÉS BINAIRES
+====================
+
+Sauvegarde compacte des produits d'un agent, rouverte en quelques
+millisecondes quelle que soit la taille du catalogue :
+
+    agent.sauvegarder_instantane('data/catalogue.inst')
+    ...
+    agent = AgentProduitUniversel.depuis_instantane('data/catalogue.inst')
+
+Le fichier reprend la disposition du stockage colonnaire
+(cf. StockageColonnes) :
+
+- colonnes numériques à largeur fixe (prix, note, score... codes des
+  marques et sources, caractéristiques en « offsets + codes ») ;
+- colonnes de chaînes en « offsets + octets UTF-8 » (noms, URLs, dates,
+  extra en JSON) ;
+- tables de chaînes (marques, sources, caractéristiques) ;
+- index triés déjà construits et statistiques courantes de l'agent.
+
+Il est écrit en une passe (sections alignées sur 8 octets, description
+JSON en fin de fichier) et ouvert par `mmap` : les colonnes sont lues
+sans copie ni décodage, chaque chaîne n'est décodée qu'à sa lecture.
+Rien n'est converti en `Produit` à l'ouverture.
+
+Disposition :
+    MAGIE | sections... | description JSON | taille de la description (8 o) | MAGIE
+"""
+
+from array import array
+from collections.abc import Sequence
+from datetime import datetime
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .index import IndexTrie
+from .statistiques import StatistiquesCourantes
+from .stockage import COLONNES_TEXTE, COLONNES_TYPEES, StockageColonnes, TableCategories
+
+
+MAGIE = b'PRODINST'
+VERSION_INSTANTANE = 1
+
+# Tables de chaînes du stockage colonnaire (nom de section -> attribut)
+_TABLES = {'table_marques': 'marques', 'table_sources': 'sources',
+           'table_caracteristiques': 'table_caracteristiques'}
+
+
+class ErreurInstantane(ValueError):
+    """Fichier d'instantané invalide ou incompatible"""
+
+
+# ============================================================================
+# COLONNES DE CHAÎNES
+# ============================================================================
+
+class ColonneTexte(Sequence):
+    """
+    Colonne de chaînes lue dans un instantané : offsets (N+1) et octets
+    UTF-8, décodés à la lecture de chaque élément
+    """
+
+    def __init__(self, offsets: memoryview, octets: memoryview,
+                 decoder: Optional[Callable[[str], Any]] = None):
+        self._offsets = offsets
+        self._octets = octets
+        self._decoder = decoder
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _lire(self, i: int):
+        texte = str(self._octets[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+        return self._decoder(texte) if self._decoder is not None else texte
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._lire(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index hors limites")
+        return self._lire(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._lire(i)
+
+
+def _decoder_extra(texte: str) -> Optional[Dict[str, Any]]:
+    return json.loads(texte) if texte else None
+
+
+def _encoder_extra(extra: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(extra, ensure_ascii=False, default=str) if extra else ''
+
+
+# ============================================================================
+# ÉCRITURE
+# ============================================================================
+
+class _Ecrivain:
+    """Écriture séquentielle des sections, alignées sur 8 octets"""
+
+    def __init__(self, f):
+        self.f = f
+        self.position = 0
+        self.sections: Dict[str, Tuple[str, int, int]] = {}
+        self._ecrire(MAGIE)
+
+    def _ecrire(self, donnees):
+        self.f.write(donnees)
+        self.position += memoryview(donnees).nbytes
+
+    def _aligner(self):
+        reste = self.position % 8
+        if reste:
+            self._ecrire(b'\0' * (8 - reste))
+
+    def tableau(self, nom: str, code: str, valeurs):
+        """Section numérique (array ou memoryview du même type)"""
+        if not isinstance(valeurs, (array, memoryview)):
+            valeurs = array(code, valeurs)
+        self._aligner()
+        self.sections[nom] = (code, self.position, len(valeurs))
+        self._ecrire(memoryview(valeurs).cast('B'))
+
+    def textes(self, nom: str, valeurs: Iterable[str]):
+        """Section de chaînes : offsets (N+1) puis octets UTF-8"""
+        offsets = array('Q', [0])
+        morceaux = []
+        taille = 0
+        for valeur in valeurs:
+            octets = ('' if valeur is None else str(valeur)).encode('utf-8')
+            morceaux.append(octets)
+            taille += len(octets)
+            offsets.append(taille)
+        self.tableau(nom + '.offsets', 'Q', offsets)
+        self.sections[nom + '.octets'] = ('B', self.position, taille)
+        self._ecrire(b''.join(morceaux))
+
+
+def ecrire_instantane(stockage, fichier: str,
+                      index_tries: Optional[Dict[str, IndexTrie]] = None,
+                      statistiques: Optional[StatistiquesCourantes] = None,
+                      metadata: Optional[Dict[str, Any]] = None):
+    """
+    Écrire un instantané binaire (remplacement atomique du fichier)
+
+    Args:
+        stockage: Stockage à sauvegarder (converti en colonnes si besoin)
+        fichier: Fichier à écrire
+        index_tries: Index triés à jour à sauvegarder (critère -> index)
+        statistiques: Statistiques courantes à jour à sauvegarder
+        metadata: Informations libres (JSON), ex. type de produit
+    """
+    if not isinstance(stockage, StockageColonnes):
+        colonnes = StockageColonnes()
+        colonnes.ajouter_lot(list(stockage.produits))
+        stockage = colonnes
+
+    description = {
+        'version': VERSION_INSTANTANE,
+        'ordre_octets': sys.byteorder,
+        'nb': len(stockage),
+        'date': datetime.now().isoformat(),
+        'metadata': metadata or {},
+        'index': {},
+        'statistiques': statistiques.etat() if statistiques is not None else None,
+    }
+
+    temporaire = fichier + '.tmp'
+    with open(temporaire, 'wb') as f:
+        ecrivain = _Ecrivain(f)
+        for nom, code in COLONNES_TYPEES.items():
+            ecrivain.tableau(nom, code, getattr(stockage, nom))
+        for nom in COLONNES_TEXTE:
+            valeurs = getattr(stockage, nom)
+            if nom == 'extra':
+                valeurs = map(_encoder_extra, valeurs)
+            ecrivain.textes(nom, valeurs)
+        for section, attribut in _TABLES.items():
+            ecrivain.textes(section, getattr(stockage, attribut).valeurs)
+
+        for critere, index in (index_tries or {}).items():
+            description['index'][critere] = [index.champ, index.decroissant]
+            ecrivain.tableau(f'index.{critere}.ids', 'q', index.ids)
+            ecrivain.tableau(f'index.{critere}.cles', 'd', index.cles)
+
+        description['sections'] = ecrivain.sections
+        entete = json.dumps(description, ensure_ascii=False).encode('utf-8')
+        f.write(entete)
+        f.write(struct.pack('<Q', len(entete)))
+        f.write(MAGIE)
+    os.replace(temporaire, fichier)
+
+
+# ============================================================================
+# LECTURE
+# ============================================================================
+
+class Instantane:
+    """
+    Instantané ouvert (projection mémoire du fichier)
+
+    Attributs :
+        stockage: StockageColonnes en lecture seule sur le fichier
+        index_tries: Index triés sauvegardés (critère -> IndexTrie)
+        statistiques: Statistiques courantes sauvegardées (ou None)
+        metadata: Informations libres de l'écriture
+    """
+
+    def __init__(self, fichier: str):
+        with open(fichier, 'rb') as f:
+            self._projection = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        memoire = memoryview(self._projection)
+
+        taille = len(memoire)
+        if (taille < 2 * len(MAGIE) + 8 or memoire[:len(MAGIE)] != MAGIE
+                or memoire[taille - len(MAGIE):] != MAGIE):
+            raise ErreurInstantane(f"{fichier} : ce n'est pas un instantané de produits")
+        fin = taille - len(MAGIE) - 8
+        (taille_entete,) = struct.unpack('<Q', memoire[fin:fin + 8])
+        description = json.loads(str(memoire[fin - taille_entete:fin], 'utf-8'))
+        if description['version'] != VERSION_INSTANTANE:
+            raise ErreurInstantane(f"{fichier} : version {description['version']} non prise en charge")
+        if description['ordre_octets'] != sys.byteorder:
+            raise ErreurInstantane(f"{fichier} : écrit sur une machine d'ordre d'octets différent")
+
+        sections = description['sections']
+
+        def tableau(nom):
+            code, debut, nb = sections[nom]
+            taille = nb * array(code).itemsize
+            return memoire[debut:debut + taille].cast(code)
+
+        def textes(nom, decoder=None):
+            return ColonneTexte(tableau(nom + '.offsets'), tableau(nom + '.octets'), decoder)
+
+        stockage = StockageColonnes()
+        for nom in COLONNES_TYPEES:
+            setattr(stockage, nom, tableau(nom))
+        for nom in COLONNES_TEXTE:
+            setattr(stockage, nom, textes(nom, _decoder_extra if nom == 'extra' else None))
+        for section, attribut in _TABLES.items():
+            table = TableCategories()
+            for valeur in textes(section):
+                table.code(valeur)
+            setattr(stockage, attribut, table)
+        stockage.lecture_seule = True
+        self.stockage = stockage
+
+        n = description['nb']
+        self.index_tries: Dict[str, IndexTrie] = {}
+        for critere, (champ, decroissant) in description['index'].items():
+            index = IndexTrie(champ, decroissant)
+            index.ids = tableau(f'index.{critere}.ids')
+            index.cles = tableau(f'index.{critere}.cles')
+            index.nb_indexes = n
+            self.index_tries[critere] = index
+
+        self.statistiques = None
+        if description['statistiques'] is not None:
+            self.statistiques = StatistiquesCourantes.depuis_etat(description['statistiques'])
+            self.statistiques.nb_indexes = n
+
+        self.metadata = description['metadata']
+        self.date = description['date']
+
+
+def ouvrir_instantane(fichier: str) -> Instantane:
+    """Ouvrir un instantané écrit par `ecrire_instantane`"""
+    return Instantane(fichier)
@@ -0,0 +1,291 @@
+"""
+INSTRUMENTATION
+===============
+
+Compteurs et chronomètres des opérations de l'agent, pour savoir où
+passe le temps en production :
+
+    agent = AgentProduitUniversel("smartphone", instrumentation=True)
+    ...
+    print(agent.metriques())                        # dict par opération
+    print(agent.metriques(format='prometheus'))     # texte Prometheus
+
+Chaque opération mesurée cumule son nombre d'appels, d'éléments
+traités et sa durée (totale et maximale) :
+
+- les méthodes publiques de l'agent (obtenir_top, filtrer_par_*,
+  exporter_json, ...), durées incluant les appels imbriqués ;
+- les phases internes : 'scoring' (score des lots ajoutés),
+  'deduplication', 'stockage' (insertion), 'index:<champ>' (tri et
+  mise à jour des index), 'serialisation' (produits exportés).
+
+Désactivée (par défaut), l'instrumentation ne coûte rien aux méthodes
+publiques (elles ne sont enveloppées que sur un agent instrumenté) et
+un test par lot ou par index aux phases internes.
+
+Profilage par échantillonnage, à la demande :
+
+    with agent.instrumentation.profiler() as profil:
+        agent.obtenir_recommandations(budget_max=500)
+    print(profil.plus_frequents(10))
+    open('profil.txt', 'w').write(profil.piles_repliees())   # flamegraph
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from functools import wraps
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Intervalle entre deux échantillons du profileur (s)
+INTERVALLE_PROFILAGE = 0.005
+
+# Nombre maximal de cadres conservés par pile échantillonnée
+PROFONDEUR_PILE = 64
+
+
+# ============================================================================
+# COMPTEURS
+# ============================================================================
+
+@dataclass
+class Mesure:
+    """Cumul des appels d'une opération"""
+    appels: int = 0
+    elements: int = 0
+    duree: float = 0.0
+    duree_max: float = 0.0
+
+    def ajouter(self, duree: float, elements: int = 0):
+        self.appels += 1
+        self.elements += elements
+        self.duree += duree
+        if duree > self.duree_max:
+            self.duree_max = duree
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'appels': self.appels,
+            'elements': self.elements,
+            'duree': self.duree,
+            'duree_max': self.duree_max,
+            'duree_moyenne': self.duree / self.appels if self.appels else 0.0,
+        }
+
+
+class _Chrono:
+    """Chronomètre d'une opération (cf. Instrumentation.mesurer)"""
+
+    __slots__ = ('mesure', 'horloge', 'elements', 'debut')
+
+    def __init__(self, mesure: Mesure, horloge: Callable[[], float], elements: int):
+        self.mesure = mesure
+        self.horloge = horloge
+        self.elements = elements
+
+    def __enter__(self) -> '_Chrono':
+        self.debut = self.horloge()
+        return self
+
+    def __exit__(self, *exc):
+        self.mesure.ajouter(self.horloge() - self.debut, self.elements)
+        return False
+
+
+class Instrumentation:
+    """
+    Compteurs (appels, éléments, durée) par opération
+
+    Attributs :
+        mesures: Mesure de chaque opération, par nom
+    """
+
+    def __init__(self, horloge: Callable[[], float] = time.perf_counter):
+        self._horloge = horloge
+        self.mesures: Dict[str, Mesure] = {}
+
+    def mesure(self, nom: str) -> Mesure:
+        """Mesure d'une opération (créée au premier appel)"""
+        mesure = self.mesures.get(nom)
+        if mesure is None:
+            mesure = self.mesures[nom] = Mesure()
+        return mesure
+
+    def mesurer(self, nom: str, elements: int = 0) -> _Chrono:
+        """
+        Chronométrer un bloc
+
+        Exemple:
+            with instrumentation.mesurer('scoring', len(lot)) as chrono:
+                ...
+                chrono.elements = nb_valides   # si connu à la fin
+        """
+        return _Chrono(self.mesure(nom), self._horloge, elements)
+
+    def envelopper(self, nom: str, fonction: Callable,
+                   elements: Optional[Callable[[Any], int]] = None) -> Callable:
+        """
+        Fonction mesurée à chaque appel
+
+        Args:
+            nom: Nom de l'opération
+            fonction: Fonction à mesurer
+            elements: Nombre d'éléments traités, déduit du résultat
+                      (défaut : aucun)
+        """
+        mesure = self.mesure(nom)
+        horloge = self._horloge
+
+        @wraps(fonction)
+        def mesuree(*args, **kwargs):
+            debut = horloge()
+            resultat = fonction(*args, **kwargs)
+            mesure.ajouter(horloge() - debut,
+                           0 if elements is None else elements(resultat))
+            return resultat
+
+        return mesuree
+
+    def vider(self):
+        """Remettre tous les compteurs à zéro"""
+        self.mesures.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Compteurs de chaque opération (durées en secondes)"""
+        return {nom: mesure.to_dict() for nom, mesure in sorted(self.mesures.items())}
+
+    def prometheus(self, prefixe: str = 'agent',
+                   etiquettes: Optional[Dict[str, str]] = None) -> str:
+        """
+        Compteurs au format texte de Prometheus (une série par opération)
+
+        Args:
+            prefixe: Préfixe des noms de métriques
+            etiquettes: Étiquettes ajoutées à chaque série
+                        (ex. {'type_produit': 'smartphone'})
+        """
+        communes = ''.join(f'{cle}="{_echapper(valeur)}",'
+                           for cle, valeur in (etiquettes or {}).items())
+        series = [
+            ('appels_total', 'counter', "Nombre d'appels", 'appels'),
+            ('elements_total', 'counter', "Nombre d'éléments traités", 'elements'),
+            ('duree_secondes_total', 'counter', 'Durée cumulée (s)', 'duree'),
+            ('duree_max_secondes', 'gauge', "Durée du plus long appel (s)", 'duree_max'),
+        ]
+        lignes = []
+        for suffixe, type_serie, aide, champ in series:
+            nom = f'{prefixe}_{suffixe}'
+            lignes.append(f'# HELP {nom} {aide}')
+            lignes.append(f'# TYPE {nom} {type_serie}')
+            for operation, mesure in sorted(self.mesures.items()):
+                lignes.append(f'{nom}{{{communes}operation="{_echapper(operation)}"}} '
+                              f'{getattr(mesure, champ)!r}')
+        return '\n'.join(lignes) + '\n'
+
+    def profiler(self, intervalle: float = INTERVALLE_PROFILAGE,
+                 profondeur: int = PROFONDEUR_PILE) -> 'Profileur':
+        """Profileur par échantillonnage du thread courant (cf. Profileur)"""
+        return Profileur(intervalle, profondeur)
+
+
+def _echapper(valeur) -> str:
+    """Valeur d'étiquette Prometheus échappée"""
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# ============================================================================
+# PROFILAGE PAR ÉCHANTILLONNAGE
+# ============================================================================
+
+class Profileur:
+    """
+    Profileur par échantillonnage d'un thread
+
+    Un thread relève la pile du thread profilé à intervalle régulier
+    (sys._current_frames) : le coût ne dépend pas du nombre d'appels
+    de fonctions, contrairement à cProfile, et rien n'est installé sur
+    le thread profilé. Le thread d'échantillonnage attend le verrou
+    global de l'interpréteur : la résolution réelle est bornée par
+    sys.getswitchinterval() (5 ms par défaut).
+
+    Attributs :
+        echantillons: Nombre d'échantillons par pile (tuple de fonctions
+                      "fichier:ligne fonction", ligne de définition,
+                      de l'appelant à l'appelé)
+        nb_echantillons: Nombre total d'échantillons
+    """
+
+    def __init__(self, intervalle: float = INTERVALLE_PROFILAGE,
+                 profondeur: int = PROFONDEUR_PILE):
+        self.intervalle = intervalle
+        self.profondeur = profondeur
+        self.echantillons: Counter = Counter()
+        self.nb_echantillons = 0
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def demarrer(self, ident: Optional[int] = None) -> 'Profileur':
+        """Démarrer l'échantillonnage d'un thread (défaut : thread courant)"""
+        if self._thread is not None:
+            raise RuntimeError("Profileur déjà démarré")
+        cible = threading.get_ident() if ident is None else ident
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._echantillonner, args=(cible,),
+                                        name='profileur', daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self) -> 'Profileur':
+        """Arrêter l'échantillonnage (les échantillons sont conservés)"""
+        if self._thread is not None:
+            self._arret.set()
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def __enter__(self) -> 'Profileur':
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+        return False
+
+    def _echantillonner(self, cible: int):
+        while not self._arret.wait(self.intervalle):
+            cadre = sys._current_frames().get(cible)
+            if cadre is None:
+                continue
+            pile = []
+            while cadre is not None and len(pile) < self.profondeur:
+                code = cadre.f_code
+                pile.append(f'{code.co_filename}:{code.co_firstlineno} {code.co_name}')
+                cadre = cadre.f_back
+            pile.reverse()
+            self.echantillons[tuple(pile)] += 1
+            self.nb_echantillons += 1
+
+    def plus_frequents(self, n: int = 10, cumul: bool = False) -> List[Tuple[str, float]]:
+        """
+        Fonctions les plus souvent échantillonnées, avec leur part du temps
+
+        Args:
+            n: Nombre de fonctions retournées
+            cumul: Compter une fonction présente n'importe où dans la pile
+                   (temps inclusif) plutôt qu'en sommet de pile seulement
+        """
+        compte: Counter = Counter()
+        for pile, nb in self.echantillons.items():
+            if cumul:
+                for cadre in set(pile):
+                    compte[cadre] += nb
+            elif pile:
+                compte[pile[-1]] += nb
+        total = self.nb_echantillons or 1
+        return [(cadre, nb / total) for cadre, nb in compte.most_common(n)]
+
+    def piles_repliees(self) -> str:
+        """Piles au format replié (« a;b;c 12 », lu par flamegraph.pl / speedscope)"""
+        return ''.join(f"{';'.join(pile)} {nb}\n" for pile, nb in self.echantillons.most_common())
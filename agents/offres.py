@@ -0,0 +1,262 @@
+"""
+OFFRES MULTI-SITES
+==================
+
+Vue regroupée des offres d'un même produit vendu par plusieurs sites :
+
+    for groupe in agent.obtenir_offres():
+        print(groupe.nom, groupe.prix_min, groupe.prix_median, groupe.meilleure_source)
+
+    top = agent.obtenir_top(n=5, par_offre=True)   # classés par meilleure offre
+
+Un produit (identité) regroupe les lignes de même marque et de même nom
+normalisé (casse, accents, unités, ordre des mots, cf.
+agents/deduplication.py), quel que soit leur site. Les offres d'un
+groupe sont ses lignes, plus celles rangées dans `extra['offres']` par
+la déduplication.
+
+L'identité de chaque ligne est calculée une seule fois (IndexOffres,
+tenu à jour comme les autres index de l'agent) : regrouper une
+sélection est ensuite une passe unique sur un dictionnaire, sans
+re-parcours du catalogue pour chaque produit.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+import heapq
+from statistics import median
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .deduplication import MOTS_VIDES, normaliser, normaliser_marque
+from .stockage import TableCategories
+
+
+# ============================================================================
+# IDENTITÉ D'UN PRODUIT
+# ============================================================================
+
+def cle_produit(nom: str, marque: str) -> str:
+    """
+    Identité d'un produit, indépendante du site qui le vend
+
+    Exemple:
+        cle_produit('Galaxy S23 - 128 Go', 'SAMSUNG')
+        # 'samsung|128gb galaxy s23'
+        cle_produit('Samsung S23 Galaxy 128GB', 'Samsung')
+        # 'samsung|128gb galaxy s23'
+    """
+    marque = normaliser_marque(marque)
+    ignores = MOTS_VIDES.union(marque.split())
+    jetons = sorted(set(j for j in normaliser(nom) if j not in ignores))
+    return marque + '|' + ' '.join(jetons)
+
+
+class IndexOffres:
+    """
+    Identité (code entier) de chaque produit, pour regrouper les offres
+
+    Attributs :
+        codes: Code d'identité de chaque identifiant (array('I'))
+        identites: Table code -> clé d'identité (cf. cle_produit)
+    """
+
+    def __init__(self):
+        self.vider()
+
+    def vider(self):
+        """Oublier tous les produits indexés"""
+        self.codes = array('I')
+        self.identites = TableCategories()
+        self.nb_indexes = 0
+
+    def synchroniser(self, stockage):
+        """Intégrer les produits ajoutés au stockage depuis le dernier appel"""
+        n = len(stockage)
+        if n < self.nb_indexes:
+            self.vider()
+        if n == self.nb_indexes:
+            return
+
+        code = self.identites.code
+        noms = stockage.colonne('nom', self.nb_indexes)
+        marques = stockage.colonne('marque', self.nb_indexes)
+        self.codes.extend(code(cle_produit(nom, marque)) for nom, marque in zip(noms, marques))
+        self.nb_indexes = n
+
+
+# ============================================================================
+# OFFRES ET GROUPES
+# ============================================================================
+
+class Offre(NamedTuple):
+    """Offre d'un site pour un produit (n-uplet : une par ligne regroupée)"""
+    source: str
+    nom: str
+    marque: str
+    prix: float
+    note: float
+    nb_avis: int
+    stock: bool
+    url: str
+    id: int  # Ligne du catalogue qui porte l'offre
+    score: Optional[float] = None  # Score de la ligne à ce prix, si connu
+
+
+@dataclass
+class OffresProduit:
+    """
+    Offres d'un même produit, triées par prix croissant
+
+    Attributs :
+        id: Ligne portant la meilleure offre (produit représentatif)
+        nom, marque: Nom et marque de cette ligne
+        offres: Offres retenues (au moins une)
+    """
+    id: int
+    nom: str
+    marque: str
+    offres: List[Offre] = field(default_factory=list)
+
+    @property
+    def meilleure_offre(self) -> Offre:
+        """Offre la moins chère"""
+        return self.offres[0]
+
+    @property
+    def prix_min(self) -> float:
+        return self.offres[0].prix
+
+    @property
+    def prix_median(self) -> float:
+        return median(o.prix for o in self.offres)
+
+    @property
+    def meilleure_source(self) -> str:
+        """Site le mieux noté (le moins cher en cas d'égalité)"""
+        return max(self.offres, key=lambda o: o.note).source
+
+    @property
+    def sources(self) -> List[str]:
+        return [o.source for o in self.offres]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir en dictionnaire"""
+        return {
+            'nom': self.nom,
+            'marque': self.marque,
+            'nb_offres': len(self.offres),
+            'prix_min': self.prix_min,
+            'prix_median': self.prix_median,
+            'meilleure_offre': {'source': self.meilleure_offre.source,
+                                'prix': self.prix_min,
+                                'url': self.meilleure_offre.url},
+            'meilleure_source': self.meilleure_source,
+            'offres': [{'source': o.source, 'prix': o.prix, 'note': o.note,
+                        'stock': o.stock, 'url': o.url} for o in self.offres],
+        }
+
+
+def _lignes(stockage, ids: List[int]) -> Iterator[tuple]:
+    """(nom, marque, prix, note, nb_avis, score, stock, source, url, extra) des produits donnés"""
+    if getattr(stockage, 'sql', False):
+        # Lecture par paquets plutôt qu'une requête par champ et par produit
+        for d in stockage.dicts_produits(ids):
+            yield (d['nom'], d['marque'], d['prix'], d['note'], d['nb_avis'],
+                   d['score_qualite_prix'], d['stock'], d['source'], d['url'], d['extra'])
+        return
+    acces = [stockage.acces(champ) for champ in
+             ('nom', 'marque', 'prix', 'note', 'nb_avis', 'score', 'stock', 'source', 'url', 'extra')]
+    yield from zip(*(map(valeur, ids) for valeur in acces))
+
+
+def regrouper_offres(stockage, codes, ids: Iterable[int],
+                     en_stock: bool = True) -> List[OffresProduit]:
+    """
+    Regrouper les offres des produits donnés par identité, en une passe
+
+    Args:
+        stockage: Stockage des produits
+        codes: Code d'identité de chaque identifiant (cf. IndexOffres)
+        ids: Produits à regrouper
+        en_stock: Ne retenir que les offres disponibles (les produits
+                  sans offre disponible sont écartés)
+
+    Returns:
+        Groupes, dans l'ordre de première apparition
+    """
+    ids = list(ids)
+    par_code: Dict[int, List[Offre]] = {}
+    for i, ligne in zip(ids, _lignes(stockage, ids)):
+        nom, marque, prix, note, nb_avis, score, stock, source, url, extra = ligne
+        offres = par_code.get(codes[i])
+        if offres is None:
+            offres = par_code[codes[i]] = []
+        offres_sites = extra.get('offres') if extra else None
+        if offres_sites:
+            # Fiche fusionnée par la déduplication : une offre par site
+            for site, o in offres_sites.items():
+                prix_site = o.get('prix', prix)
+                offres.append(Offre(site, nom, marque, prix_site,
+                                    o.get('note', note), o.get('nb_avis', nb_avis),
+                                    bool(o.get('stock', stock)), o.get('url', ''), i,
+                                    score if prix_site == prix else None))
+        else:
+            offres.append(Offre(source, nom, marque, prix, note, nb_avis, bool(stock),
+                                url, i, score))
+
+    groupes = []
+    for offres in par_code.values():
+        if en_stock:
+            offres = [o for o in offres if o.stock]
+            if not offres:
+                continue
+        if len(offres) > 1:
+            offres.sort(key=lambda o: o.prix)
+        meilleure = offres[0]
+        groupes.append(OffresProduit(meilleure.id, meilleure.nom, meilleure.marque, offres))
+    return groupes
+
+
+# ============================================================================
+# CLASSEMENT PAR MEILLEURE OFFRE
+# ============================================================================
+
+def cle_classement(critere: str, stockage) -> Callable[[OffresProduit], Tuple]:
+    """
+    Clé de tri (croissante) des groupes selon un critère
+
+    - 'prix' : prix de la meilleure offre
+    - 'score' : score du produit représentatif, recalculé au prix de la
+      meilleure offre
+    - 'note' : note du site le mieux noté
+    - 'popularite' : total des avis sur tous les sites
+    """
+    if critere == 'prix':
+        return lambda g: (g.prix_min, g.id)
+    if critere == 'note':
+        return lambda g: (-max(o.note for o in g.offres), g.id)
+    if critere == 'popularite':
+        return lambda g: (-sum(o.nb_avis for o in g.offres), g.id)
+    if critere != 'score':
+        return lambda g: (g.id,)
+
+    def score(groupe: OffresProduit) -> float:
+        if groupe.meilleure_offre.score is not None:
+            return groupe.meilleure_offre.score
+        # Meilleure offre d'un autre site, rangée dans une fiche fusionnée
+        produit = stockage.produit(groupe.id)
+        profil = produit.profil
+        return profil.score(produit.note, groupe.prix_min, produit.nb_avis,
+                            len(produit.caracteristiques),
+                            produit.extra.get('prix_reference',
+                                              profil.reference_prix(produit.marque)))
+
+    return lambda g: (-score(g), g.id)
+
+
+def top_offres(groupes: Iterable[OffresProduit], n: int, critere: str, stockage,
+               budget_max: Optional[float] = None) -> List[OffresProduit]:
+    """Les n meilleurs groupes selon un critère, meilleure offre dans le budget"""
+    if budget_max is not None:
+        groupes = (g for g in groupes if g.prix_min <= budget_max)
+    return heapq.nsmallest(max(n, 0), groupes, key=cle_classement(critere, stockage))
@@ -0,0 +1,246 @@
+"""
+INGESTION PARALLÈLE
+===================
+
+Ajout de produits en masse sur plusieurs processus :
+
+    agent.ajouter_produits_depuis_dict(produits, nb_processus=4)
+    agent.ajouter_produits_depuis_json('catalogue.jsonl', nb_processus=4)
+
+Les enregistrements sont découpés en lots. Chaque processus valide ses
+lots, construit et score les produits, puis renvoie un lot préparé en
+colonnes (listes de valeurs simples, rapides à transmettre) plutôt que
+des objets `Produit`. Le processus principal intègre les lots dans
+l'ordre d'entrée : le catalogue obtenu est identique à celui d'un ajout
+séquentiel.
+
+Pour un fichier JSON Lines, les lignes sont transmises brutes et décodées
+dans les processus : le décodage JSON est lui aussi parallélisé.
+
+⚠️ Mode expérimental : le gain n'est pas démontré. Aucune mesure n'a
+encore été faite sur plusieurs cœurs ; la seule disponible, sur un cœur,
+donne 0,96x (100 000 produits, 2 processus), soit un léger
+ralentissement. Le processus principal reste chargé de la lecture et de
+l'intégration des lots. À mesurer sur la machine cible avec
+benchmarks/bench_ingestion.py avant de l'activer.
+
+⚠️ Sous Windows et macOS, le script appelant doit être protégé par
+`if __name__ == "__main__":` (les processus réimportent le module).
+"""
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .flux import CHAMPS_CALCULES
+from .produit import Produit
+from .scoring import ProfilScoring, scorer_produits
+
+
+# Colonnes d'un lot préparé, dans l'ordre
+COLONNES_LOT = ('nom', 'marque', 'prix', 'note', 'nb_avis', 'caracteristiques', 'url',
+                'source', 'image_url', 'stock', 'date_ajout', 'extra', 'score')
+
+
+class LotPrepare(NamedTuple):
+    """
+    Lot de produits construits et scorés par un processus
+
+    Attributs :
+        colonnes: Une liste de valeurs par champ de COLONNES_LOT ; les
+                  caractéristiques sont encodées en (vocabulaire,
+                  offsets, codes), cf. `encoder_caracteristiques`
+        erreurs: Enregistrements rejetés (numéro, nom, message)
+    """
+    colonnes: Tuple[list, ...]
+    erreurs: List[Tuple[int, str, str]]
+
+    def __len__(self):
+        return len(self.colonnes[0])
+
+
+def nb_processus_defaut() -> int:
+    """Nombre de processus par défaut : nombre de cœurs disponibles"""
+    return os.cpu_count() or 1
+
+
+def encoder_caracteristiques(listes: List[List[str]]) -> Tuple[List[str], array, array]:
+    """
+    Encoder des listes de caractéristiques en (vocabulaire, offsets, codes)
+
+    Les caractéristiques se répètent d'un produit à l'autre : chacune
+    n'est transmise qu'une fois, le reste tient dans deux tableaux typés.
+    """
+    vocabulaire: List[str] = []
+    index = {}
+    offsets = array('Q', [0])
+    codes = array('I')
+    for liste in listes:
+        for c in liste:
+            code = index.get(c)
+            if code is None:
+                code = index[c] = len(vocabulaire)
+                vocabulaire.append(c)
+            codes.append(code)
+        offsets.append(len(codes))
+    return vocabulaire, offsets, codes
+
+
+def decoder_caracteristiques(encodees: Tuple[List[str], array, array]) -> List[List[str]]:
+    """Inverse de `encoder_caracteristiques`"""
+    vocabulaire, offsets, codes = encodees
+    return [[vocabulaire[c] for c in codes[offsets[k]:offsets[k + 1]]]
+            for k in range(len(offsets) - 1)]
+
+
+def produits_depuis_colonnes(colonnes,
+                             profil: Optional[ProfilScoring] = None) -> List[Produit]:
+    """Reconstruire les `Produit` (déjà scorés avec ce profil) d'un lot en colonnes"""
+    (noms, marques, prix, notes, nb_avis, caracteristiques, urls,
+     sources, images, stocks, dates, extras, scores) = colonnes
+    caracteristiques = decoder_caracteristiques(caracteristiques)
+    produits = []
+    for k in range(len(noms)):
+        produit = Produit(
+            nom=noms[k], marque=marques[k], prix=prix[k], note=notes[k],
+            nb_avis=nb_avis[k], caracteristiques=caracteristiques[k],
+            url=urls[k], source=sources[k], image_url=images[k],
+            stock=stocks[k], date_ajout=dates[k], extra=extras[k] or {}
+        )
+        produit._score = scores[k]
+        produit._profil = profil
+        produits.append(produit)
+    return produits
+
+
+# ============================================================================
+# TRAVAIL D'UN PROCESSUS
+# ============================================================================
+
+def preparer_lot(enregistrements: List[Tuple[int, object]],
+                 profil: Optional[ProfilScoring] = None) -> LotPrepare:
+    """
+    Construire et scorer un lot de produits (exécuté dans un processus)
+
+    Args:
+        enregistrements: (numéro, dict produit) ; une chaîne est une ligne
+                         JSON Lines brute, décodée ici (les champs calculés
+                         d'un export y sont ignorés, comme au chargement),
+                         une exception un enregistrement illisible
+        profil: Profil de scoring de l'agent (cf. agents/scoring.py)
+
+    Returns:
+        LotPrepare
+    """
+    erreurs = []
+    produits, numeros = [], []
+    for numero, data in enregistrements:
+        nom = '?'
+        try:
+            if isinstance(data, Exception):
+                raise data
+            if isinstance(data, str):
+                data = json.loads(data)
+                if not isinstance(data, dict):
+                    raise ValueError("objet JSON attendu")
+                for champ in CHAMPS_CALCULES:
+                    data.pop(champ, None)
+            if isinstance(data, dict):
+                nom = data.get('nom', '?')
+            produits.append(Produit(**data))
+            numeros.append(numero)
+        except Exception as e:
+            erreurs.append((numero, nom, str(e)))
+
+    rejetes = dict(scorer_produits(produits, profil=profil))
+    for k, e in rejetes.items():
+        erreurs.append((numeros[k], produits[k].nom, str(e)))
+    if rejetes:
+        erreurs.sort(key=lambda erreur: erreur[0])
+        produits = [p for k, p in enumerate(produits) if k not in rejetes]
+
+    colonnes = (
+        [p.nom for p in produits],
+        [p.marque for p in produits],
+        [p.prix for p in produits],
+        [p.note for p in produits],
+        [p.nb_avis for p in produits],
+        encoder_caracteristiques([p.caracteristiques for p in produits]),
+        [p.url for p in produits],
+        [p.source for p in produits],
+        [p.image_url for p in produits],
+        [p.stock for p in produits],
+        [p.date_ajout for p in produits],
+        [p.extra or None for p in produits],
+        [p._score for p in produits],
+    )
+    return LotPrepare(colonnes, erreurs)
+
+
+# ============================================================================
+# ORCHESTRATION
+# ============================================================================
+
+def signaler_rejets(rejets: Iterable[Tuple[int, str, str]],
+                    signaler: Callable[[int, str, str], None]):
+    """Signaler des rejets (numéro, nom, message) dans l'ordre des numéros"""
+    for numero, nom, message in sorted(rejets, key=lambda rejet: rejet[0]):
+        signaler(numero, nom, message)
+
+
+def lots(enregistrements: Iterable, taille_lot: int) -> Iterator[list]:
+    """Regrouper un flux d'enregistrements en lots de `taille_lot`"""
+    lot = []
+    for enregistrement in enregistrements:
+        lot.append(enregistrement)
+        if len(lot) >= taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def ajouter_en_parallele(agent,
+                         enregistrements: Iterable[Tuple[int, object]],
+                         signaler: Callable[[int, str, str], None],
+                         apres_lot: Optional[Callable[[int], None]],
+                         taille_lot: int,
+                         nb_processus: int) -> int:
+    """
+    Ajouter des enregistrements à un agent, lots préparés en parallèle
+
+    Au plus deux lots par processus sont en cours à la fois : la mémoire
+    reste bornée quelle que soit la taille du flux.
+
+    Args:
+        agent: AgentProduitUniversel cible
+        enregistrements: Flux de (numéro, dict produit ou ligne JSON)
+        signaler: Fonction (numéro, nom, message) pour chaque rejet
+        apres_lot: Fonction appelée avec le nombre de produits ajoutés
+                   après chaque lot (optionnel)
+        taille_lot: Nombre d'enregistrements par lot
+        nb_processus: Nombre de processus
+
+    Returns:
+        Nombre de produits ajoutés
+    """
+    count = 0
+    en_cours = deque()
+    with ProcessPoolExecutor(nb_processus) as pool:
+        def integrer(lot_prepare: LotPrepare) -> int:
+            signaler_rejets(lot_prepare.erreurs, signaler)
+            ajoutes = agent._integrer_colonnes(lot_prepare.colonnes)
+            if apres_lot is not None:
+                apres_lot(ajoutes)
+            return ajoutes
+
+        for lot in lots(enregistrements, taille_lot):
+            en_cours.append(pool.submit(preparer_lot, lot, agent.profil))
+            if len(en_cours) >= 2 * nb_processus:
+                count += integrer(en_cours.popleft().result())
+        while en_cours:
+            count += integrer(en_cours.popleft().result())
+    return count
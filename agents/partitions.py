@@ -0,0 +1,428 @@
+"""
+AGENTS PARTITIONNÉS
+===================
+
+Répartir un catalogue sur plusieurs agents (partitions) :
+
+    agent = AgentPartitionne(nb_partitions=4, cle='marque')
+    agent.ajouter_produits_depuis_dict(produits)
+    top = agent.obtenir_top(n=5, budget_max=500)
+
+Chaque partition calcule un résultat partiel (top N local, agrégats,
+candidats de recommandation) ; la fusion des partiels donne exactement
+le résultat d'un agent unique. Les égalités sont départagées par une
+séquence globale (l'ordre d'ajout), comme dans un agent unique.
+
+Les partiels sont des dicts JSON : les partitions peuvent tourner dans
+d'autres processus ou sur d'autres machines.
+
+    # Sur chaque machine
+    partiel = partition.partiel_top(n=5, budget_max=500)
+    envoyer(json.dumps(partiel))
+
+    # Sur le coordinateur
+    top = fusionner_top(partiels, n=5)
+"""
+
+from array import array
+from bisect import bisect_right
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .agent_universel import AgentProduitUniversel, TAILLE_LOT
+from .flux import RapportChargement
+from .index import CRITERES_TRI, top_ids
+from .parallele import signaler_rejets
+from .produit import Produit
+from .scoring import ProfilScoring
+from .statistiques import StatistiquesCourantes
+
+
+# Version du format des résultats partiels
+VERSION_PARTIEL = 1
+
+# Sans séquence globale, la séquence d'un produit est
+# (numéro de partition << BITS_SEQUENCE) + position dans la partition
+BITS_SEQUENCE = 40
+
+
+# ============================================================================
+# CLÉS DE PARTITIONNEMENT
+# ============================================================================
+
+def _hachage(texte: str) -> int:
+    """Hachage stable d'une chaîne (identique d'un processus à l'autre)"""
+    return zlib.crc32(texte.encode('utf-8'))
+
+
+def partitionneur(cle: Union[str, Callable[[Dict], int]],
+                  nb_partitions: int,
+                  bornes_prix: Optional[List[float]] = None) -> Callable[[Dict], int]:
+    """
+    Fonction dict produit -> numéro de partition
+
+    Args:
+        cle: 'source' ou 'marque' (hachage stable, la marque sans tenir
+             compte de la casse), 'prix' (tranches de prix), ou une
+             fonction dict -> numéro de partition
+        nb_partitions: Nombre de partitions
+        bornes_prix: Pour cle='prix', les nb_partitions - 1 bornes
+                     croissantes séparant les tranches
+    """
+    if callable(cle):
+        return cle
+    if cle == 'source':
+        return lambda data: _hachage(data.get('source', '')) % nb_partitions
+    if cle == 'marque':
+        return lambda data: _hachage(str(data.get('marque', '')).lower()) % nb_partitions
+    if cle == 'prix':
+        if bornes_prix is None or len(bornes_prix) != nb_partitions - 1:
+            raise ValueError(f"cle='prix' : {nb_partitions - 1} bornes de prix attendues")
+        bornes = sorted(bornes_prix)
+        return lambda data: bisect_right(bornes, data.get('prix', 0))
+    raise ValueError(f"Clé de partitionnement inconnue : {cle!r} (choix : source, marque, prix)")
+
+
+# ============================================================================
+# PARTITION
+# ============================================================================
+
+class Partition:
+    """
+    Un agent local et la séquence globale de chacun de ses produits
+
+    Attributs :
+        numero: Numéro de la partition
+        agent: AgentProduitUniversel local
+        sequences: Séquence globale de chaque produit local (array('q'))
+    """
+
+    def __init__(self, numero: int = 0, type_produit: str = "produit", stockage='liste'):
+        self.numero = numero
+        self.agent = AgentProduitUniversel(type_produit, stockage)
+        self.sequences = array('q')
+
+    def ajouter_produits_depuis_dict(self,
+                                     produits_data: Iterable[Dict],
+                                     sequences: Optional[Iterable[int]] = None,
+                                     signaler: Optional[Callable] = None) -> int:
+        """
+        Ajouter des produits à la partition
+
+        Args:
+            produits_data: Dicts produits
+            sequences: Séquence globale de chaque dict (par défaut : numéro
+                       de partition puis ordre d'ajout)
+            signaler: Fonction (numéro, nom, erreur) pour chaque rejet,
+                      numéro = position dans produits_data (optionnel)
+
+        Returns:
+            Nombre de produits ajoutés
+        """
+        produits_data = list(produits_data)
+        if sequences is None:
+            base = (self.numero << BITS_SEQUENCE) + len(self.agent)
+            sequences = range(base, base + len(produits_data))
+        sequences = list(sequences)
+
+        rejetes = set()
+
+        def noter(numero, nom, erreur):
+            rejetes.add(numero)
+            if signaler is not None:
+                signaler(numero, nom, erreur)
+
+        ajoutes = self.agent._ajouter_flux(enumerate(produits_data), noter,
+                                           taille_lot=len(produits_data) or None)
+        self.sequences.extend(s for k, s in enumerate(sequences) if k not in rejetes)
+        return ajoutes
+
+    def vider(self):
+        """Vider la partition"""
+        self.agent.vider()
+        self.sequences = array('q')
+
+    # ------------------------------------------------------------------
+    # Résultats partiels
+    # ------------------------------------------------------------------
+
+    def _produit_serialise(self, i: int) -> Dict[str, Any]:
+        stockage = self.agent._stockage
+        data = stockage.dict_produit(i)
+        data['image_url'] = stockage.acces('image_url')(i)
+        data['date_ajout'] = stockage.acces('date_ajout')(i)
+        return data
+
+    def _entree(self, i: int, valeur) -> list:
+        """[valeur de tri, séquence, produit] pour un identifiant local"""
+        return [valeur, self.sequences[i], self._produit_serialise(i)]
+
+    def partiel_top(self,
+                    n: int = 3,
+                    budget_max: Optional[float] = None,
+                    critere: str = 'score') -> Dict[str, Any]:
+        """Top N local (cf. AgentProduitUniversel.obtenir_top)"""
+        requete = self.agent.requete().prix(max=budget_max).top(n, critere)
+        champ = CRITERES_TRI[critere][0] if critere in CRITERES_TRI else None
+        valeur = self.agent._stockage.acces(champ) if champ else (lambda i: None)
+        return {
+            'version': VERSION_PARTIEL,
+            'type': 'top',
+            'critere': critere,
+            'produits': [self._entree(i, valeur(i)) for i in requete.ids()],
+        }
+
+    def partiel_statistiques(self) -> Dict[str, Any]:
+        """Agrégats locaux (cf. StatistiquesCourantes.etat)"""
+        return {
+            'version': VERSION_PARTIEL,
+            'type': 'statistiques',
+            'statistiques': self.agent.statistiques_courantes().etat(),
+        }
+
+    def partiel_recommandations(self,
+                                budget_max: Optional[float] = None,
+                                marques_preferees: Optional[List[str]] = None,
+                                note_min: float = 3.5,
+                                top_n: int = 3) -> Dict[str, Any]:
+        """Candidats locaux (cf. AgentProduitUniversel.obtenir_recommandations)"""
+        requete = self.agent.requete().note_min(note_min)
+        if budget_max:
+            requete = requete.prix(max=budget_max)
+        if marques_preferees:
+            requete = requete.marques(marques_preferees)
+        ids = requete.ids()
+
+        acces = self.agent._stockage.acces
+        score, prix, note = acces('score'), acces('prix'), acces('note')
+        top = top_ids(ids, top_n, 'score', acces)
+        meilleur_prix = min(ids, key=prix) if ids else None
+        meilleure_note = max(ids, key=note) if ids else None
+
+        return {
+            'version': VERSION_PARTIEL,
+            'type': 'recommandations',
+            'nb_produits_trouves': len(ids),
+            'top': [self._entree(i, score(i)) for i in top],
+            'meilleur_prix': None if meilleur_prix is None else self._entree(meilleur_prix, prix(meilleur_prix)),
+            'meilleure_note': None if meilleure_note is None else self._entree(meilleure_note, note(meilleure_note)),
+            'criteres': {
+                'budget_max': budget_max,
+                'marques_preferees': marques_preferees,
+                'note_min': note_min
+            }
+        }
+
+    def __len__(self):
+        return len(self.agent)
+
+
+# ============================================================================
+# FUSION DES RÉSULTATS PARTIELS
+# ============================================================================
+
+def _verifier(partiels: Iterable[Dict], type_partiel: str) -> List[Dict]:
+    partiels = list(partiels)
+    for partiel in partiels:
+        if partiel.get('version') != VERSION_PARTIEL or partiel.get('type') != type_partiel:
+            raise ValueError(f"Résultat partiel '{type_partiel}' v{VERSION_PARTIEL} attendu")
+    return partiels
+
+
+def _cle_tri(critere: str) -> Callable[[list], Tuple]:
+    """Clé de tri d'une entrée [valeur, séquence, produit]"""
+    if critere in CRITERES_TRI and CRITERES_TRI[critere][1]:
+        return lambda entree: (-entree[0], entree[1])
+    if critere in CRITERES_TRI:
+        return lambda entree: (entree[0], entree[1])
+    return lambda entree: entree[1]
+
+
+def produit_depuis_dict(data: Dict[str, Any], profil: Optional[ProfilScoring] = None) -> Produit:
+    """Reconstruire un `Produit` depuis un produit sérialisé (score conservé)"""
+    champs = {k: v for k, v in data.items() if k not in ('score_qualite_prix', 'categorie_prix')}
+    produit = Produit(**champs)
+    produit._score = data['score_qualite_prix']
+    produit._profil = profil
+    return produit
+
+
+def fusionner_top(partiels: Iterable[Dict], n: int) -> List[Dict[str, Any]]:
+    """Top N global (produits sérialisés) à partir des tops locaux"""
+    partiels = _verifier(partiels, 'top')
+    if not partiels:
+        return []
+    entrees = [e for partiel in partiels for e in partiel['produits']]
+    entrees.sort(key=_cle_tri(partiels[0]['critere']))
+    return [e[2] for e in entrees[:max(n, 0)]]
+
+
+def fusionner_statistiques(partiels: Iterable[Dict], quantiles: bool = False) -> Dict[str, Any]:
+    """
+    Statistiques globales à partir des agrégats locaux
+
+    Les sommes étant additionnées dans un autre ordre, les moyennes
+    peuvent différer d'un agent unique au dernier chiffre près.
+    """
+    stats = StatistiquesCourantes()
+    for partiel in _verifier(partiels, 'statistiques'):
+        stats.fusionner(StatistiquesCourantes.depuis_etat(partiel['statistiques']))
+    return stats.to_dict(quantiles)
+
+
+def fusionner_recommandations(partiels: Iterable[Dict], top_n: int = 3) -> Dict[str, Any]:
+    """Recommandations globales (format de obtenir_recommandations)"""
+    partiels = _verifier(partiels, 'recommandations')
+    top = sorted((e for p in partiels for e in p['top']), key=_cle_tri('score'))[:top_n]
+    meilleurs_prix = [p['meilleur_prix'] for p in partiels if p['meilleur_prix']]
+    meilleures_notes = [p['meilleure_note'] for p in partiels if p['meilleure_note']]
+    meilleur_prix = min(meilleurs_prix, key=_cle_tri('prix')) if meilleurs_prix else None
+    meilleure_note = min(meilleures_notes, key=_cle_tri('note')) if meilleures_notes else None
+
+    return {
+        'nb_produits_trouves': sum(p['nb_produits_trouves'] for p in partiels),
+        'top_recommandations': [e[2] for e in top],
+        'meilleur_produit': top[0][2] if top else None,
+        'meilleur_prix': meilleur_prix[2] if meilleur_prix else None,
+        'meilleure_note': meilleure_note[2] if meilleure_note else None,
+        'criteres': partiels[0]['criteres'] if partiels else {}
+    }
+
+
+# ============================================================================
+# AGENT PARTITIONNÉ (PARTITIONS LOCALES)
+# ============================================================================
+
+class AgentPartitionne:
+    """
+    Agent réparti sur plusieurs partitions, même interface de requête
+    qu'un AgentProduitUniversel (obtenir_top, obtenir_statistiques,
+    obtenir_recommandations)
+
+    Exemple:
+        agent = AgentPartitionne(4, cle='prix', bornes_prix=[100, 300, 800])
+        agent.ajouter_produits_depuis_dict(produits)
+        print(agent.obtenir_statistiques())
+    """
+
+    def __init__(self,
+                 nb_partitions: int,
+                 cle: Union[str, Callable[[Dict], int]] = 'marque',
+                 bornes_prix: Optional[List[float]] = None,
+                 type_produit: str = "produit",
+                 stockage='liste'):
+        """
+        Args:
+            nb_partitions: Nombre de partitions
+            cle: Clé de partitionnement (cf. `partitionneur`)
+            bornes_prix: Bornes des tranches pour cle='prix'
+            type_produit: Type de produit (pour logs et rapports)
+            stockage: Stockage de chaque partition ('liste', 'colonnes')
+        """
+        self.type_produit = type_produit
+        self.partitions = [Partition(k, type_produit, stockage) for k in range(nb_partitions)]
+        self._partition_de = partitionneur(cle, nb_partitions, bornes_prix)
+        self._sequence = 0
+
+    def ajouter_produits_depuis_dict(self,
+                                     produits_data: Iterable[Dict],
+                                     taille_lot: Optional[int] = None) -> int:
+        """
+        Répartir des produits entre les partitions
+
+        Les produits rejetés sont affichés en fin d'ajout, dans l'ordre
+        des données (cf. AgentProduitUniversel.ajouter_produits_depuis_dict),
+        et non au fil du remplissage des partitions.
+
+        Returns:
+            Nombre de produits ajoutés
+        """
+        taille_lot = taille_lot or TAILLE_LOT
+        # Par partition : dicts, séquences globales et numéros d'enregistrement
+        tampons: Dict[int, Tuple[list, list, list]] = {}
+        rejets: List[Tuple[int, str, str]] = []
+        count = 0
+
+        def vider_tampon(numero: int) -> int:
+            lot, sequences, numeros = tampons.pop(numero)
+            return self.partitions[numero].ajouter_produits_depuis_dict(
+                lot, sequences, lambda k, nom, e: rejets.append((numeros[k], nom, str(e))))
+
+        for numero_enregistrement, data in enumerate(produits_data, 1):
+            try:
+                numero = self._partition_de(data)
+            except Exception as e:
+                nom = data.get('nom', '?') if isinstance(data, dict) else '?'
+                rejets.append((numero_enregistrement, nom, str(e)))
+                continue
+            lot, sequences, numeros = tampons.setdefault(numero, ([], [], []))
+            lot.append(data)
+            sequences.append(self._sequence)
+            numeros.append(numero_enregistrement)
+            self._sequence += 1
+            if len(lot) >= taille_lot:
+                count += vider_tampon(numero)
+
+        for numero in sorted(tampons):
+            count += vider_tampon(numero)
+
+        rapport = RapportChargement()
+        signaler_rejets(rejets, rapport.signaler)
+        rapport.afficher_erreurs(f"{rapport.nb_erreurs} produit(s) ignoré(s)")
+        return count
+
+    def ajouter_produit(self, nom: str, marque: str, prix: float, **kwargs) -> Optional[Produit]:
+        """
+        Ajouter un produit (cf. AgentProduitUniversel.ajouter_produit)
+
+        Returns:
+            Le produit ajouté, ou None s'il est rejeté (le rejet est
+            affiché, cf. ajouter_produits_depuis_dict)
+        """
+        data = dict(nom=nom, marque=marque, prix=prix, **kwargs)
+        if not self.ajouter_produits_depuis_dict([data]):
+            return None
+        partition = self.partitions[self._partition_de(data)]
+        return partition.agent._stockage.produit(len(partition) - 1)
+
+    def obtenir_top(self,
+                    n: int = 3,
+                    budget_max: Optional[float] = None,
+                    critere: str = 'score') -> List[Produit]:
+        """Top N global (fusion des tops locaux)"""
+        partiels = [p.partiel_top(n, budget_max, critere) for p in self.partitions]
+        profil = self.partitions[0].agent.profil if self.partitions else None
+        return [produit_depuis_dict(d, profil) for d in fusionner_top(partiels, n)]
+
+    def obtenir_statistiques(self, quantiles: bool = False) -> Dict[str, Any]:
+        """Statistiques globales (fusion des agrégats locaux)"""
+        return fusionner_statistiques([p.partiel_statistiques() for p in self.partitions], quantiles)
+
+    def obtenir_recommandations(self,
+                                budget_max: Optional[float] = None,
+                                marques_preferees: Optional[List[str]] = None,
+                                note_min: float = 3.5,
+                                top_n: int = 3) -> Dict[str, Any]:
+        """Recommandations globales (fusion des candidats locaux)"""
+        partiels = [p.partiel_recommandations(budget_max, marques_preferees, note_min, top_n)
+                    for p in self.partitions]
+        return fusionner_recommandations(partiels, top_n)
+
+    def appliquer_profil(self, profil) -> int:
+        """Changer le profil de scoring de toutes les partitions (cf.
+        AgentProduitUniversel.appliquer_profil), retourne le nombre de
+        produits rescorés"""
+        return sum(p.agent.appliquer_profil(profil) for p in self.partitions)
+
+    def vider(self):
+        """Vider toutes les partitions"""
+        for partition in self.partitions:
+            partition.vider()
+        self._sequence = 0
+
+    def __len__(self):
+        return sum(len(p) for p in self.partitions)
+
+    def __repr__(self):
+        return (f"<AgentPartitionne({self.type_produit}): {len(self)} produits, "
+                f"{len(self.partitions)} partitions>")
@@ -0,0 +1,196 @@
+"""
+PRODUIT UNIVERSEL
+=================
+
+Classe de données représentant un produit (quel que soit son type),
+avec son score qualité/prix calculé automatiquement.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+import json
+
+from .scoring import PROFIL_DEFAUT, ProfilScoring
+
+
+# Encodage JSON compact des produits (celui des exports en flux)
+encoder_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+# ============================================================================
+# CATÉGORIES DE PRIX
+# ============================================================================
+
+def categorie_prix(prix: float, profil: Optional[ProfilScoring] = None) -> str:
+    """Catégoriser un prix selon les tranches du profil (cf. ProfilScoring)"""
+    return (profil or PROFIL_DEFAUT).categorie(prix)
+
+
+# ============================================================================
+# CLASSES DE DONNÉES
+# ============================================================================
+
+@dataclass
+class Produit:
+    """
+    Classe universelle pour représenter N'IMPORTE QUEL produit
+    
+    Attributs obligatoires :
+        nom: Nom du produit
+        marque: Marque
+        prix: Prix en euros
+    
+    Attributs optionnels (adaptez selon vos besoins) :
+        note: Note utilisateurs (sur 5)
+        nb_avis: Nombre d'avis
+        caracteristiques: Liste de caractéristiques
+        url: Lien vers le produit
+        source: D'où vient le produit
+        image_url: URL de l'image
+        stock: Disponibilité
+        ... ajoutez ce que vous voulez !
+    
+    Le produit d'un agent se modifie par `agent.mettre_a_jour()` : les
+    index de l'agent ne voient pas une réaffectation directe d'un champ.
+    """
+    # Obligatoires
+    nom: str
+    marque: str
+    prix: float
+    
+    # Optionnels (avec valeurs par défaut)
+    note: float = 4.0
+    nb_avis: int = 0
+    caracteristiques: List[str] = field(default_factory=list)
+    url: str = ""
+    source: str = ""
+    image_url: str = ""
+    stock: bool = True
+    
+    # Métadonnées (automatiques)
+    date_ajout: str = field(default_factory=lambda: datetime.now().isoformat())
+    
+    # Attributs personnalisés (dict flexible)
+    extra: Dict[str, Any] = field(default_factory=dict)
+    
+    def __post_init__(self):
+        """Le score est calculé à la première lecture (ou en lot par l'agent)"""
+        self._score = None
+        self._serialisation = None
+        self._profil = None  # Profil de scoring de l'agent (None : PROFIL_DEFAUT)
+    
+    @property
+    def profil(self) -> ProfilScoring:
+        """Profil de scoring du produit (celui de son agent)"""
+        return self._profil or PROFIL_DEFAUT
+    
+    @property
+    def score_qualite_prix(self) -> float:
+        """Score qualité/prix calculé automatiquement"""
+        if self._score is None:
+            self._score = self._calculer_score()
+        return self._score
+    
+    def _calculer_score(self) -> float:
+        """
+        Calcule un score de 0 à 100
+        
+        Système de scoring adaptatif :
+        - 40% : Note utilisateurs
+        - 30% : Prix (bonus si raisonnable)
+        - 20% : Nombre d'avis (popularité)
+        - 10% : Bonus caractéristiques
+        
+        PERSONNALISABLE : poids et seuils du profil de scoring
+        (cf. ProfilScoring dans `agents/scoring.py`) !
+        """
+        profil = self.profil
+        return profil.score(
+            self.note,
+            self.prix,
+            self.nb_avis,
+            len(self.caracteristiques),
+            self.extra.get('prix_reference', profil.reference_prix(self.marque))
+        )
+    
+    @property
+    def categorie_prix(self) -> str:
+        """Catégoriser le prix (tranches du profil de scoring)"""
+        return self.profil.categorie(self.prix)
+    
+    def _serialiser(self) -> list:
+        """
+        Formes sérialisées en cache : [empreinte, dict, JSON ou None]
+
+        L'empreinte (champs simples, score, profil, identité et taille de
+        `caracteristiques` et `extra`) est comparée à chaque lecture :
+        réaffecter un champ suffit à invalider le cache. Une
+        modification en place d'une liste ou d'un dict demande
+        `invalider_serialisation()`.
+        """
+        score = self.score_qualite_prix
+        empreinte = (self.nom, self.marque, self.prix, self.note, self.nb_avis, score,
+                     self.stock, self.url, self.source, id(self._profil),
+                     id(self.caracteristiques), len(self.caracteristiques),
+                     id(self.extra), len(self.extra))
+        cache = self._serialisation
+        if cache is None or cache[0] != empreinte:
+            cache = self._serialisation = [empreinte, self._construire_dict(), None]
+        return cache
+
+    def mettre_a_jour(self, **champs):
+        """
+        Modifier des champs et recalculer le score (avec le profil du
+        produit)
+        
+        Une valeur invalide (score incalculable) laisse le produit
+        inchangé.
+        
+        Exemple:
+            produit.mettre_a_jour(prix=879.0, note=4.6)
+        """
+        anciens = {champ: getattr(self, champ) for champ in champs}
+        score = self._score
+        for champ, valeur in champs.items():
+            setattr(self, champ, valeur)
+        self._score = None
+        try:
+            self.score_qualite_prix
+        except Exception:
+            for champ, valeur in anciens.items():
+                setattr(self, champ, valeur)
+            self._score = score
+            raise
+        self._serialisation = None
+
+    def invalider_serialisation(self):
+        """Oublier les formes sérialisées (après une modification en place)"""
+        self._serialisation = None
+
+    def to_dict(self) -> Dict:
+        """Convertir en dictionnaire (copie de la forme en cache)"""
+        return dict(self._serialiser()[1])
+
+    def to_json(self) -> str:
+        """Produit en JSON compact, encodé une fois tant qu'il ne change pas"""
+        cache = self._serialiser()
+        if cache[2] is None:
+            cache[2] = encoder_json(cache[1])
+        return cache[2]
+
+    def _construire_dict(self) -> Dict:
+        return {
+            'nom': self.nom,
+            'marque': self.marque,
+            'prix': self.prix,
+            'note': self.note,
+            'nb_avis': self.nb_avis,
+            'score_qualite_prix': self.score_qualite_prix,
+            'categorie_prix': self.categorie_prix,
+            'caracteristiques': self.caracteristiques,
+            'url': self.url,
+            'source': self.source,
+            'stock': self.stock,
+            'extra': self.extra
+        }
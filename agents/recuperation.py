@@ -0,0 +1,312 @@
+"""
+RÉCUPÉRATION HTTP
+=================
+
+Couche de récupération des pages partagée par les outils de scraping
+(cf. agents/collecte.py) :
+
+- PoolConnexions      : connexions keep-alive réutilisées par site
+                        (plus de poignée de main TCP/TLS à chaque page),
+                        réponses gzip acceptées
+- CacheConditionnel   : ETag / Last-Modified / empreinte du contenu de
+                        chaque URL, conservés d'une exécution à l'autre
+- RecuperateurHTTP    : récupérateur asynchrone `url -> Page` combinant
+                        les deux
+
+Avec un cache, les requêtes sont conditionnelles : une page non modifiée
+(réponse 304, ou contenu identique à la dernière fois) est marquée
+`inchangee` et n'est ni décodée, ni analysée, ni scorée à nouveau.
+
+    recuperer = RecuperateurHTTP(cache=CacheConditionnel('data/cache_http.json'))
+    rapport = collecter(agent, urls, analyser_page, recuperer=recuperer)
+    recuperer.cache.sauvegarder()
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+# Délai d'attente d'une réponse HTTP (s)
+DELAI_REQUETE = 30
+
+# Connexions inactives conservées par site
+MAX_CONNEXIONS_PAR_HOTE = 8
+
+# Requêtes HTTP simultanées (threads)
+MAX_THREADS = 32
+
+# Redirections suivies au plus
+MAX_REDIRECTIONS = 5
+
+ENTETES_DEFAUT = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept-Encoding': 'gzip',
+}
+
+_REDIRECTIONS = (301, 302, 303, 307, 308)
+
+# Erreurs d'une connexion keep-alive fermée par le serveur entre deux requêtes
+_CONNEXION_PERIMEE = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                      ConnectionResetError, BrokenPipeError)
+
+
+class Page(NamedTuple):
+    """
+    Page récupérée
+
+    Attributs :
+        url: URL demandée
+        statut: Code HTTP
+        contenu: Corps décodé ('' si la page est inchangée)
+        entetes: En-têtes de réponse (noms en minuscules, optionnel)
+        inchangee: Page identique à la dernière récupération (réponse
+                   304 ou même contenu) : rien à analyser
+    """
+    url: str
+    statut: int
+    contenu: str
+    entetes: Optional[Dict[str, str]] = None
+    inchangee: bool = False
+
+
+# ============================================================================
+# POOL DE CONNEXIONS
+# ============================================================================
+
+class PoolConnexions:
+    """
+    Connexions HTTP(S) persistantes, réutilisées par site
+
+    Utilisable depuis plusieurs threads : chaque requête emprunte une
+    connexion inactive du site (ou en ouvre une) et la rend ensuite.
+    """
+
+    def __init__(self,
+                 max_par_hote: int = MAX_CONNEXIONS_PAR_HOTE,
+                 delai: float = DELAI_REQUETE):
+        self.max_par_hote = max_par_hote
+        self.delai = delai
+        self._libres: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._verrou = threading.Lock()
+        self.nb_connexions_ouvertes = 0
+
+    def _prendre(self, schema: str, hote: str) -> Tuple[http.client.HTTPConnection, bool]:
+        """(connexion, réutilisée ?)"""
+        with self._verrou:
+            libres = self._libres.get((schema, hote))
+            if libres:
+                return libres.pop(), True
+        return self._ouvrir(schema, hote), False
+
+    def _ouvrir(self, schema: str, hote: str) -> http.client.HTTPConnection:
+        with self._verrou:
+            self.nb_connexions_ouvertes += 1
+        if schema == 'https':
+            return http.client.HTTPSConnection(hote, timeout=self.delai)
+        return http.client.HTTPConnection(hote, timeout=self.delai)
+
+    def _rendre(self, schema: str, hote: str, connexion: http.client.HTTPConnection):
+        with self._verrou:
+            libres = self._libres.setdefault((schema, hote), [])
+            if len(libres) < self.max_par_hote:
+                libres.append(connexion)
+                return
+        connexion.close()
+
+    def requete(self, url: str, entetes: Optional[Dict[str, str]] = None
+                ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Requête GET (redirections suivies)
+
+        Returns:
+            (statut, en-têtes en minuscules, corps décompressé)
+        """
+        for _ in range(MAX_REDIRECTIONS + 1):
+            statut, entetes_reponse, corps = self._envoyer(url, entetes)
+            if statut in _REDIRECTIONS and 'location' in entetes_reponse:
+                url = urljoin(url, entetes_reponse['location'])
+                continue
+            return statut, entetes_reponse, corps
+        raise http.client.HTTPException(f"Trop de redirections : {url}")
+
+    def _envoyer(self, url: str, entetes: Optional[Dict[str, str]]):
+        parties = urlsplit(url)
+        chemin = (parties.path or '/') + ('?' + parties.query if parties.query else '')
+        entetes = dict(ENTETES_DEFAUT, **(entetes or {}))
+
+        connexion, reutilisee = self._prendre(parties.scheme, parties.netloc)
+        try:
+            try:
+                connexion.request('GET', chemin, headers=entetes)
+                reponse = connexion.getresponse()
+            except _CONNEXION_PERIMEE:
+                if not reutilisee:
+                    raise
+                # Connexion fermée par le serveur pendant son inactivité
+                connexion.close()
+                connexion = self._ouvrir(parties.scheme, parties.netloc)
+                connexion.request('GET', chemin, headers=entetes)
+                reponse = connexion.getresponse()
+            corps = reponse.read()
+        except Exception:
+            connexion.close()
+            raise
+
+        entetes_reponse = {k.lower(): v for k, v in reponse.getheaders()}
+        if reponse.will_close:
+            connexion.close()
+        else:
+            self._rendre(parties.scheme, parties.netloc, connexion)
+
+        if entetes_reponse.get('content-encoding') == 'gzip':
+            corps = gzip.decompress(corps)
+        return reponse.status, entetes_reponse, corps
+
+    def fermer(self):
+        """Fermer toutes les connexions inactives"""
+        with self._verrou:
+            libres, self._libres = self._libres, {}
+        for connexions in libres.values():
+            for connexion in connexions:
+                connexion.close()
+
+
+# ============================================================================
+# CACHE CONDITIONNEL
+# ============================================================================
+
+class CacheConditionnel:
+    """
+    Validateurs HTTP et empreinte du contenu de chaque URL
+
+    Une entrée n'est mise à jour qu'une fois la page analysée avec succès
+    (`confirmer`) : une page dont l'analyse a échoué sera retraitée.
+
+    Attributs :
+        fichier: Fichier JSON de persistance (optionnel)
+        entrees: url -> {'etag', 'last_modified', 'empreinte'}
+    """
+
+    def __init__(self, fichier: Optional[str] = None):
+        self.fichier = fichier
+        self.entrees: Dict[str, Dict[str, Optional[str]]] = {}
+        self._en_attente: Dict[str, Dict[str, Optional[str]]] = {}
+        self._verrou = threading.Lock()
+        if fichier and os.path.exists(fichier):
+            with open(fichier, 'r', encoding='utf-8') as f:
+                self.entrees = json.load(f)
+
+    def entetes(self, url: str) -> Dict[str, str]:
+        """En-têtes conditionnels pour une URL"""
+        entree = self.entrees.get(url)
+        if not entree:
+            return {}
+        entetes = {}
+        if entree.get('etag'):
+            entetes['If-None-Match'] = entree['etag']
+        if entree.get('last_modified'):
+            entetes['If-Modified-Since'] = entree['last_modified']
+        return entetes
+
+    def comparer(self, url: str, entetes: Dict[str, str], corps: bytes) -> bool:
+        """
+        Noter une réponse 200 ; True si le contenu est identique au
+        contenu confirmé la dernière fois
+        """
+        empreinte = hashlib.sha256(corps).hexdigest()
+        entree = {
+            'etag': entetes.get('etag'),
+            'last_modified': entetes.get('last-modified'),
+            'empreinte': empreinte,
+        }
+        with self._verrou:
+            precedente = self.entrees.get(url)
+            if precedente and precedente.get('empreinte') == empreinte:
+                self.entrees[url] = entree  # Validateurs éventuellement renouvelés
+                return True
+            self._en_attente[url] = entree
+        return False
+
+    def confirmer(self, url: str):
+        """La page a été analysée : retenir sa nouvelle version"""
+        with self._verrou:
+            entree = self._en_attente.pop(url, None)
+            if entree is not None:
+                self.entrees[url] = entree
+
+    def sauvegarder(self):
+        """Écrire le cache dans son fichier (remplacement atomique)"""
+        if not self.fichier:
+            return
+        temporaire = self.fichier + '.tmp'
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(self.entrees, f)
+        os.replace(temporaire, self.fichier)
+
+    def __len__(self):
+        return len(self.entrees)
+
+
+# ============================================================================
+# RÉCUPÉRATEUR
+# ============================================================================
+
+def _charset(entetes: Dict[str, str]) -> str:
+    trouve = re.search(r'charset=([\w.-]+)', entetes.get('content-type', ''), re.I)
+    return trouve.group(1) if trouve else 'utf-8'
+
+
+class RecuperateurHTTP:
+    """
+    Récupérateur `url -> Page` : connexions persistantes et, avec un
+    cache, requêtes conditionnelles
+
+    S'utilise comme paramètre `recuperer` de PipelineCollecte / collecter.
+    """
+
+    def __init__(self,
+                 cache: Optional[CacheConditionnel] = None,
+                 pool: Optional[PoolConnexions] = None,
+                 max_threads: int = MAX_THREADS):
+        self.cache = cache
+        self.pool = pool or PoolConnexions()
+        self.max_threads = max_threads
+        self._executeur: Optional[ThreadPoolExecutor] = None
+
+    async def __call__(self, url: str) -> Page:
+        if self._executeur is None:
+            self._executeur = ThreadPoolExecutor(self.max_threads)
+        boucle = asyncio.get_running_loop()
+        return await boucle.run_in_executor(self._executeur, self.recuperer, url)
+
+    def recuperer(self, url: str) -> Page:
+        """Récupérer une page (bloquant)"""
+        conditionnels = self.cache.entetes(url) if self.cache is not None else None
+        statut, entetes, corps = self.pool.requete(url, conditionnels)
+
+        if statut == 304:
+            return Page(url, statut, '', entetes, inchangee=True)
+        if statut == 200 and self.cache is not None and self.cache.comparer(url, entetes, corps):
+            return Page(url, statut, '', entetes, inchangee=True)
+        return Page(url, statut, corps.decode(_charset(entetes), errors='replace'), entetes)
+
+    def confirmer(self, page: Page):
+        """Appelé par le pipeline une fois la page analysée avec succès"""
+        if self.cache is not None:
+            self.cache.confirmer(page.url)
+
+    def fermer(self):
+        """Libérer les connexions et les threads"""
+        self.pool.fermer()
+        if self._executeur is not None:
+            self._executeur.shutdown()
+            self._executeur = None
@@ -0,0 +1,435 @@
+"""
+REQUÊTES COMPOSABLES
+====================
+
+Construction paresseuse de requêtes sur un `AgentProduitUniversel` :
+
+    selection = (agent.requete()
+                 .prix(max=500)
+                 .marques(['Samsung', 'Apple'])
+                 .note_min(4.0)
+                 .top(5, 'score'))
+
+    for produit in selection:
+        print(produit.nom)
+
+    print(agent.generer_rapport_texte(selection=selection))
+
+Rien n'est calculé avant la lecture du résultat. À l'exécution, le
+planificateur estime la sélectivité de chaque filtre grâce aux index de
+l'agent, part du filtre le plus sélectif et applique les autres produit
+par produit, en une seule passe, sans liste intermédiaire. Pour un top N,
+il choisit entre parcourir l'index trié du critère (filtres peu
+sélectifs) et départager les produits retenus avec un tas.
+
+Sur un stockage SQLite (cf. agents/stockage_sqlite.py), les filtres
+indexables et le top N sont traduits en une requête SQL : la base choisit
+elle-même ses index ; seuls les filtres personnalisés sont évalués en
+Python, sur le flux des identifiants retournés.
+"""
+
+import copy
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from .index import CRITERES_TRI, top_ids
+
+
+# ============================================================================
+# FILTRES
+# ============================================================================
+
+class _Filtre:
+    """
+    Filtre élémentaire d'une requête
+
+    indexe : le filtre peut produire directement ses identifiants
+    """
+    indexe = True
+
+    def estimer(self, agent) -> int:
+        """Nombre (estimé) de produits retenus"""
+        raise NotImplementedError
+
+    def ids(self, agent) -> List[int]:
+        """Identifiants retenus, par ordre d'insertion"""
+        raise NotImplementedError
+
+    def predicat(self, agent) -> Callable[[int], bool]:
+        """Test d'un identifiant"""
+        raise NotImplementedError
+
+    def sql(self) -> Tuple[str, List[Any]]:
+        """Condition SQL équivalente (clause, paramètres), cf. StockageSQLite"""
+        raise NotImplementedError
+
+
+class _FiltrePrix(_Filtre):
+
+    def __init__(self, prix_min, prix_max):
+        self.prix_min = prix_min
+        self.prix_max = prix_max
+
+    def estimer(self, agent) -> int:
+        debut, fin = agent._index_trie('prix').bornes(self.prix_min, self.prix_max)
+        return fin - debut
+
+    def ids(self, agent) -> List[int]:
+        return agent._ids_par_prix(self.prix_min, self.prix_max)
+
+    def predicat(self, agent):
+        prix = agent._stockage.acces('prix')
+        prix_min, prix_max = self.prix_min, self.prix_max
+        if prix_min is None:
+            return lambda i: prix(i) <= prix_max
+        if prix_max is None:
+            return lambda i: prix(i) >= prix_min
+        return lambda i: prix_min <= prix(i) <= prix_max
+
+    def sql(self):
+        if self.prix_min is None:
+            return "prix <= ?", [self.prix_max]
+        if self.prix_max is None:
+            return "prix >= ?", [self.prix_min]
+        return "prix BETWEEN ? AND ?", [self.prix_min, self.prix_max]
+
+    def __str__(self):
+        return f"prix dans [{self.prix_min}, {self.prix_max}]"
+
+
+class _FiltreNote(_Filtre):
+
+    def __init__(self, note_min):
+        self.note_min = note_min
+
+    def estimer(self, agent) -> int:
+        debut, fin = agent._index_trie('note').bornes(valeur_min=self.note_min)
+        return fin - debut
+
+    def ids(self, agent) -> List[int]:
+        return agent._index_trie('note').plage(valeur_min=self.note_min)
+
+    def predicat(self, agent):
+        note = agent._stockage.acces('note')
+        note_min = self.note_min
+        return lambda i: note(i) >= note_min
+
+    def sql(self):
+        return "note >= ?", [self.note_min]
+
+    def __str__(self):
+        return f"note >= {self.note_min}"
+
+
+class _FiltreMarques(_Filtre):
+
+    def __init__(self, marques):
+        self.marques = list(marques)
+
+    def estimer(self, agent) -> int:
+        postings = agent._synchroniser(agent._index_marques).postings
+        return sum(len(postings.get(t, ())) for t in set(m.lower() for m in self.marques))
+
+    def ids(self, agent) -> List[int]:
+        return agent._ids_par_marque(self.marques)
+
+    def predicat(self, agent):
+        marque = agent._stockage.acces('marque')
+        marques_lower = set(m.lower() for m in self.marques)
+        return lambda i: marque(i).lower() in marques_lower
+
+    def sql(self):
+        marques = sorted(set(m.lower() for m in self.marques))
+        return f"marque_cle IN ({','.join('?' * len(marques))})", marques
+
+    def __str__(self):
+        return f"marque dans {self.marques}"
+
+
+class _FiltreCaracteristique(_Filtre):
+
+    def __init__(self, sous_chaine):
+        self.sous_chaine = sous_chaine
+
+    def _termes(self, agent) -> List[str]:
+        index = agent._synchroniser(agent._index_caracteristiques)
+        return index.termes_contenant(self.sous_chaine)
+
+    def estimer(self, agent) -> int:
+        postings = agent._index_caracteristiques.postings
+        return sum(len(postings[t]) for t in self._termes(agent))
+
+    def ids(self, agent) -> List[int]:
+        return agent._index_caracteristiques.ids(self._termes(agent))
+
+    def predicat(self, agent):
+        caracteristiques = agent._stockage.acces('caracteristiques')
+        sous_chaine = self.sous_chaine.lower()
+        return lambda i: any(sous_chaine in c.lower() for c in caracteristiques(i))
+
+    def sql(self):
+        if not self.sous_chaine:
+            return "caracteristiques != '[]'", []
+        return "instr(caracteristiques_cle, ?) > 0", [self.sous_chaine.lower()]
+
+    def __str__(self):
+        return f"caractéristique contenant {self.sous_chaine!r}"
+
+
+class _FiltrePersonnalise(_Filtre):
+    """Fonction Produit -> bool : non indexable, évaluée en dernier"""
+    indexe = False
+
+    def __init__(self, fonction):
+        self.fonction = fonction
+
+    def estimer(self, agent) -> int:
+        return len(agent)
+
+    def predicat(self, agent):
+        produit = agent._stockage.produit
+        fonction = self.fonction
+        return lambda i: fonction(produit(i))
+
+    def __str__(self):
+        return "filtre personnalisé"
+
+
+def _combiner(predicats: Sequence[Callable[[int], bool]]) -> Optional[Callable[[int], bool]]:
+    """Un seul test pour plusieurs prédicats (None si aucun)"""
+    if not predicats:
+        return None
+    if len(predicats) == 1:
+        return predicats[0]
+    return lambda i: all(p(i) for p in predicats)
+
+
+# ============================================================================
+# REQUÊTE
+# ============================================================================
+
+class Requete:
+    """
+    Requête paresseuse sur les produits d'un agent
+
+    Chaque méthode de construction retourne une nouvelle requête : une
+    requête de base peut donc être déclinée sans être modifiée.
+
+    Une requête est aussi une vue sur son résultat : on peut l'itérer,
+    en prendre la longueur, ou la passer à `generer_rapport_texte` /
+    `exporter_json` (paramètre `selection`). Le résultat est conservé
+    tant que le catalogue de l'agent ne change pas.
+    """
+
+    def __init__(self, agent):
+        self._agent = agent
+        self._filtres: List[_Filtre] = []
+        self._top = None
+        self._resultat = None
+
+    def _avec(self, filtre: Optional[_Filtre] = None, top=None) -> 'Requete':
+        requete = copy.copy(self)
+        requete._filtres = list(self._filtres)
+        requete._resultat = None
+        if filtre is not None:
+            requete._filtres.append(filtre)
+        if top is not None:
+            requete._top = top
+        return requete
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def prix(self, min: Optional[float] = None, max: Optional[float] = None) -> 'Requete':
+        """Prix dans [min, max] (bornes incluses, None = pas de borne)"""
+        if min is None and max is None:
+            return self._avec()
+        return self._avec(_FiltrePrix(min, max))
+
+    def marques(self, marques: List[str]) -> 'Requete':
+        """Marques (insensible à la casse)"""
+        return self._avec(_FiltreMarques(marques))
+
+    def note_min(self, note: float) -> 'Requete':
+        """Note minimale"""
+        return self._avec(_FiltreNote(note))
+
+    def caracteristique(self, sous_chaine: str) -> 'Requete':
+        """Une caractéristique contient la sous-chaîne (insensible à la casse)"""
+        return self._avec(_FiltreCaracteristique(sous_chaine))
+
+    def filtre(self, fonction: Callable) -> 'Requete':
+        """Filtre personnalisé sur les `Produit` (évalué en dernier)"""
+        return self._avec(_FiltrePersonnalise(fonction))
+
+    def top(self, n: int, critere: str = 'score') -> 'Requete':
+        """Garder les n meilleurs produits selon un critère"""
+        return self._avec(top=(n, critere))
+
+    # ------------------------------------------------------------------
+    # Planification et exécution
+    # ------------------------------------------------------------------
+
+    def _planifier(self):
+        """
+        Ordonner les filtres par sélectivité estimée
+
+        Returns:
+            (pilote, autres, estimations) : le filtre indexé le plus
+            sélectif (ou None), les autres filtres dans l'ordre où les
+            tester, et l'estimation de chaque filtre
+        """
+        estimations = {id(f): f.estimer(self._agent) for f in self._filtres}
+        ordre = sorted(self._filtres, key=lambda f: (not f.indexe, estimations[id(f)]))
+        if ordre and ordre[0].indexe:
+            return ordre[0], ordre[1:], estimations
+        return None, ordre, estimations
+
+    def ids(self) -> List[int]:
+        """Identifiants du résultat (ordre d'insertion, ou ordre du top)"""
+        agent = self._agent
+        cle = agent._version_catalogue()
+        if self._resultat is not None and self._resultat[0] == cle:
+            return self._resultat[1]
+
+        if agent._sql:
+            ids = self._ids_sql()
+            self._resultat = (cle, ids)
+            return ids
+
+        pilote, autres, estimations = self._planifier()
+        test = _combiner([f.predicat(agent) for f in autres])
+
+        if self._top is not None and self._top[1] in CRITERES_TRI and self._parcourir_index(pilote, estimations):
+            ids = self._parcourir_index_trie(pilote, test)
+        else:
+            if pilote is not None:
+                candidats = pilote.ids(agent)
+            else:
+                candidats = range(len(agent))
+            ids = list(candidats) if test is None else [i for i in candidats if test(i)]
+            if self._top is not None:
+                n, critere = self._top
+                ids = top_ids(ids, n, critere, agent._stockage.acces)
+
+        self._resultat = (cle, ids)
+        return ids
+
+    def conditions_sql(self) -> Optional[List[Tuple[str, List[Any]]]]:
+        """
+        Conditions SQL de la requête, ou None si elle n'est pas entièrement
+        traduisible (filtre personnalisé ou top N)
+        """
+        if self._top is not None or not all(f.indexe for f in self._filtres):
+            return None
+        return [f.sql() for f in self._filtres]
+
+    def _ids_sql(self) -> List[int]:
+        """Exécution sur un stockage SQLite"""
+        stockage = self._agent._stockage
+        conditions = [f.sql() for f in self._filtres if f.indexe]
+        limite, critere = self._top if self._top is not None else (None, None)
+        test = _combiner([f.predicat(self._agent) for f in self._filtres if not f.indexe])
+        if test is None:
+            return stockage.selectionner(conditions, critere, limite)
+
+        resultat = []
+        if limite is not None and limite <= 0:
+            return resultat
+        for i in stockage.iterer_ids(conditions, critere):
+            if test(i):
+                resultat.append(i)
+                if limite is not None and len(resultat) >= limite:
+                    break
+        return resultat
+
+    def _parcourir_index(self, pilote, estimations) -> bool:
+        """
+        Choisir entre parcourir l'index trié du critère et un tas
+
+        Parcourir l'index coûte ~ n * N / m (m résultats attendus, en
+        supposant les filtres indépendants) ; le tas coûte ~ la taille du
+        filtre pilote.
+        """
+        total = len(self._agent)
+        if not total:
+            return False
+        n = self._top[0]
+        attendus = float(total)
+        for filtre in self._filtres:
+            attendus *= estimations[id(filtre)] / total
+        cout_pilote = estimations[id(pilote)] if pilote is not None else total
+        return n * total / max(attendus, 1.0) < cout_pilote
+
+    def _parcourir_index_trie(self, pilote, test) -> List[int]:
+        """Parcourir l'index trié du critère jusqu'à n résultats"""
+        n, critere = self._top
+        if n <= 0:
+            return []
+        predicats = [f.predicat(self._agent) for f in ([pilote] if pilote else [])]
+        if test is not None:
+            predicats.append(test)
+        test = _combiner(predicats)
+
+        index = self._agent._index_trie(critere)
+        if test is None:
+            return index.ids[:n].tolist()
+        resultat = []
+        for i in index.ids:
+            if test(i):
+                resultat.append(i)
+                if len(resultat) >= n:
+                    break
+        return resultat
+
+    def expliquer(self) -> List[str]:
+        """Plan d'exécution, étape par étape (pour le débogage)"""
+        if self._agent._sql:
+            critere = self._top[1] if self._top is not None else None
+            conditions = [f.sql() for f in self._filtres if f.indexe]
+            etapes = [f"SQL : {etape}"
+                      for etape in self._agent._stockage.expliquer(conditions, critere)]
+            etapes.extend(f"test : {f}" for f in self._filtres if not f.indexe)
+            if self._top is not None:
+                etapes.append(f"top {self._top[0]} par {self._top[1]}")
+            return etapes
+        pilote, autres, estimations = self._planifier()
+        etapes = []
+        if pilote is not None:
+            etapes.append(f"pilote : {pilote} (~{estimations[id(pilote)]} produits)")
+        else:
+            etapes.append(f"pilote : tous les produits ({len(self._agent)})")
+        for filtre in autres:
+            etapes.append(f"test : {filtre} (~{estimations[id(filtre)]} produits)")
+        if self._top is not None:
+            n, critere = self._top
+            if critere in CRITERES_TRI and self._parcourir_index(pilote, estimations):
+                etapes.append(f"top {n} par {critere} : parcours de l'index trié")
+            else:
+                etapes.append(f"top {n} par {critere} : sélection par tas")
+        return etapes
+
+    # ------------------------------------------------------------------
+    # Vue sur le résultat
+    # ------------------------------------------------------------------
+
+    def produits(self) -> list:
+        """Produits du résultat"""
+        return self._agent._produits_ids(self.ids())
+
+    def __iter__(self):
+        produit = self._agent._stockage.produit
+        for i in self.ids():
+            yield produit(i)
+
+    def __len__(self):
+        if self._resultat is None and self._agent._sql:
+            conditions = self.conditions_sql()
+            if conditions is not None:
+                return self._agent._stockage.compter(conditions)
+        return len(self.ids())
+
+    def __repr__(self):
+        filtres = ', '.join(str(f) for f in self._filtres) or 'aucun filtre'
+        top = f", top {self._top[0]} par {self._top[1]}" if self._top else ''
+        return f"<Requete({filtres}{top})>"
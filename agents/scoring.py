@@ -0,0 +1,495 @@
+"""
+SCORING QUALITÉ/PRIX
+====================
+
+Formule de score (de 0 à 100 par défaut) partagée par `Produit` et par
+le calcul en lot :
+
+- 40% : Note utilisateurs
+- 30% : Prix (bonus si raisonnable)
+- 20% : Nombre d'avis (popularité)
+- 10% : Bonus caractéristiques
+
+Poids, paliers d'avis, prix de référence et tranches de prix sont
+décrits par un profil (`ProfilScoring`). Le type de produit ne choisit
+plus de profil : sans `profil=`, l'agent applique PROFIL_DEFAUT (formule
+historique) quel que soit son `type_produit`, et les profils par type
+(cf. PROFILS) ne s'appliquent que s'ils sont passés explicitement :
+
+    agent = AgentProduitUniversel("smartphone", profil="smartphone")
+    PROFILS['aspirateur'] = ProfilScoring(prix_reference=300)
+    agent = AgentProduitUniversel("aspirateur", profil="aspirateur")
+    agent.appliquer_profil(ProfilScoring(poids_note=50, poids_prix=20))
+
+Le prix de référence peut aussi être tiré des prix du catalogue
+(`centile_prix`) : l'agent tient la répartition des prix (et de chaque
+marque) dans des croquis de quantiles et recalcule tous les scores en
+un passage quand le centile choisi dérive de plus de `seuil_recalcul`.
+
+Le calcul en lot (`calculer_scores`, `scorer_produits`) traite un lot
+entier de produits en un seul passage vectorisé : avec NumPy s'il est
+installé, en Python pur sinon. Les deux chemins donnent exactement les
+mêmes valeurs que `ProfilScoring.score` appliqué produit par produit.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel
+    np = None
+
+
+PRIX_REFERENCE_DEFAUT = 500
+
+# Libellés des tranches de prix (de la moins chère à la plus chère)
+LIBELLES_TRANCHES = ("💰 Entrée de gamme", "💵 Milieu de gamme", "💎 Haut de gamme", "👑 Premium")
+
+
+# ============================================================================
+# PROFILS DE SCORING
+# ============================================================================
+
+def _tranches(*bornes: float) -> Tuple[Tuple[float, str], ...]:
+    """Tranches de prix (borne, libellé) avec les libellés standard"""
+    return tuple(zip(bornes, LIBELLES_TRANCHES))
+
+
+@dataclass(frozen=True)
+class ProfilScoring:
+    """
+    Profil de scoring déclaratif
+
+    Le score additionne, puis plafonne à `score_max` :
+    - note : (note / note_max) * poids_note, si note > 0
+    - prix : max(0, 1 - prix / prix de référence) * poids_prix, si prix > 0
+      (prix de référence : `extra['prix_reference']` du produit, sinon
+      celui de sa marque dans `references_marques`, sinon
+      `prix_reference`)
+    - avis : points du premier palier (seuil, points) atteint, du plus
+      haut seuil au plus bas
+    - caractéristiques : min(nb * points_caracteristique,
+      plafond_caracteristiques)
+
+    Avec `centile_prix` (ex. 0.9), `prix_reference` et
+    `references_marques` (si `par_marque`) sont tirés du catalogue :
+    centile des prix de tous les produits, et de chaque marque comptant
+    au moins `min_produits_centile` produits (cf.
+    AgentProduitUniversel). Le profil appliqué porte ces références : il
+    décrit exactement les scores calculés.
+
+    Un prix inférieur à la borne d'une tranche (borne, libellé) reçoit
+    le libellé de la première tranche concernée, `categorie_max` au-delà.
+
+    Le profil est compilé à sa création : `score(note, prix, nb_avis,
+    nb_caracteristiques[, prix_reference])`, `categorie(prix)` et
+    `reference_prix(marque)` sont des fonctions aux paramètres figés.
+    Les profils sont immuables (cf. dataclasses.replace pour en dériver
+    un) et se sérialisent en dict (to_dict, depuis_dict).
+    """
+    poids_note: float = 40
+    note_max: float = 5
+    poids_prix: float = 30
+    prix_reference: float = PRIX_REFERENCE_DEFAUT
+    paliers_avis: Tuple[Tuple[int, float], ...] = ((200, 20), (100, 15), (50, 10), (10, 5))
+    points_caracteristique: float = 2
+    plafond_caracteristiques: float = 10
+    score_max: float = 100
+    tranches_prix: Tuple[Tuple[float, str], ...] = _tranches(50, 150, 300)
+    categorie_max: str = LIBELLES_TRANCHES[-1]
+    centile_prix: Optional[float] = None
+    par_marque: bool = False
+    min_produits_centile: int = 30
+    seuil_recalcul: float = 0.1
+    references_marques: Tuple[Tuple[str, float], ...] = ()
+
+    def __post_init__(self):
+        if not self.note_max or not self.prix_reference:
+            raise ValueError("note_max et prix_reference doivent être non nuls")
+        if self.centile_prix is not None and not 0 < self.centile_prix <= 1:
+            raise ValueError("centile_prix doit être compris entre 0 (exclu) et 1")
+        # Formes normalisées (listes d'un fichier JSON acceptées)
+        object.__setattr__(self, 'paliers_avis', tuple(sorted(
+            ((seuil, points) for seuil, points in self.paliers_avis), key=lambda p: -p[0])))
+        object.__setattr__(self, 'tranches_prix', tuple(sorted(
+            ((borne, libelle) for borne, libelle in self.tranches_prix), key=lambda t: t[0])))
+        object.__setattr__(self, 'references_marques', tuple(sorted(
+            (marque.lower(), reference) for marque, reference in self.references_marques)))
+        object.__setattr__(self, 'score', _compiler_score(self))
+        object.__setattr__(self, 'categorie', _compiler_categorie(self))
+        object.__setattr__(self, 'reference_prix', _compiler_reference(self))
+
+    def __reduce__(self):
+        # Les fonctions compilées sont recréées à la désérialisation
+        return (type(self), tuple(getattr(self, f.name) for f in fields(self)))
+
+    def scores(self,
+               notes: Sequence[float],
+               prix: Sequence[float],
+               nb_avis: Sequence[int],
+               nb_caracteristiques: Sequence[int],
+               prix_references: Optional[Sequence[float]] = None,
+               utiliser_numpy: Optional[bool] = None) -> List[float]:
+        """Scores d'un lot de produits donné en colonnes (cf. calculer_scores)"""
+        if prix_references is None:
+            prix_references = [self.prix_reference] * len(notes)
+        return calculer_scores(notes, prix, nb_avis, nb_caracteristiques, prix_references,
+                               utiliser_numpy, self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Profil sous forme de dictionnaire (compatible JSON)"""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data['paliers_avis'] = [list(p) for p in self.paliers_avis]
+        data['tranches_prix'] = [list(t) for t in self.tranches_prix]
+        data['references_marques'] = [list(r) for r in self.references_marques]
+        return data
+
+    @classmethod
+    def depuis_dict(cls, data: Dict[str, Any]) -> 'ProfilScoring':
+        """
+        Profil décrit par un dictionnaire (champs absents : valeurs par défaut)
+
+        Exemple:
+            ProfilScoring.depuis_dict({
+                'prix_reference': 1000,
+                'paliers_avis': [[500, 20], [100, 10]],
+                'tranches_prix': [[300, 'Entrée de gamme'], [800, 'Milieu de gamme']],
+                'categorie_max': 'Haut de gamme'
+            })
+        """
+        return cls(**data)
+
+    def ajuster(self,
+                reference: Optional[float],
+                references_marques: Dict[str, float],
+                seuil: Optional[float] = None) -> Optional['ProfilScoring']:
+        """
+        Profil aux nouvelles références de prix, si elles ont dérivé
+
+        Args:
+            reference: Centile des prix du catalogue (None : trop peu de
+                       produits, `prix_reference` est conservé)
+            references_marques: Centile des prix de chaque marque
+                                (ignoré sans `par_marque`)
+            seuil: Écart relatif déclenchant l'ajustement (défaut :
+                   seuil_recalcul)
+
+        Returns:
+            Le profil ajusté, ou None si aucune référence n'a varié de
+            plus du seuil
+        """
+        seuil = self.seuil_recalcul if seuil is None else seuil
+        reference = reference or self.prix_reference
+        marques = {marque.lower(): ref for marque, ref in references_marques.items()
+                   if ref > 0} if self.par_marque else {}
+        actuelles = dict(self.references_marques)
+
+        def derive(ancienne: float, nouvelle: float) -> bool:
+            return abs(nouvelle - ancienne) > seuil * abs(ancienne)
+
+        if not (derive(self.prix_reference, reference)
+                or actuelles.keys() != marques.keys()
+                or any(derive(actuelles.get(marque, self.prix_reference), ref)
+                       for marque, ref in marques.items())):
+            return None
+        return replace(self, prix_reference=reference,
+                       references_marques=tuple(marques.items()))
+
+
+def _compiler_score(profil: ProfilScoring) -> Callable[..., float]:
+    """Fonction de score d'un profil, paramètres figés en variables locales"""
+    poids_note, note_max, poids_prix = profil.poids_note, profil.note_max, profil.poids_prix
+    paliers = profil.paliers_avis
+    points_carac, plafond_carac = profil.points_caracteristique, profil.plafond_caracteristiques
+    score_max = profil.score_max
+
+    def score(note: float,
+              prix: float,
+              nb_avis: int,
+              nb_caracteristiques: int,
+              prix_reference: float = profil.prix_reference) -> float:
+        score = 0
+
+        # 1. Note
+        if note > 0:
+            score += (note / note_max) * poids_note
+
+        # 2. Prix : plus il est bas par rapport à la référence, meilleur c'est
+        if prix > 0:
+            ratio_prix = max(0, 1 - (prix / prix_reference))
+            score += ratio_prix * poids_prix
+
+        # 3. Nombre d'avis (popularité)
+        for seuil, points in paliers:
+            if nb_avis >= seuil:
+                score += points
+                break
+
+        # 4. Bonus caractéristiques
+        score += min(nb_caracteristiques * points_carac, plafond_carac)
+
+        return min(score, score_max)
+
+    return score
+
+
+def _compiler_categorie(profil: ProfilScoring) -> Callable[[float], str]:
+    """Fonction prix -> libellé de tranche d'un profil (bisection)"""
+    bornes = [borne for borne, _ in profil.tranches_prix]
+    libelles = [libelle for _, libelle in profil.tranches_prix] + [profil.categorie_max]
+
+    def categorie(prix: float) -> str:
+        return libelles[bisect_right(bornes, prix)]
+
+    return categorie
+
+
+def _compiler_reference(profil: ProfilScoring) -> Callable[[str], float]:
+    """Fonction marque -> prix de référence d'un profil"""
+    references = dict(profil.references_marques)
+    defaut = profil.prix_reference
+
+    if not references:
+        return lambda marque: defaut
+
+    def reference_prix(marque: str) -> float:
+        return references.get(marque.lower(), defaut)
+
+    return reference_prix
+
+
+# Profil historique (appliqué par défaut, quel que soit le type de produit)
+PROFIL_DEFAUT = ProfilScoring()
+
+# Profils par type de produit, sur demande (clés en minuscules, cf. profil_pour)
+PROFILS: Dict[str, ProfilScoring] = {
+    'smartphone': ProfilScoring(prix_reference=800, tranches_prix=_tranches(200, 400, 800)),
+    'ordinateur': ProfilScoring(prix_reference=1200, tranches_prix=_tranches(500, 900, 1500)),
+    'televiseur': ProfilScoring(prix_reference=1000, tranches_prix=_tranches(400, 800, 1500)),
+    'accessoire': ProfilScoring(prix_reference=50, tranches_prix=_tranches(10, 25, 50)),
+}
+PROFILS['téléviseur'] = PROFILS['tv'] = PROFILS['televiseur']
+
+
+def profil_pour(type_produit: str) -> ProfilScoring:
+    """Profil enregistré pour un type de produit (sinon PROFIL_DEFAUT)"""
+    return PROFILS.get(type_produit.strip().lower(), PROFIL_DEFAUT)
+
+
+def profil_scoring(profil: Union[ProfilScoring, Dict[str, Any], str]) -> ProfilScoring:
+    """Profil désigné par un ProfilScoring, un dict déclaratif ou un type de produit"""
+    if isinstance(profil, ProfilScoring):
+        return profil
+    if isinstance(profil, dict):
+        return ProfilScoring.depuis_dict(profil)
+    if isinstance(profil, str):
+        return profil_pour(profil)
+    raise TypeError(f"Profil de scoring attendu, reçu {type(profil).__name__}")
+
+
+# ============================================================================
+# FORMULE DE RÉFÉRENCE
+# ============================================================================
+
+def score_produit(note: float,
+                  prix: float,
+                  nb_avis: int,
+                  nb_caracteristiques: int,
+                  prix_reference: float = PRIX_REFERENCE_DEFAUT) -> float:
+    """
+    Calcule le score d'un produit (de 0 à 100) avec le profil par défaut
+
+    PERSONNALISABLE : décrivez vos poids dans un ProfilScoring !
+    """
+    return PROFIL_DEFAUT.score(note, prix, nb_avis, nb_caracteristiques, prix_reference)
+
+
+# ============================================================================
+# CALCUL EN LOT
+# ============================================================================
+
+def calculer_scores(notes: Sequence[float],
+                    prix: Sequence[float],
+                    nb_avis: Sequence[int],
+                    nb_caracteristiques: Sequence[int],
+                    prix_references: Sequence[float],
+                    utiliser_numpy: Optional[bool] = None,
+                    profil: Optional[ProfilScoring] = None) -> List[float]:
+    """
+    Calculer les scores d'un lot de produits en un seul passage
+
+    Args:
+        notes, prix, nb_avis, nb_caracteristiques, prix_references:
+            Colonnes de même longueur (valeurs numériques,
+            prix_references non nuls)
+        utiliser_numpy: Forcer (True) ou interdire (False) NumPy ;
+                        par défaut NumPy est utilisé s'il est installé
+        profil: Profil de scoring (défaut : PROFIL_DEFAUT)
+
+    Returns:
+        Liste des scores, identiques à `profil.score` ligne par ligne
+    """
+    profil = profil or PROFIL_DEFAUT
+    if utiliser_numpy is None:
+        utiliser_numpy = np is not None
+    if utiliser_numpy and np is None:
+        raise ImportError("NumPy n'est pas installé")
+
+    if utiliser_numpy and len(notes):
+        return _calculer_scores_numpy(profil, notes, prix, nb_avis, nb_caracteristiques,
+                                      prix_references)
+
+    score = profil.score
+    return [
+        score(n, p, a, c, r)
+        for n, p, a, c, r in zip(notes, prix, nb_avis, nb_caracteristiques, prix_references)
+    ]
+
+
+def _calculer_scores_numpy(profil, notes, prix, nb_avis, nb_caracteristiques,
+                           prix_references) -> List[float]:
+    """Version vectorisée (NumPy) de `profil.score`"""
+    note = np.asarray(notes, dtype=np.float64)
+    p = np.asarray(prix, dtype=np.float64)
+    avis = np.asarray(nb_avis, dtype=np.int64)
+    nb_carac = np.asarray(nb_caracteristiques, dtype=np.int64)
+    ref = np.asarray(prix_references, dtype=np.float64)
+    paliers = profil.paliers_avis
+
+    # Mêmes opérations, dans le même ordre, que la formule scalaire
+    score = np.where(note > 0, (note / profil.note_max) * profil.poids_note, 0.0)
+    ratio_brut = 1 - (p / ref)
+    score = score + np.where(p > 0, np.maximum(0, ratio_brut) * profil.poids_prix, 0.0)
+    conditions_avis = [avis >= seuil for seuil, _ in paliers]
+    if paliers:
+        score = score + np.select(conditions_avis, [points for _, points in paliers], default=0)
+    carac_brut = nb_carac * profil.points_caracteristique
+    score = score + np.minimum(carac_brut, profil.plafond_caracteristiques)
+
+    # La formule scalaire renvoie un entier quand tous les termes ajoutés
+    # sont entiers (note absente, prix nul ou au-delà de la référence,
+    # points entiers), ou quand le score est plafonné à un maximum entier :
+    # on reproduit ces cas pour rester strictement identique
+    def entier(valeur) -> bool:
+        return isinstance(valeur, int)
+
+    termes_entiers = (~(note > 0)
+                      & (~(p > 0) | (~(ratio_brut > 0) & entier(profil.poids_prix)))
+                      & np.where(profil.plafond_caracteristiques < carac_brut,
+                                 entier(profil.plafond_caracteristiques),
+                                 entier(profil.points_caracteristique)))
+    if paliers:
+        termes_entiers &= np.select(conditions_avis, [entier(points) for _, points in paliers],
+                                    default=True)
+    plafonne = profil.score_max < score
+    est_entier = np.where(plafonne, entier(profil.score_max), termes_entiers)
+    score = np.minimum(score, profil.score_max)
+
+    resultat = score.tolist()
+    for i in np.flatnonzero(est_entier).tolist():
+        resultat[i] = int(resultat[i])
+    return resultat
+
+
+def _est_nombre(valeur) -> bool:
+    return isinstance(valeur, (int, float))
+
+
+def prix_references(extras: Iterable[Optional[Dict[str, Any]]],
+                    profil: Optional[ProfilScoring] = None,
+                    marques: Optional[Iterable[str]] = None) -> List[float]:
+    """
+    Prix de référence de chaque produit (`extra['prix_reference']`, sinon
+    celui de sa marque dans le profil, sinon celui du profil)
+
+    Args:
+        marques: Marque de chaque produit, nécessaire si le profil a des
+                 références par marque
+    """
+    profil = profil or PROFIL_DEFAUT
+    if not profil.references_marques or marques is None:
+        defaut = profil.prix_reference
+        return [extra.get('prix_reference', defaut) if extra else defaut for extra in extras]
+    reference_prix = profil.reference_prix
+    return [extra['prix_reference'] if extra and 'prix_reference' in extra
+            else reference_prix(marque)
+            for extra, marque in zip(extras, marques)]
+
+
+def score_champs(profil: Optional[ProfilScoring],
+                 note: float,
+                 prix: float,
+                 nb_avis: int,
+                 nb_caracteristiques: int,
+                 marque: str,
+                 extra: Optional[Dict[str, Any]] = None) -> float:
+    """Score d'un produit donné par ses champs (même calcul que Produit._calculer_score)"""
+    profil = profil or PROFIL_DEFAUT
+    reference = (extra['prix_reference'] if extra and 'prix_reference' in extra
+                 else profil.reference_prix(marque))
+    return profil.score(note, prix, nb_avis, nb_caracteristiques, reference)
+
+
+def scorer_produits(produits: Sequence,
+                    utiliser_numpy: Optional[bool] = None,
+                    profil: Optional[ProfilScoring] = None) -> List[Tuple[int, Exception]]:
+    """
+    Calculer et affecter en lot le score d'une liste de `Produit`
+
+    Les produits aux données inhabituelles (valeurs non numériques,
+    prix de référence nul, `_calculer_score` redéfini dans une
+    sous-classe) sont scorés un par un.
+
+    Args:
+        produits: Produits à scorer (un score déjà calculé est remplacé)
+        utiliser_numpy: cf. `calculer_scores`
+        profil: Profil de scoring, retenu par chaque produit (défaut :
+                PROFIL_DEFAUT)
+
+    Returns:
+        Liste de (position, exception) pour les produits non scorables
+    """
+    from .produit import Produit
+
+    reference_prix = (profil or PROFIL_DEFAUT).reference_prix
+    erreurs = []
+    lot = []
+    notes, prix, nb_avis, nb_carac, refs = [], [], [], [], []
+
+    for k, produit in enumerate(produits):
+        produit._profil = profil
+        try:
+            extra = produit.extra
+            ref = (extra['prix_reference'] if 'prix_reference' in extra
+                   else reference_prix(produit.marque))
+            nb = len(produit.caracteristiques)
+        except Exception as e:
+            erreurs.append((k, e))
+            continue
+
+        standard = (
+            type(produit)._calculer_score is Produit._calculer_score
+            and _est_nombre(produit.note) and _est_nombre(produit.prix)
+            and _est_nombre(produit.nb_avis) and _est_nombre(ref) and ref != 0
+        )
+        if not standard:
+            try:
+                produit._score = produit._calculer_score()
+            except Exception as e:
+                erreurs.append((k, e))
+            continue
+
+        lot.append(produit)
+        notes.append(produit.note)
+        prix.append(produit.prix)
+        nb_avis.append(produit.nb_avis)
+        nb_carac.append(nb)
+        refs.append(ref)
+
+    scores = calculer_scores(notes, prix, nb_avis, nb_carac, refs, utiliser_numpy, profil)
+    for produit, score in zip(lot, scores):
+        produit._score = score
+
+    return erreurs
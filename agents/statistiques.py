@@ -0,0 +1,348 @@
+"""
+STATISTIQUES COURANTES
+======================
+
+Agrégats tenus à jour au fil des ajouts, pour que
+`AgentProduitUniversel.obtenir_statistiques` soit instantané :
+
+- nombre, somme, min, max des prix ; somme des notes (> 0) et des scores
+- nombre de produits par marque
+- quantiles des prix (médiane, p90...) par un croquis fusionnable
+
+La répartition des prix du catalogue et de chaque marque
+(`RepartitionPrix`) fournit les prix de référence des profils de
+scoring tirés du catalogue (cf. ProfilScoring.centile_prix).
+
+Les agrégats de plusieurs agents peuvent être fusionnés (`fusionner`)
+et sérialisés (`etat` / `depuis_etat`).
+"""
+
+from collections import Counter
+import math
+from typing import Any, Dict, Optional, Tuple
+
+
+# Erreur relative des quantiles (1%)
+PRECISION_QUANTILES = 0.01
+
+
+# ============================================================================
+# CROQUIS DE QUANTILES
+# ============================================================================
+
+class CroquisQuantiles:
+    """
+    Croquis de quantiles à erreur relative garantie (principe DDSketch)
+
+    Chaque valeur positive est rangée dans un seau logarithmique
+    ceil(log(x) / log(gamma)) ; un quantile est restitué avec une erreur
+    relative d'au plus `precision`. Les valeurs nulles ou négatives sont
+    comptées comme 0. Deux croquis de même précision se fusionnent
+    exactement, et une valeur peut être retirée.
+    """
+
+    def __init__(self, precision: float = PRECISION_QUANTILES):
+        self.precision = precision
+        self.gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self.gamma)
+        self.seaux: Dict[int, int] = {}
+        self.nb_zeros = 0
+        self.nb = 0
+
+    def ajouter(self, valeur: float, nb: int = 1):
+        """Ajouter une valeur (nb fois ; nb négatif pour la retirer)"""
+        if valeur > 0:
+            seau = math.ceil(math.log(valeur) / self._log_gamma)
+            compte = self.seaux.get(seau, 0) + nb
+            if compte:
+                self.seaux[seau] = compte
+            else:
+                del self.seaux[seau]
+        else:
+            self.nb_zeros += nb
+        self.nb += nb
+
+    def retirer(self, valeur: float):
+        """Retirer une valeur ajoutée auparavant"""
+        self.ajouter(valeur, -1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valeur du quantile q (0 <= q <= 1), None si le croquis est vide"""
+        if self.nb <= 0:
+            return None
+        rang = q * (self.nb - 1)
+        cumul = self.nb_zeros
+        if rang < cumul:
+            return 0.0
+        for seau in sorted(self.seaux):
+            cumul += self.seaux[seau]
+            if cumul > rang:
+                return 2 * self.gamma ** seau / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.seaux) / (self.gamma + 1)
+
+    def fusionner(self, autre: 'CroquisQuantiles'):
+        """Ajouter le contenu d'un autre croquis (même précision)"""
+        if autre.precision != self.precision:
+            raise ValueError("Croquis de précisions différentes")
+        for seau, compte in autre.seaux.items():
+            total = self.seaux.get(seau, 0) + compte
+            if total:
+                self.seaux[seau] = total
+            else:
+                self.seaux.pop(seau, None)
+        self.nb_zeros += autre.nb_zeros
+        self.nb += autre.nb
+
+    def etat(self) -> Dict[str, Any]:
+        """État sérialisable (JSON)"""
+        return {
+            'precision': self.precision,
+            'seaux': {str(k): v for k, v in self.seaux.items()},
+            'nb_zeros': self.nb_zeros,
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat: Dict[str, Any]) -> 'CroquisQuantiles':
+        """Reconstruire un croquis depuis `etat()`"""
+        croquis = cls(etat['precision'])
+        croquis.seaux = {int(k): v for k, v in etat['seaux'].items()}
+        croquis.nb_zeros = etat['nb_zeros']
+        croquis.nb = croquis.nb_zeros + sum(croquis.seaux.values())
+        return croquis
+
+
+# ============================================================================
+# AGRÉGATS
+# ============================================================================
+
+class StatistiquesCourantes:
+    """
+    Agrégats d'un ensemble de produits, mis à jour à chaque ajout
+
+    Se synchronise paresseusement avec le stockage de l'agent, comme les
+    index : lire les statistiques ne coûte que l'intégration des produits
+    ajoutés depuis la lecture précédente.
+    """
+
+    def __init__(self, precision_quantiles: float = PRECISION_QUANTILES):
+        self.precision_quantiles = precision_quantiles
+        self.vider()
+
+    def vider(self):
+        """Remettre les agrégats à zéro"""
+        self.nb = 0
+        self.somme_prix = 0
+        self.prix_min = None
+        self.prix_max = None
+        self.nb_notes = 0
+        self.somme_notes = 0
+        self.somme_scores = 0
+        self.marques: Counter = Counter()
+        self.quantiles_prix = CroquisQuantiles(self.precision_quantiles)
+        # Prix min/max à relire (le produit qui les portait a changé de prix)
+        self.bornes_perimees = False
+        self.nb_indexes = 0
+
+    def ajouter(self, prix: float, note: float, score: float, marque: str):
+        """Intégrer un produit"""
+        self.nb += 1
+        self.somme_prix += prix
+        if self.prix_min is None or prix < self.prix_min:
+            self.prix_min = prix
+        if self.prix_max is None or prix > self.prix_max:
+            self.prix_max = prix
+        if note > 0:
+            self.nb_notes += 1
+            self.somme_notes += note
+        self.somme_scores += score
+        self.marques[marque] += 1
+        self.quantiles_prix.ajouter(prix)
+
+    def modifier(self, i: int, avant: Dict[str, Any], apres: Dict[str, Any]):
+        """
+        Remplacer le prix, la note et le score d'un produit déjà intégré
+
+        Args:
+            i: Identifiant du produit (ignoré s'il n'est pas encore intégré)
+            avant, apres: Valeurs 'prix', 'note', 'score' avant et après
+        """
+        if i >= self.nb_indexes:
+            return
+        ancien, nouveau = avant['prix'], apres['prix']
+        self.somme_prix += nouveau - ancien
+        self.quantiles_prix.retirer(ancien)
+        self.quantiles_prix.ajouter(nouveau)
+        if nouveau <= self.prix_min:
+            self.prix_min = nouveau
+        elif ancien == self.prix_min:
+            self.bornes_perimees = True
+        if nouveau >= self.prix_max:
+            self.prix_max = nouveau
+        elif ancien == self.prix_max:
+            self.bornes_perimees = True
+
+        if avant['note'] > 0:
+            self.nb_notes -= 1
+            self.somme_notes -= avant['note']
+        if apres['note'] > 0:
+            self.nb_notes += 1
+            self.somme_notes += apres['note']
+        self.somme_scores += apres['score'] - avant['score']
+
+    def synchroniser(self, stockage):
+        """Intégrer les produits ajoutés au stockage depuis le dernier appel"""
+        n = len(stockage)
+        if n < self.nb_indexes:
+            self.vider()
+        if n == self.nb_indexes:
+            return
+
+        debut = self.nb_indexes
+        for prix, note, score, marque in zip(stockage.colonne('prix', debut),
+                                             stockage.colonne('note', debut),
+                                             stockage.colonne('score', debut),
+                                             stockage.colonne('marque', debut)):
+            self.ajouter(prix, note, score, marque)
+        self.nb_indexes = n
+
+    def fusionner(self, autre: 'StatistiquesCourantes'):
+        """Ajouter les agrégats d'un autre ensemble de produits"""
+        if not autre.nb:
+            return
+        self.nb += autre.nb
+        self.somme_prix += autre.somme_prix
+        if self.prix_min is None or autre.prix_min < self.prix_min:
+            self.prix_min = autre.prix_min
+        if self.prix_max is None or autre.prix_max > self.prix_max:
+            self.prix_max = autre.prix_max
+        self.nb_notes += autre.nb_notes
+        self.somme_notes += autre.somme_notes
+        self.somme_scores += autre.somme_scores
+        self.marques.update(autre.marques)
+        self.quantiles_prix.fusionner(autre.quantiles_prix)
+
+    def quantile_prix(self, q: float) -> Optional[float]:
+        """Quantile des prix (approché, cf. CroquisQuantiles)"""
+        return self.quantiles_prix.quantile(q)
+
+    def to_dict(self, quantiles: bool = False) -> Dict[str, Any]:
+        """Statistiques au format de `obtenir_statistiques` ({} si vide)"""
+        if not self.nb:
+            return {}
+        marques = [m for m, compte in self.marques.items() if compte > 0]
+        stats = {
+            'nb_produits': self.nb,
+            'prix_moyen': self.somme_prix / self.nb,
+            'prix_min': self.prix_min,
+            'prix_max': self.prix_max,
+            'note_moyenne': self.somme_notes / self.nb_notes if self.nb_notes else 0,
+            'score_moyen': self.somme_scores / self.nb,
+            'marques': marques,
+            'nb_marques': len(marques)
+        }
+        if quantiles:
+            stats['prix_median'] = self.quantile_prix(0.5)
+            stats['prix_p90'] = self.quantile_prix(0.9)
+        return stats
+
+    def etat(self) -> Dict[str, Any]:
+        """État sérialisable (JSON), pour fusionner des agrégats entre processus"""
+        return {
+            'nb': self.nb,
+            'somme_prix': self.somme_prix,
+            'prix_min': self.prix_min,
+            'prix_max': self.prix_max,
+            'nb_notes': self.nb_notes,
+            'somme_notes': self.somme_notes,
+            'somme_scores': self.somme_scores,
+            'marques': dict(self.marques),
+            'quantiles_prix': self.quantiles_prix.etat(),
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat: Dict[str, Any]) -> 'StatistiquesCourantes':
+        """Reconstruire des agrégats depuis `etat()`"""
+        quantiles = CroquisQuantiles.depuis_etat(etat['quantiles_prix'])
+        stats = cls(quantiles.precision)
+        for cle in ('nb', 'somme_prix', 'prix_min', 'prix_max',
+                    'nb_notes', 'somme_notes', 'somme_scores'):
+            setattr(stats, cle, etat[cle])
+        stats.marques = Counter(etat['marques'])
+        stats.quantiles_prix = quantiles
+        return stats
+
+
+# ============================================================================
+# RÉPARTITION DES PRIX
+# ============================================================================
+
+class RepartitionPrix:
+    """
+    Répartition des prix du catalogue et de chaque marque
+
+    Un croquis de quantiles pour l'ensemble des produits et un par
+    marque (en minuscules), synchronisés paresseusement avec le stockage
+    comme les index.
+    """
+
+    def __init__(self, precision_quantiles: float = PRECISION_QUANTILES):
+        self.precision_quantiles = precision_quantiles
+        self.vider()
+
+    def vider(self):
+        """Oublier tous les prix"""
+        self.catalogue = CroquisQuantiles(self.precision_quantiles)
+        self.marques: Dict[str, CroquisQuantiles] = {}
+        # Prix modifiés depuis le dernier contrôle des références (tenu par l'agent)
+        self.nb_modifies = 0
+        self.nb_indexes = 0
+
+    def ajouter(self, prix: float, marque: str, nb: int = 1):
+        """Intégrer le prix d'un produit (nb négatif pour le retirer)"""
+        self.catalogue.ajouter(prix, nb)
+        cle = marque.lower()
+        croquis = self.marques.get(cle)
+        if croquis is None:
+            croquis = self.marques[cle] = CroquisQuantiles(self.precision_quantiles)
+        croquis.ajouter(prix, nb)
+
+    def modifier(self, i: int, marque: str, ancien: float, nouveau: float):
+        """Remplacer le prix d'un produit déjà intégré (ignoré sinon)"""
+        if i >= self.nb_indexes:
+            return
+        self.ajouter(ancien, marque, -1)
+        self.ajouter(nouveau, marque)
+        self.nb_modifies += 1
+
+    def synchroniser(self, stockage):
+        """Intégrer les produits ajoutés au stockage depuis le dernier appel"""
+        n = len(stockage)
+        if n < self.nb_indexes:
+            self.vider()
+        if n == self.nb_indexes:
+            return
+
+        debut = self.nb_indexes
+        for prix, marque in zip(stockage.colonne('prix', debut),
+                                stockage.colonne('marque', debut)):
+            self.ajouter(prix, marque)
+        self.nb_indexes = n
+
+    def references(self, centile: float,
+                   min_produits: int) -> Tuple[Optional[float], Dict[str, float]]:
+        """
+        Centile des prix du catalogue et de chaque marque
+
+        Args:
+            centile: Centile recherché (0 < centile <= 1)
+            min_produits: Nombre de produits en deçà duquel une
+                          répartition est ignorée
+
+        Returns:
+            (centile du catalogue ou None, {marque: centile})
+        """
+        catalogue = (self.catalogue.quantile(centile)
+                     if self.catalogue.nb >= min_produits else None)
+        marques = {marque: croquis.quantile(centile)
+                   for marque, croquis in self.marques.items() if croquis.nb >= min_produits}
+        return catalogue, marques
@@ -0,0 +1,602 @@
+"""
+STOCKAGE DES PRODUITS
+=====================
+
+Trois façons de conserver les produits d'un agent :
+
+- StockageListe    : simple liste de `Produit` (comportement historique)
+- StockageColonnes : stockage colonnaire compact, pensé pour les gros
+                     catalogues (plusieurs millions de produits)
+- StockageSQLite   : base SQLite sur disque, pour les catalogues qui ne
+                     tiennent pas en mémoire (cf. agents/stockage_sqlite.py)
+
+En mode colonnes, les valeurs numériques sont rangées dans des tableaux
+typés (`array`), les marques/sources sont internées sous forme de codes
+entiers, et les caractéristiques sont stockées en « offsets + valeurs ».
+Les objets `Produit` ne sont créés qu'à la demande (vues).
+
+Les stockages exposent la même interface, utilisée par l'agent :
+    len(stockage), stockage.ajouter(produit), stockage.ajouter_lot(produits),
+    stockage.etendre(colonnes),
+    stockage.produit(i), stockage.colonne(champ), stockage.acces(champ),
+    stockage.dict_produit(i), stockage.json_produit(i),
+    stockage.modifier(i, champs), stockage.modifier_extra(i, extra),
+    stockage.scorer(profil), stockage.vider()
+
+L'attribut `profil` d'un stockage est le profil de scoring de ses
+scores (cf. agents/scoring.py, None : PROFIL_DEFAUT), tenu par l'agent.
+"""
+
+from array import array
+from collections.abc import Sequence
+from typing import List, Dict, Any, Optional, Iterator, Callable, Tuple
+import weakref
+
+from .parallele import produits_depuis_colonnes
+from .produit import Produit, categorie_prix, encoder_json
+from .scoring import (
+    ProfilScoring, calculer_scores, prix_references, score_champs, scorer_produits
+)
+from .stockage_sqlite import StockageSQLite
+
+
+# Colonnes numériques disponibles via `colonne()`
+CHAMPS_NUMERIQUES = ('prix', 'note', 'nb_avis', 'score', 'stock')
+
+# Colonnes typées du stockage colonnaire (nom -> code de type `array`)
+COLONNES_TYPEES = {
+    'prix': 'd', 'note': 'd', 'nb_avis': 'q', 'score': 'd', 'stock': 'b',
+    'marque': 'I', 'source': 'I', 'carac_offsets': 'Q', 'carac_valeurs': 'I',
+}
+
+# Colonnes de chaînes (listes Python) du stockage colonnaire
+COLONNES_TEXTE = ('nom', 'url', 'image_url', 'date_ajout', 'extra')
+
+
+# ============================================================================
+# STOCKAGE LISTE (HISTORIQUE)
+# ============================================================================
+
+def _valeurs_numeriques(produit: Produit) -> Dict[str, Any]:
+    """Valeurs des CHAMPS_NUMERIQUES d'un produit"""
+    return {'prix': produit.prix, 'note': produit.note, 'nb_avis': produit.nb_avis,
+            'score': produit.score_qualite_prix, 'stock': produit.stock}
+
+
+class VueProduits(Sequence):
+    """
+    Liste des produits d'un stockage liste, en lecture seule
+
+    C'est `agent.produits` en mode liste : les index de l'agent suivent
+    les produits au fil des ajouts, et retirer, remplacer ou réordonner
+    des produits les rendrait faux. Le catalogue se modifie par l'agent
+    (ajouter_produit, mettre_a_jour, vider, `agent.produits = [...]`).
+    """
+    __slots__ = ('_produits',)
+
+    def __init__(self, produits: List[Produit]):
+        self._produits = produits
+
+    def __getitem__(self, i):
+        return self._produits[i]
+
+    def __len__(self):
+        return len(self._produits)
+
+    def __iter__(self) -> Iterator[Produit]:
+        return iter(self._produits)
+
+    def __eq__(self, autre):
+        if isinstance(autre, VueProduits):
+            autre = autre._produits
+        return self._produits == autre
+
+    def __repr__(self):
+        return repr(self._produits)
+
+    def _lecture_seule(self, *args, **kwargs):
+        raise TypeError("agent.produits est en lecture seule : ajouter_produit(), "
+                        "mettre_a_jour(), vider() ou agent.produits = [...]")
+
+    __setitem__ = __delitem__ = __iadd__ = _lecture_seule
+    append = extend = insert = pop = remove = clear = sort = reverse = _lecture_seule
+
+
+class StockageListe:
+    """
+    Stockage historique : une liste Python de `Produit`
+
+    Attributs :
+        produits: La liste des produits (exposée par l'agent en lecture
+                  seule, cf. VueProduits)
+    """
+
+    def __init__(self):
+        self.produits: List[Produit] = []
+        self.profil: Optional[ProfilScoring] = None
+
+    def ajouter(self, produit: Produit) -> int:
+        """Ajouter un produit, retourne son identifiant (position)"""
+        self.produits.append(produit)
+        return len(self.produits) - 1
+
+    def ajouter_lot(self, produits: List[Produit]) -> int:
+        """Ajouter des produits, retourne le nombre ajouté"""
+        self.produits.extend(produits)
+        return len(produits)
+
+    def etendre(self, colonnes) -> int:
+        """
+        Ajouter un lot de produits déjà scorés, donné en colonnes
+        (cf. parallele.COLONNES_LOT), retourne le nombre de produits ajoutés
+        """
+        return self.ajouter_lot(produits_depuis_colonnes(colonnes, self.profil))
+
+    def produit(self, i: int) -> Produit:
+        """Produit à la position i"""
+        return self.produits[i]
+
+    def colonne(self, champ: str, debut: int = 0) -> List[Any]:
+        """Valeurs d'un champ pour les produits à partir de la position `debut`"""
+        produits = self.produits[debut:] if debut else self.produits
+        if champ == 'score':
+            return [p.score_qualite_prix for p in produits]
+        return [getattr(p, champ) for p in produits]
+
+    def acces(self, champ: str) -> Callable[[int], Any]:
+        """Fonction i -> valeur du champ pour le produit i"""
+        produits = self.produits
+        if champ == 'score':
+            return lambda i: produits[i].score_qualite_prix
+        return lambda i: getattr(produits[i], champ)
+
+    def modifier(self, i: int, champs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Modifier des champs du produit i et recalculer son score
+
+        Returns:
+            Valeurs des CHAMPS_NUMERIQUES avant et après la modification
+        """
+        produit = self.produits[i]
+        avant = _valeurs_numeriques(produit)
+        produit.mettre_a_jour(**champs)
+        return avant, _valeurs_numeriques(produit)
+
+    def modifier_extra(self, i: int, extra: Dict[str, Any]):
+        """Remplacer les attributs personnalisés du produit i"""
+        self.produits[i].extra = extra
+
+    def scorer(self, profil: ProfilScoring) -> List[Tuple[int, Exception]]:
+        """
+        Recalculer tous les scores avec un profil, en un passage, sans
+        reconstruire les produits
+
+        Returns:
+            (identifiant, exception) des produits non scorables (score inchangé)
+        """
+        self.profil = profil
+        return scorer_produits(self.produits, profil=profil)
+
+    def caracteristiques(self, i: int) -> List[str]:
+        """Caractéristiques du produit i"""
+        return self.produits[i].caracteristiques
+
+    def marques_distinctes(self) -> List[str]:
+        """Liste des marques présentes"""
+        return list(set(p.marque for p in self.produits))
+
+    def dict_produit(self, i: int) -> Dict:
+        """Produit i sous forme de dictionnaire (cf. Produit.to_dict)"""
+        return self.produits[i].to_dict()
+
+    def json_produit(self, i: int) -> str:
+        """Produit i en JSON compact (cf. Produit.to_json, mis en cache)"""
+        return self.produits[i].to_json()
+
+    def vider(self):
+        """Supprimer tous les produits"""
+        self.produits = []
+
+    def __len__(self):
+        return len(self.produits)
+
+
+# ============================================================================
+# STOCKAGE COLONNAIRE
+# ============================================================================
+
+class TableCategories:
+    """
+    Table d'internement : associe chaque chaîne distincte à un code entier
+
+    Utilisée pour les marques, les sources et les caractéristiques,
+    qui se répètent énormément dans un catalogue.
+    """
+
+    def __init__(self):
+        self.valeurs: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, valeur: str) -> int:
+        """Code de la valeur (créé si nécessaire)"""
+        code = self._codes.get(valeur)
+        if code is None:
+            code = len(self.valeurs)
+            self._codes[valeur] = code
+            self.valeurs.append(valeur)
+        return code
+
+    def chercher(self, valeur: str) -> Optional[int]:
+        """Code de la valeur, ou None si elle n'a jamais été vue"""
+        return self._codes.get(valeur)
+
+    def __getitem__(self, code: int) -> str:
+        return self.valeurs[code]
+
+    def __len__(self):
+        return len(self.valeurs)
+
+
+class StockageColonnes(Sequence):
+    """
+    Stockage colonnaire des produits
+
+    Colonnes :
+        prix, note, score       : array('d')
+        nb_avis                 : array('q')
+        stock                   : array('b')
+        marque, source          : array('I') (codes dans une TableCategories)
+        carac_offsets           : array('Q') (N+1 bornes)
+        carac_valeurs           : array('I') (codes de caractéristiques)
+        nom, url, image_url,
+        date_ajout, extra       : listes Python
+
+    Le stockage se comporte comme une séquence de `Produit` : les vues
+    sont créées à la demande et partagées tant qu'elles sont utilisées.
+    Ces vues sont des copies en lecture : les modifier ne change pas les
+    colonnes.
+
+    Ouvert depuis un instantané (cf. agents/instantane.py), le stockage
+    lit ses colonnes directement dans le fichier projeté en mémoire
+    (`lecture_seule`) ; elles sont copiées en mémoire au premier ajout.
+    """
+
+    def __init__(self):
+        self.profil: Optional[ProfilScoring] = None
+        self.vider()
+
+    def vider(self):
+        """Supprimer tous les produits"""
+        self.prix = array('d')
+        self.note = array('d')
+        self.nb_avis = array('q')
+        self.score = array('d')
+        self.stock = array('b')
+
+        self.marque = array('I')
+        self.source = array('I')
+        self.marques = TableCategories()
+        self.sources = TableCategories()
+
+        self.carac_offsets = array('Q', [0])
+        self.carac_valeurs = array('I')
+        self.table_caracteristiques = TableCategories()
+
+        self.nom: List[str] = []
+        self.url: List[str] = []
+        self.image_url: List[str] = []
+        self.date_ajout: List[str] = []
+        self.extra: List[Optional[Dict[str, Any]]] = []
+
+        self.lecture_seule = False
+        self._vues = weakref.WeakValueDictionary()
+
+    def _rendre_modifiable(self):
+        """Copier en mémoire les colonnes projetées d'un instantané"""
+        if not self.lecture_seule:
+            return
+        for nom, code in COLONNES_TYPEES.items():
+            valeurs = array(code)
+            valeurs.frombytes(memoryview(getattr(self, nom)).cast('B'))
+            setattr(self, nom, valeurs)
+        for nom in COLONNES_TEXTE:
+            setattr(self, nom, list(getattr(self, nom)))
+        self.lecture_seule = False
+
+    @property
+    def produits(self) -> 'StockageColonnes':
+        """Séquence (paresseuse) des produits"""
+        return self
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def ajouter(self, produit: Produit) -> int:
+        """Décomposer un produit en colonnes, retourne son identifiant"""
+        self._rendre_modifiable()
+        i = len(self.prix)
+
+        # Conversions d'abord : une valeur invalide ne doit pas laisser
+        # des colonnes de longueurs différentes
+        prix = float(produit.prix)
+        note = float(produit.note)
+        nb_avis = int(produit.nb_avis)
+        score = float(produit.score_qualite_prix)
+
+        self.prix.append(prix)
+        self.note.append(note)
+        self.nb_avis.append(nb_avis)
+        self.score.append(score)
+        self.stock.append(1 if produit.stock else 0)
+
+        self.marque.append(self.marques.code(produit.marque))
+        self.source.append(self.sources.code(produit.source))
+
+        code_carac = self.table_caracteristiques.code
+        self.carac_valeurs.extend(code_carac(c) for c in produit.caracteristiques)
+        self.carac_offsets.append(len(self.carac_valeurs))
+
+        self.nom.append(produit.nom)
+        self.url.append(produit.url)
+        self.image_url.append(produit.image_url)
+        self.date_ajout.append(produit.date_ajout)
+        self.extra.append(produit.extra or None)
+
+        self._vues[i] = produit
+        return i
+
+    def ajouter_lot(self, produits: List[Produit]) -> int:
+        """Ajouter des produits, retourne le nombre ajouté"""
+        for produit in produits:
+            self.ajouter(produit)
+        return len(produits)
+
+    def etendre(self, colonnes) -> int:
+        """
+        Ajouter un lot de produits déjà scorés, donné en colonnes
+        (cf. parallele.COLONNES_LOT), retourne le nombre de produits ajoutés
+        """
+        (noms, marques, prix, notes, nb_avis, caracteristiques, urls,
+         sources, images, stocks, dates, extras, scores) = colonnes
+        self._rendre_modifiable()
+
+        # Conversions d'abord, comme pour `ajouter`
+        prix = array('d', map(float, prix))
+        notes = array('d', map(float, notes))
+        nb_avis = array('q', map(int, nb_avis))
+        scores = array('d', map(float, scores))
+
+        self.prix.extend(prix)
+        self.note.extend(notes)
+        self.nb_avis.extend(nb_avis)
+        self.score.extend(scores)
+        self.stock.extend(1 if s else 0 for s in stocks)
+
+        self.marque.extend(map(self.marques.code, marques))
+        self.source.extend(map(self.sources.code, sources))
+
+        # Caractéristiques : recodage du vocabulaire du lot dans la table
+        vocabulaire, offsets, codes = caracteristiques
+        recodage = [self.table_caracteristiques.code(c) for c in vocabulaire]
+        base = len(self.carac_valeurs)
+        self.carac_valeurs.extend([recodage[c] for c in codes])
+        self.carac_offsets.extend([base + o for o in offsets[1:]])
+
+        self.nom.extend(noms)
+        self.url.extend(urls)
+        self.image_url.extend(images)
+        self.date_ajout.extend(dates)
+        self.extra.extend(extras)
+        return len(noms)
+
+    def modifier(self, i: int, champs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Modifier des champs numériques du produit i et recalculer son
+        score (la vue existante est mise à jour)
+
+        Returns:
+            Valeurs des CHAMPS_NUMERIQUES avant et après la modification
+        """
+        self._rendre_modifiable()
+        avant = {champ: getattr(self, champ)[i] for champ in CHAMPS_NUMERIQUES}
+        valeurs = dict(avant, **champs)
+
+        # Conversions et score d'abord : une valeur invalide laisse le
+        # produit inchangé
+        prix = float(valeurs['prix'])
+        note = float(valeurs['note'])
+        nb_avis = int(valeurs['nb_avis'])
+        stock = 1 if valeurs['stock'] else 0
+        score = float(score_champs(self.profil, note, prix, nb_avis,
+                                   self.carac_offsets[i + 1] - self.carac_offsets[i],
+                                   self.marques[self.marque[i]], self.extra[i]))
+
+        self.prix[i] = prix
+        self.note[i] = note
+        self.nb_avis[i] = nb_avis
+        self.stock[i] = stock
+        self.score[i] = score
+        vue = self._vues.get(i)
+        if vue is not None:
+            for champ, valeur in champs.items():
+                setattr(vue, champ, valeur)
+            vue._score = score
+            vue.invalider_serialisation()
+        return avant, {champ: getattr(self, champ)[i] for champ in CHAMPS_NUMERIQUES}
+
+    def modifier_extra(self, i: int, extra: Dict[str, Any]):
+        """Remplacer les attributs personnalisés du produit i"""
+        self._rendre_modifiable()
+        self.extra[i] = dict(extra) or None
+        vue = self._vues.get(i)
+        if vue is not None:
+            vue.extra = dict(extra)
+
+    def scorer(self, profil: ProfilScoring) -> List[Tuple[int, Exception]]:
+        """
+        Recalculer tous les scores avec un profil, en un passage sur les
+        colonnes (les vues existantes sont mises à jour)
+        """
+        offsets = self.carac_offsets
+        nb_caracteristiques = [offsets[i + 1] - offsets[i] for i in range(len(self))]
+        marques = self.colonne('marque') if profil.references_marques else None
+        self.score = array('d', calculer_scores(
+            self.note, self.prix, self.nb_avis, nb_caracteristiques,
+            prix_references(self.extra, profil, marques), profil=profil))
+        self.profil = profil
+        for i, vue in list(self._vues.items()):
+            vue._profil = profil
+            vue._score = self.score[i]
+        return []
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def colonne(self, champ: str, debut: int = 0) -> Sequence:
+        """
+        Valeurs d'un champ pour les produits à partir de la position `debut`
+
+        Les champs numériques renvoient directement le tableau typé
+        (sans copie si `debut` vaut 0) ; les champs texte renvoient une
+        liste décodée.
+        """
+        if champ in CHAMPS_NUMERIQUES or champ in ('nom', 'url', 'image_url', 'date_ajout'):
+            valeurs = getattr(self, champ)
+            return valeurs[debut:] if debut else valeurs
+        if champ == 'marque':
+            table = self.marques.valeurs
+            return [table[c] for c in self.marque[debut:]]
+        if champ == 'source':
+            table = self.sources.valeurs
+            return [table[c] for c in self.source[debut:]]
+        if champ == 'caracteristiques':
+            return [self.caracteristiques(i) for i in range(debut, len(self))]
+        if champ == 'extra':
+            return [dict(e) if e else {} for e in self.extra[debut:]]
+        raise KeyError(champ)
+
+    def acces(self, champ: str) -> Callable[[int], Any]:
+        """Fonction i -> valeur du champ pour le produit i"""
+        if champ in CHAMPS_NUMERIQUES or champ in ('nom', 'url', 'image_url', 'date_ajout'):
+            return getattr(self, champ).__getitem__
+        if champ == 'marque':
+            table, codes = self.marques.valeurs, self.marque
+            return lambda i: table[codes[i]]
+        if champ == 'source':
+            table, codes = self.sources.valeurs, self.source
+            return lambda i: table[codes[i]]
+        if champ == 'caracteristiques':
+            return self.caracteristiques
+        if champ == 'extra':
+            # Dictionnaire stocké, sans copie : à ne pas modifier
+            extra = self.extra
+            return lambda i: extra[i] or {}
+        raise KeyError(champ)
+
+    def caracteristiques(self, i: int) -> List[str]:
+        """Caractéristiques du produit i"""
+        valeurs = self.table_caracteristiques.valeurs
+        debut, fin = self.carac_offsets[i], self.carac_offsets[i + 1]
+        return [valeurs[c] for c in self.carac_valeurs[debut:fin]]
+
+    def marques_distinctes(self) -> List[str]:
+        """Liste des marques présentes"""
+        valeurs = self.marques.valeurs
+        return [valeurs[c] for c in set(self.marque)]
+
+    def produit(self, i: int) -> Produit:
+        """Vue `Produit` du produit i (créée à la demande)"""
+        produit = self._vues.get(i)
+        if produit is None:
+            produit = Produit(
+                nom=self.nom[i],
+                marque=self.marques[self.marque[i]],
+                prix=self.prix[i],
+                note=self.note[i],
+                nb_avis=self.nb_avis[i],
+                caracteristiques=self.caracteristiques(i),
+                url=self.url[i],
+                source=self.sources[self.source[i]],
+                image_url=self.image_url[i],
+                stock=bool(self.stock[i]),
+                date_ajout=self.date_ajout[i],
+                extra=dict(self.extra[i] or {})
+            )
+            produit._score = self.score[i]
+            produit._profil = self.profil
+            self._vues[i] = produit
+        return produit
+
+    def dict_produit(self, i: int) -> Dict:
+        """Produit i sous forme de dictionnaire, sans créer de `Produit`"""
+        prix = self.prix[i]
+        return {
+            'nom': self.nom[i],
+            'marque': self.marques[self.marque[i]],
+            'prix': prix,
+            'note': self.note[i],
+            'nb_avis': self.nb_avis[i],
+            'score_qualite_prix': self.score[i],
+            'categorie_prix': categorie_prix(prix, self.profil),
+            'caracteristiques': self.caracteristiques(i),
+            'url': self.url[i],
+            'source': self.sources[self.source[i]],
+            'stock': bool(self.stock[i]),
+            'extra': dict(self.extra[i] or {})
+        }
+
+    def json_produit(self, i: int) -> str:
+        """Produit i en JSON compact (réutilise la vue `Produit` si elle existe)"""
+        vue = self._vues.get(i)
+        if vue is not None:
+            return vue.to_json()
+        return encoder_json(self.dict_produit(i))
+
+    # ------------------------------------------------------------------
+    # Protocole séquence
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.prix)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.produit(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index de produit hors limites")
+        return self.produit(index)
+
+    def __iter__(self) -> Iterator[Produit]:
+        for i in range(len(self)):
+            yield self.produit(i)
+
+
+# ============================================================================
+# FABRIQUE
+# ============================================================================
+
+STOCKAGES = {
+    'liste': StockageListe,
+    'colonnes': StockageColonnes,
+    'sqlite': StockageSQLite,
+}
+
+
+def creer_stockage(stockage='liste'):
+    """
+    Créer un stockage à partir de son nom ('liste', 'colonnes', 'sqlite'
+    en mémoire) ou retourner tel quel un stockage déjà construit
+    (ex. StockageSQLite('catalogue.sqlite'))
+    """
+    if isinstance(stockage, str):
+        try:
+            return STOCKAGES[stockage]()
+        except KeyError:
+            raise ValueError(
+                f"Stockage inconnu : {stockage!r} (choix : {', '.join(STOCKAGES)})"
+            )
+    return stockage
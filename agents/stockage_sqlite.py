@@ -0,0 +1,588 @@
+"""
+STOCKAGE SQLITE
+===============
+
+Stockage des produits dans une base SQLite (bibliothèque standard),
+pour les catalogues trop gros pour la mémoire :
+
+    stockage = StockageSQLite('data/catalogue.sqlite')
+    agent = AgentProduitUniversel("smartphone", stockage=stockage)
+
+Un catalogue déjà écrit s'ouvre instantanément : rien n'est chargé en
+Python. Les filtres, le top N et les statistiques de l'agent (et de ses
+requêtes, cf. agents/requete.py) sont traduits en SQL et s'appuient sur
+les index de la base (prix, note, score, nb_avis, marque).
+
+- ajouts en masse dans une transaction (`ajouter_lot`, `etendre`)
+- journal WAL : les lectures ne sont pas bloquées par une écriture
+  depuis un autre processus
+- le profil de scoring des produits est noté dans la base (table
+  `meta`) : l'agent qui la rouvre avec un autre profil la rescore
+- utilisable depuis plusieurs threads (ex. le thread d'ajout de la
+  collecte, cf. agents/collecte.py) : la connexion est partagée et
+  chaque accès passe par un verrou
+- les produits sont identifiés par leur position (colonne `id`), comme
+  dans les autres stockages ; les `Produit` lus sont des copies
+
+Le stockage expose l'interface commune (cf. agents/stockage.py) et, en
+plus, les méthodes utilisées par l'agent pour déléguer ses calculs à
+SQLite : `selectionner`, `compter`, `statistiques`, `quantile_prix`...
+Une condition est un couple (clause SQL, paramètres).
+"""
+
+from collections.abc import Sequence
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .index import CRITERES_TRI
+from .parallele import decoder_caracteristiques
+from .produit import Produit, categorie_prix, encoder_json
+from .scoring import (
+    PROFIL_DEFAUT, ProfilScoring, calculer_scores, prix_references, score_champs
+)
+from .statistiques import StatistiquesCourantes
+
+
+# Produits lus ensemble par requête (limite de paramètres SQLite)
+TAILLE_PAQUET_SQL = 500
+
+# Produits rescorés ensemble (cf. StockageSQLite.scorer)
+TAILLE_PAQUET_SCORES = 10000
+
+# Séparateur des caractéristiques dans la colonne de recherche
+SEPARATEUR = '\x1f'
+
+Condition = Tuple[str, List[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS produits (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    marque TEXT NOT NULL,
+    marque_cle TEXT NOT NULL,
+    prix REAL NOT NULL,
+    note REAL NOT NULL,
+    nb_avis INTEGER NOT NULL,
+    score REAL NOT NULL,
+    stock INTEGER NOT NULL,
+    caracteristiques TEXT NOT NULL,
+    caracteristiques_cle TEXT NOT NULL,
+    url TEXT,
+    source TEXT,
+    image_url TEXT,
+    date_ajout TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS produits_prix ON produits (prix);
+CREATE INDEX IF NOT EXISTS produits_note ON produits (note DESC);
+CREATE INDEX IF NOT EXISTS produits_score ON produits (score DESC);
+CREATE INDEX IF NOT EXISTS produits_nb_avis ON produits (nb_avis DESC);
+CREATE INDEX IF NOT EXISTS produits_marque ON produits (marque_cle);
+CREATE TABLE IF NOT EXISTS meta (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT NOT NULL
+);
+"""
+
+_INSERTION = (
+    "INSERT INTO produits (id, nom, marque, marque_cle, prix, note, nb_avis, score, stock, "
+    "caracteristiques, caracteristiques_cle, url, source, image_url, date_ajout, extra) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_CHAMPS_LECTURE = ('nom, marque, prix, note, nb_avis, score, stock, caracteristiques, '
+                   'url, source, image_url, date_ajout, extra')
+
+# Champs numériques réécrits par `modifier()`
+_CHAMPS_MODIFIABLES = ('prix', 'note', 'nb_avis', 'score', 'stock')
+
+# Champs lisibles via `colonne()` / `acces()` (caracteristiques à part)
+CHAMPS_SQL = ('nom', 'marque', 'prix', 'note', 'nb_avis', 'score', 'stock',
+              'url', 'source', 'image_url', 'date_ajout')
+
+
+def _ligne(nom, marque, prix, note, nb_avis, score, stock,
+          caracteristiques, url, source, image_url, date_ajout, extra) -> tuple:
+    """
+    Ligne de la table `produits`, sans son identifiant (conversions faites
+    avant toute écriture)
+    """
+    return (nom, marque, marque.lower(), float(prix), float(note), int(nb_avis),
+            float(score), 1 if stock else 0,
+            json.dumps(caracteristiques, ensure_ascii=False),
+            SEPARATEUR.join(c.lower() for c in caracteristiques),
+            url, source, image_url, date_ajout,
+            json.dumps(extra, ensure_ascii=False, default=str) if extra else None)
+
+
+def _lignes_produits(produits: List[Produit]) -> List[tuple]:
+    """Lignes de la table `produits` des produits donnés (cf. _ligne)"""
+    return [_ligne(p.nom, p.marque, p.prix, p.note, p.nb_avis, p.score_qualite_prix,
+                   p.stock, p.caracteristiques, p.url, p.source, p.image_url,
+                   p.date_ajout, p.extra)
+            for p in produits]
+
+
+def _where(conditions: Iterable[Condition]) -> Tuple[str, List[Any]]:
+    """Clause WHERE (éventuellement vide) et ses paramètres"""
+    clauses, parametres = [], []
+    for clause, valeurs in conditions:
+        clauses.append(f"({clause})")
+        parametres.extend(valeurs)
+    if not clauses:
+        return '', parametres
+    return ' WHERE ' + ' AND '.join(clauses), parametres
+
+
+def _ordre(critere: Optional[str]) -> str:
+    """Clause ORDER BY d'un critère de tri (ordre d'insertion à égalité)"""
+    if critere not in CRITERES_TRI:
+        return ' ORDER BY id'
+    champ, decroissant = CRITERES_TRI[critere]
+    return f" ORDER BY {champ} {'DESC' if decroissant else 'ASC'}, id"
+
+
+class StockageSQLite(Sequence):
+    """
+    Stockage des produits dans une table SQLite
+
+    Se comporte comme une séquence (paresseuse) de `Produit`.
+    """
+
+    # L'agent délègue filtres, tris et agrégats à la base
+    sql = True
+
+    def __init__(self, fichier: str = ':memory:'):
+        """
+        Args:
+            fichier: Base SQLite (créée si besoin ; ':memory:' = en mémoire)
+        """
+        self.fichier = fichier
+        # Connexion partagée entre threads, un accès à la fois
+        self._connexion = sqlite3.connect(fichier, check_same_thread=False)
+        self._verrou = threading.Lock()
+        if fichier != ':memory:':
+            self._connexion.execute("PRAGMA journal_mode=WAL")
+            self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.executescript(_SCHEMA)
+        dernier = self._connexion.execute("SELECT MAX(id) FROM produits").fetchone()[0]
+        self._nb = 0 if dernier is None else dernier + 1
+        self.profil: Optional[ProfilScoring] = None
+        # Profil qui a scoré les produits de la base (None : non noté)
+        enregistre = self._connexion.execute(
+            "SELECT valeur FROM meta WHERE cle = 'profil'").fetchone()
+        self._profil_base: Optional[ProfilScoring] = (
+            None if enregistre is None else ProfilScoring.depuis_dict(json.loads(enregistre[0])))
+
+    @property
+    def profil_base(self) -> Optional[ProfilScoring]:
+        """Profil de scoring des produits de la base (None s'il n'a pas été noté)"""
+        return self._profil_base
+
+    @property
+    def produits(self) -> 'StockageSQLite':
+        """Séquence (paresseuse) des produits"""
+        return self
+
+    # ------------------------------------------------------------------
+    # Accès à la connexion
+    # ------------------------------------------------------------------
+
+    def _lignes_requete(self, requete: str, parametres=()) -> List[tuple]:
+        """Toutes les lignes d'une requête de lecture"""
+        with self._verrou:
+            return self._connexion.execute(requete, parametres).fetchall()
+
+    def _ligne_requete(self, requete: str, parametres=()) -> Optional[tuple]:
+        """Première ligne d'une requête de lecture (None si aucune)"""
+        with self._verrou:
+            return self._connexion.execute(requete, parametres).fetchone()
+
+    def _flux_requete(self, requete: str, parametres=()) -> Iterator[tuple]:
+        """
+        Lignes d'une requête lues par paquets de TAILLE_PAQUET_SQL : le
+        verrou n'est pas tenu entre deux paquets
+        """
+        with self._verrou:
+            curseur = self._connexion.execute(requete, parametres)
+            paquet = curseur.fetchmany(TAILLE_PAQUET_SQL)
+        while paquet:
+            yield from paquet
+            with self._verrou:
+                paquet = curseur.fetchmany(TAILLE_PAQUET_SQL)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def _noter_profil(self):
+        """Noter le profil courant dans la base (transaction en cours)"""
+        profil = self.profil or PROFIL_DEFAUT
+        if profil != self._profil_base:
+            self._connexion.execute(
+                "INSERT OR REPLACE INTO meta (cle, valeur) VALUES ('profil', ?)",
+                (json.dumps(profil.to_dict(), ensure_ascii=False),))
+            self._profil_base = profil
+
+    def _inserer(self, lignes: List[tuple]) -> int:
+        """
+        Insérer des lignes (cf. _ligne) en une transaction, à la suite du
+        catalogue ; retourne l'identifiant de la première
+        """
+        with self._verrou, self._connexion:
+            debut = self._nb
+            self._connexion.executemany(
+                _INSERTION, ((debut + k,) + ligne for k, ligne in enumerate(lignes)))
+            self._noter_profil()
+            self._nb += len(lignes)
+        return debut
+
+    def ajouter(self, produit: Produit) -> int:
+        """Ajouter un produit, retourne son identifiant (position)"""
+        return self._inserer(_lignes_produits([produit]))
+
+    def ajouter_lot(self, produits: List[Produit]) -> int:
+        """Ajouter des produits en une transaction, retourne le nombre ajouté"""
+        lignes = _lignes_produits(produits)
+        self._inserer(lignes)
+        return len(lignes)
+
+    def etendre(self, colonnes) -> int:
+        """
+        Ajouter un lot de produits déjà scorés, donné en colonnes
+        (cf. parallele.COLONNES_LOT), en une transaction
+        """
+        (noms, marques, prix, notes, nb_avis, caracteristiques, urls,
+         sources, images, stocks, dates, extras, scores) = colonnes
+        caracteristiques = decoder_caracteristiques(caracteristiques)
+        self._inserer([
+            _ligne(noms[k], marques[k], prix[k], notes[k], nb_avis[k],
+                   scores[k], stocks[k], caracteristiques[k], urls[k], sources[k],
+                   images[k], dates[k], extras[k])
+            for k in range(len(noms))
+        ])
+        return len(noms)
+
+    def modifier(self, i: int, champs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Modifier des champs numériques du produit i et recalculer son score
+
+        Returns:
+            Valeurs de prix, note, nb_avis, score et stock avant et après
+            la modification
+        """
+        ligne = self._ligne_requete(
+            "SELECT prix, note, nb_avis, score, stock, marque, caracteristiques, extra "
+            "FROM produits WHERE id = ?", (i,))
+        if ligne is None:
+            raise IndexError(i)
+        avant = dict(zip(_CHAMPS_MODIFIABLES, ligne))
+        valeurs = dict(avant, **champs)
+        apres = {
+            'prix': float(valeurs['prix']),
+            'note': float(valeurs['note']),
+            'nb_avis': int(valeurs['nb_avis']),
+            'stock': 1 if valeurs['stock'] else 0,
+        }
+        extra = ligne[7]
+        apres['score'] = float(score_champs(
+            self.profil, apres['note'], apres['prix'], apres['nb_avis'],
+            len(json.loads(ligne[6])), ligne[5],
+            json.loads(extra) if extra and 'prix_reference' in extra else None))
+        with self._verrou, self._connexion:
+            self._connexion.execute(
+                "UPDATE produits SET prix = ?, note = ?, nb_avis = ?, score = ?, stock = ? "
+                "WHERE id = ?", (*(apres[champ] for champ in _CHAMPS_MODIFIABLES), i))
+            self._noter_profil()
+        return avant, apres
+
+    def modifier_extra(self, i: int, extra: Dict[str, Any]):
+        """Remplacer les attributs personnalisés du produit i"""
+        with self._verrou, self._connexion:
+            self._connexion.execute(
+                "UPDATE produits SET extra = ? WHERE id = ?",
+                (json.dumps(extra, ensure_ascii=False, default=str) if extra else None, i))
+
+    def scorer(self, profil: ProfilScoring) -> List[Tuple[int, Exception]]:
+        """
+        Recalculer tous les scores avec un profil, par paquets, en une
+        transaction
+        """
+        with self._verrou, self._connexion:
+            for debut in range(0, self._nb, TAILLE_PAQUET_SCORES):
+                ids, notes, prix, nb_avis, nb_carac, extras, marques = [], [], [], [], [], [], []
+                for i, note, p, avis, caracteristiques, extra, marque in self._connexion.execute(
+                        "SELECT id, note, prix, nb_avis, caracteristiques, extra, marque "
+                        "FROM produits "
+                        "WHERE id >= ? AND id < ? ORDER BY id",
+                        (debut, debut + TAILLE_PAQUET_SCORES)):
+                    ids.append(i)
+                    notes.append(note)
+                    prix.append(p)
+                    nb_avis.append(avis)
+                    nb_carac.append(len(json.loads(caracteristiques)))
+                    # Seul `prix_reference` est lu dans les attributs personnalisés
+                    extras.append(json.loads(extra) if extra and 'prix_reference' in extra else None)
+                    marques.append(marque)
+                scores = calculer_scores(notes, prix, nb_avis, nb_carac,
+                                         prix_references(extras, profil, marques),
+                                         profil=profil)
+                self._connexion.executemany("UPDATE produits SET score = ? WHERE id = ?",
+                                            zip(scores, ids))
+            self.profil = profil
+            self._noter_profil()
+        return []
+
+    def vider(self):
+        """Supprimer tous les produits"""
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM produits")
+            self._nb = 0
+
+    def fermer(self):
+        """Fermer la base"""
+        with self._verrou:
+            self._connexion.close()
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _produit(self, ligne: tuple) -> Produit:
+        (nom, marque, prix, note, nb_avis, score, stock, caracteristiques,
+         url, source, image_url, date_ajout, extra) = ligne
+        produit = Produit(
+            nom=nom, marque=marque, prix=prix, note=note, nb_avis=nb_avis,
+            caracteristiques=json.loads(caracteristiques), url=url, source=source,
+            image_url=image_url, stock=bool(stock), date_ajout=date_ajout,
+            extra=json.loads(extra) if extra else {}
+        )
+        produit._score = score
+        produit._profil = self.profil
+        return produit
+
+    def _dict(self, ligne: tuple) -> Dict:
+        (nom, marque, prix, note, nb_avis, score, stock, caracteristiques,
+         url, source, _, _, extra) = ligne
+        return {
+            'nom': nom,
+            'marque': marque,
+            'prix': prix,
+            'note': note,
+            'nb_avis': nb_avis,
+            'score_qualite_prix': score,
+            'categorie_prix': categorie_prix(prix, self.profil),
+            'caracteristiques': json.loads(caracteristiques),
+            'url': url,
+            'source': source,
+            'stock': bool(stock),
+            'extra': json.loads(extra) if extra else {}
+        }
+
+    def _lire(self, i: int) -> tuple:
+        ligne = self._ligne_requete(
+            f"SELECT {_CHAMPS_LECTURE} FROM produits WHERE id = ?", (i,))
+        if ligne is None:
+            raise IndexError("index de produit hors limites")
+        return ligne
+
+    def _lignes(self, ids: Iterable[int]) -> Iterator[tuple]:
+        """Lignes des produits donnés, dans l'ordre des identifiants"""
+        if isinstance(ids, range) and ids.step == 1:
+            yield from self._flux_requete(
+                f"SELECT {_CHAMPS_LECTURE} FROM produits WHERE id >= ? AND id < ? ORDER BY id",
+                (ids.start, ids.stop))
+            return
+        ids = list(ids)
+        for debut in range(0, len(ids), TAILLE_PAQUET_SQL):
+            paquet = ids[debut:debut + TAILLE_PAQUET_SQL]
+            parametres = ','.join('?' * len(paquet))
+            lignes = dict(
+                (ligne[0], ligne[1:]) for ligne in self._lignes_requete(
+                    f"SELECT id, {_CHAMPS_LECTURE} FROM produits WHERE id IN ({parametres})",
+                    paquet))
+            for i in paquet:
+                yield lignes[i]
+
+    def produit(self, i: int) -> Produit:
+        """Produit i (copie lue dans la base)"""
+        return self._produit(self._lire(i))
+
+    def produits_ids(self, ids: Iterable[int]) -> List[Produit]:
+        """Produits donnés, lus par paquets"""
+        return [self._produit(ligne) for ligne in self._lignes(ids)]
+
+    def dict_produit(self, i: int) -> Dict:
+        """Produit i sous forme de dictionnaire, sans créer de `Produit`"""
+        return self._dict(self._lire(i))
+
+    def json_produit(self, i: int) -> str:
+        """Produit i en JSON compact"""
+        return encoder_json(self.dict_produit(i))
+
+    def dicts_produits(self, ids: Iterable[int]) -> Iterator[Dict]:
+        """Produits donnés sous forme de dictionnaires, lus par paquets"""
+        for ligne in self._lignes(ids):
+            yield self._dict(ligne)
+
+    def colonne(self, champ: str, debut: int = 0) -> List[Any]:
+        """Valeurs d'un champ pour les produits à partir de la position `debut`"""
+        if champ == 'caracteristiques':
+            return [json.loads(c) for (c,) in self._lignes_requete(
+                "SELECT caracteristiques FROM produits WHERE id >= ? ORDER BY id", (debut,))]
+        if champ == 'extra':
+            return [json.loads(e) if e else {} for (e,) in self._lignes_requete(
+                "SELECT extra FROM produits WHERE id >= ? ORDER BY id", (debut,))]
+        if champ not in CHAMPS_SQL:
+            raise KeyError(champ)
+        valeurs = [v for (v,) in self._lignes_requete(
+            f"SELECT {champ} FROM produits WHERE id >= ? ORDER BY id", (debut,))]
+        if champ == 'stock':
+            return [bool(v) for v in valeurs]
+        return valeurs
+
+    def acces(self, champ: str) -> Callable[[int], Any]:
+        """Fonction i -> valeur du champ pour le produit i (une requête par appel)"""
+        if champ == 'caracteristiques':
+            return self.caracteristiques
+        if champ not in CHAMPS_SQL:
+            raise KeyError(champ)
+        lire = self._ligne_requete
+        requete = f"SELECT {champ} FROM produits WHERE id = ?"
+        return lambda i: lire(requete, (i,))[0]
+
+    def caracteristiques(self, i: int) -> List[str]:
+        """Caractéristiques du produit i"""
+        ligne = self._ligne_requete(
+            "SELECT caracteristiques FROM produits WHERE id = ?", (i,))
+        return json.loads(ligne[0])
+
+    def marques_distinctes(self) -> List[str]:
+        """Liste des marques présentes"""
+        return [m for (m,) in self._lignes_requete("SELECT DISTINCT marque FROM produits")]
+
+    # ------------------------------------------------------------------
+    # Calculs délégués à SQLite
+    # ------------------------------------------------------------------
+
+    def iterer_ids(self, conditions: Iterable[Condition] = (),
+                   critere: Optional[str] = None) -> Iterator[int]:
+        """Identifiants vérifiant les conditions, triés selon le critère (flux)"""
+        where, parametres = _where(conditions)
+        for (i,) in self._flux_requete(
+                f"SELECT id FROM produits{where}{_ordre(critere)}", parametres):
+            yield i
+
+    def selectionner(self, conditions: Iterable[Condition] = (),
+                     critere: Optional[str] = None,
+                     limite: Optional[int] = None) -> List[int]:
+        """
+        Identifiants vérifiant les conditions
+
+        Args:
+            conditions: Conditions SQL (combinées par ET)
+            critere: Critère de CRITERES_TRI (défaut : ordre d'insertion)
+            limite: Nombre maximal d'identifiants (top N)
+        """
+        where, parametres = _where(conditions)
+        requete = f"SELECT id FROM produits{where}{_ordre(critere)}"
+        if limite is not None:
+            requete += " LIMIT ?"
+            parametres.append(max(limite, 0))
+        return [i for (i,) in self._lignes_requete(requete, parametres)]
+
+    def compter(self, conditions: Iterable[Condition] = ()) -> int:
+        """Nombre de produits vérifiant les conditions"""
+        where, parametres = _where(conditions)
+        return self._ligne_requete(
+            f"SELECT COUNT(*) FROM produits{where}", parametres)[0]
+
+    def statistiques(self, conditions: Iterable[Condition] = ()) -> StatistiquesCourantes:
+        """
+        Agrégats des produits vérifiant les conditions
+
+        Le croquis des quantiles n'est pas rempli (cf. `quantile_prix`).
+        """
+        conditions = list(conditions)
+        where, parametres = _where(conditions)
+        (nb, somme_prix, prix_min, prix_max, nb_notes, somme_notes,
+         somme_scores) = self._ligne_requete(
+            "SELECT COUNT(*), SUM(prix), MIN(prix), MAX(prix), "
+            "COUNT(CASE WHEN note > 0 THEN 1 END), "
+            "TOTAL(CASE WHEN note > 0 THEN note END), TOTAL(score) "
+            f"FROM produits{where}", parametres)
+
+        stats = StatistiquesCourantes()
+        if not nb:
+            return stats
+        stats.nb, stats.somme_prix = nb, somme_prix
+        stats.prix_min, stats.prix_max = prix_min, prix_max
+        stats.nb_notes, stats.somme_notes = nb_notes, somme_notes
+        stats.somme_scores = somme_scores
+        stats.marques.update(dict(self._lignes_requete(
+            f"SELECT marque, COUNT(*) FROM produits{where} GROUP BY marque", parametres)))
+        return stats
+
+    def statistiques_ids(self, ids: Iterable[int]) -> StatistiquesCourantes:
+        """Agrégats (croquis compris) d'une liste de produits, lus par paquets"""
+        stats = StatistiquesCourantes()
+        ids = list(ids)
+        for debut in range(0, len(ids), TAILLE_PAQUET_SQL):
+            paquet = ids[debut:debut + TAILLE_PAQUET_SQL]
+            parametres = ','.join('?' * len(paquet))
+            for prix, note, score, marque in self._lignes_requete(
+                    f"SELECT prix, note, score, marque FROM produits WHERE id IN ({parametres})",
+                    paquet):
+                stats.ajouter(prix, note, score, marque)
+        return stats
+
+    def remplir_quantiles(self, stats: StatistiquesCourantes):
+        """Remplir le croquis des quantiles de prix de tout le catalogue"""
+        ajouter = stats.quantiles_prix.ajouter
+        for prix, nb in self._flux_requete(
+                "SELECT prix, COUNT(*) FROM produits GROUP BY prix"):
+            ajouter(prix, nb)
+
+    def quantile_prix(self, q: float, conditions: Iterable[Condition] = ()) -> Optional[float]:
+        """Quantile exact des prix (index des prix), None si aucun produit"""
+        conditions = list(conditions)
+        nb = self.compter(conditions)
+        if not nb:
+            return None
+        where, parametres = _where(conditions)
+        parametres.append(int(q * (nb - 1)))
+        return self._ligne_requete(
+            f"SELECT prix FROM produits{where} ORDER BY prix LIMIT 1 OFFSET ?",
+            parametres)[0]
+
+    def expliquer(self, conditions: Iterable[Condition] = (),
+                  critere: Optional[str] = None) -> List[str]:
+        """Plan SQLite (EXPLAIN QUERY PLAN) d'une sélection"""
+        where, parametres = _where(conditions)
+        return [ligne[-1] for ligne in self._lignes_requete(
+            f"EXPLAIN QUERY PLAN SELECT id FROM produits{where}{_ordre(critere)}", parametres)]
+
+    # ------------------------------------------------------------------
+    # Protocole séquence
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self._nb
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.produits_ids(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index de produit hors limites")
+        return self.produit(index)
+
+    def __iter__(self) -> Iterator[Produit]:
+        for ligne in self._lignes(range(len(self))):
+            yield self._produit(ligne)
+
+    def __repr__(self):
+        return f"<StockageSQLite({self.fichier!r}): {len(self)} produits>"
@@ -0,0 +1,257 @@
+"""
+SUIVI DES PRIX
+==============
+
+Mémoire des prix observés, pour la surveillance :
+
+    suivi = SuiviPrix('data/suivi_prix.sqlite', seuil_baisse=0.10)
+    alertes = suivi.observer(produits)     # dicts ou Produit
+    for alerte in alertes:
+        print(alerte)
+
+Chaque produit est identifié par son URL, ou à défaut par
+source + nom + marque. Le dernier prix de chaque produit est conservé
+dans une base SQLite (bibliothèque standard) avec l'historique de ses
+changements. `observer` compare les nouveaux prix aux précédents en une
+passe, par recherche indexée : le coût dépend du nombre de produits
+observés et modifiés, pas de la taille de la base, qui n'est jamais
+rechargée en entier.
+
+Un suivi peut être alimenté depuis un autre thread que celui qui l'a
+créé (ex. `apres_lot` d'une collecte, cf. agents/collecte.py) : chaque
+opération sur la base passe par un verrou.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Variation relative déclenchant une alerte
+SEUIL_BAISSE = 0.10
+SEUIL_HAUSSE = 0.10
+
+# Identités recherchées par requête SQL (limite de paramètres SQLite)
+TAILLE_PAQUET_SQL = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prix (
+    identite TEXT PRIMARY KEY,
+    nom TEXT,
+    prix REAL NOT NULL,
+    prix_precedent REAL,
+    date TEXT
+);
+CREATE TABLE IF NOT EXISTS historique (
+    identite TEXT NOT NULL,
+    date TEXT,
+    prix REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS historique_identite ON historique (identite);
+"""
+
+
+@dataclass
+class AlertePrix:
+    """
+    Variation de prix dépassant un seuil
+
+    Attributs :
+        identite: Identité du produit
+        nom: Nom du produit
+        prix_precedent: Dernier prix connu
+        prix: Nouveau prix
+        variation: (prix - prix_precedent) / prix_precedent
+        type: 'baisse' ou 'hausse'
+    """
+    identite: str
+    nom: str
+    prix_precedent: float
+    prix: float
+    variation: float
+    type: str
+
+    def __str__(self):
+        symbole = "🔻" if self.type == 'baisse' else "🔺"
+        return (f"{symbole} {self.nom} : {self.prix_precedent}€ -> {self.prix}€ "
+                f"({self.variation:+.0%})")
+
+
+def _champ(produit: Any, nom: str, defaut=''):
+    if isinstance(produit, dict):
+        return produit.get(nom, defaut)
+    return getattr(produit, nom, defaut)
+
+
+def identite(produit: Any) -> str:
+    """Identité d'un produit (dict ou Produit) : URL, sinon source|nom|marque"""
+    url = _champ(produit, 'url')
+    if url:
+        return url
+    return '|'.join(str(_champ(produit, c)).strip().lower() for c in ('source', 'nom', 'marque'))
+
+
+class SuiviPrix:
+    """
+    Derniers prix connus et historique des changements (SQLite)
+
+    Attributs :
+        seuil_baisse: Baisse relative déclenchant une alerte (0.10 = 10%)
+        seuil_hausse: Hausse relative déclenchant une alerte
+    """
+
+    def __init__(self,
+                 fichier: str = ':memory:',
+                 seuil_baisse: float = SEUIL_BAISSE,
+                 seuil_hausse: float = SEUIL_HAUSSE):
+        """
+        Args:
+            fichier: Base SQLite (créée si besoin ; ':memory:' = en mémoire)
+            seuil_baisse: Baisse relative déclenchant une alerte
+            seuil_hausse: Hausse relative déclenchant une alerte
+        """
+        self.seuil_baisse = seuil_baisse
+        self.seuil_hausse = seuil_hausse
+        # Connexion partagée entre threads, une opération à la fois
+        self._connexion = sqlite3.connect(fichier, check_same_thread=False)
+        self._connexion.executescript(_SCHEMA)
+        self._verrou = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Observation
+    # ------------------------------------------------------------------
+
+    def _lire(self, identites: List[str]) -> Dict[str, float]:
+        """Derniers prix connus des identités données (verrou tenu)"""
+        connus = {}
+        for debut in range(0, len(identites), TAILLE_PAQUET_SQL):
+            paquet = identites[debut:debut + TAILLE_PAQUET_SQL]
+            parametres = ','.join('?' * len(paquet))
+            connus.update(self._connexion.execute(
+                f"SELECT identite, prix FROM prix WHERE identite IN ({parametres})", paquet))
+        return connus
+
+    def _releves(self, produits: Iterable[Any]) -> Dict[str, Tuple[str, float]]:
+        """identité -> (nom, prix) ; les prix non numériques sont ignorés"""
+        releves = {}
+        for produit in produits:
+            try:
+                prix = float(_champ(produit, 'prix', None))
+            except (TypeError, ValueError):
+                continue
+            releves[identite(produit)] = (str(_champ(produit, 'nom')), prix)
+        return releves
+
+    def observer(self, produits: Iterable[Any], date: Optional[str] = None) -> List[AlertePrix]:
+        """
+        Enregistrer les prix observés et détecter les variations
+
+        Seuls les produits nouveaux ou dont le prix a changé sont écrits.
+
+        Args:
+            produits: dicts ou Produit (champs nom, prix, url / source, marque)
+            date: Date de l'observation (défaut : maintenant)
+
+        Returns:
+            Alertes de baisse / hausse au-delà des seuils
+        """
+        date = date or datetime.now().isoformat()
+        releves = self._releves(produits)
+        with self._verrou:
+            return self._enregistrer(releves, date)
+
+    def _enregistrer(self, releves: Dict[str, Tuple[str, float]], date: str) -> List[AlertePrix]:
+        """Comparer les relevés aux derniers prix connus et les écrire (verrou tenu)"""
+        connus = self._lire(list(releves))
+
+        nouveaux, modifies, historique, alertes = [], [], [], []
+        for ident, (nom, prix) in releves.items():
+            precedent = connus.get(ident)
+            if precedent is None:
+                nouveaux.append((ident, nom, prix, date))
+            elif prix != precedent:
+                modifies.append((nom, prix, precedent, date, ident))
+                alerte = self._alerte(ident, nom, precedent, prix)
+                if alerte is not None:
+                    alertes.append(alerte)
+            else:
+                continue
+            historique.append((ident, date, prix))
+
+        with self._connexion:
+            self._connexion.executemany(
+                "INSERT INTO prix (identite, nom, prix, date) VALUES (?, ?, ?, ?)", nouveaux)
+            self._connexion.executemany(
+                "UPDATE prix SET nom = ?, prix = ?, prix_precedent = ?, date = ? "
+                "WHERE identite = ?", modifies)
+            self._connexion.executemany(
+                "INSERT INTO historique (identite, date, prix) VALUES (?, ?, ?)", historique)
+        return alertes
+
+    def _alerte(self, ident: str, nom: str, precedent: float, prix: float) -> Optional[AlertePrix]:
+        if precedent <= 0:
+            return None
+        variation = (prix - precedent) / precedent
+        if variation <= -self.seuil_baisse:
+            return AlertePrix(ident, nom, precedent, prix, variation, 'baisse')
+        if variation >= self.seuil_hausse:
+            return AlertePrix(ident, nom, precedent, prix, variation, 'hausse')
+        return None
+
+    def initialiser(self, produits: Iterable[Any], champ_prix: str = 'prix_reference',
+                    date: Optional[str] = None) -> int:
+        """
+        Enregistrer un prix de départ pour les produits encore inconnus
+        (ex. le 'prix_reference' d'un fichier de suivi)
+
+        Returns:
+            Nombre de produits initialisés
+        """
+        date = date or datetime.now().isoformat()
+        lignes = []
+        for produit in produits:
+            try:
+                prix = float(_champ(produit, champ_prix, None))
+            except (TypeError, ValueError):
+                continue
+            lignes.append((identite(produit), str(_champ(produit, 'nom')), prix, date))
+        with self._verrou, self._connexion:
+            avant = self._connexion.total_changes
+            self._connexion.executemany(
+                "INSERT OR IGNORE INTO prix (identite, nom, prix, date) VALUES (?, ?, ?, ?)", lignes)
+            return self._connexion.total_changes - avant
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def prix(self, produit: Any) -> Optional[float]:
+        """Dernier prix connu d'un produit (dict, Produit ou identité)"""
+        ident = produit if isinstance(produit, str) else identite(produit)
+        with self._verrou:
+            return self._lire([ident]).get(ident)
+
+    def historique(self, produit: Any) -> List[Tuple[str, float]]:
+        """Changements de prix d'un produit : [(date, prix)], du plus ancien au plus récent"""
+        ident = produit if isinstance(produit, str) else identite(produit)
+        with self._verrou:
+            return self._connexion.execute(
+                "SELECT date, prix FROM historique WHERE identite = ? ORDER BY rowid",
+                (ident,)).fetchall()
+
+    def __len__(self):
+        with self._verrou:
+            return self._connexion.execute("SELECT COUNT(*) FROM prix").fetchone()[0]
+
+    def fermer(self):
+        """Fermer la base"""
+        with self._verrou:
+            self._connexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
@@ -0,0 +1,322 @@
+"""
+BENCHMARK - OPÉRATIONS DE L'AGENT
+=================================
+
+Mesure le coût des opérations de l'agent (ingestion, filtres, top N,
+recommandations, rapport texte, export) sur des catalogues synthétiques
+de taille croissante.
+
+Utilisation (depuis la racine du projet) :
+    python -m benchmarks.bench_agent --nb 10000 1000000 --stockage liste colonnes
+    python -m benchmarks.bench_agent --nb 10000000 --stockage colonnes --sortie run.json
+    python -m benchmarks.bench_agent --nb 1000000 --comparer run.json
+
+Pour chaque opération : latence (médiane, p90, p99, max), débit, et pic
+de mémoire résidente (RSS) pendant l'opération. Les résultats peuvent
+être enregistrés en JSON (--sortie) puis comparés à une exécution de
+référence (--comparer) : une médiane plus lente de plus de --tolerance
+est signalée comme régression (code de sortie 1).
+
+Le catalogue est généré par generateur.generer_produits (graine fixe) :
+deux exécutions mesurent exactement les mêmes données, et chaque
+opération tire ses paramètres (budgets, marques...) d'une graine fixe.
+"""
+
+import argparse
+import contextlib
+from datetime import datetime
+from itertools import islice
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from agents import AgentProduitUniversel
+
+from .generateur import CARACTERISTIQUES, MARQUES, generer_produits
+
+
+# Produits générés puis ajoutés ensemble (chaque lot est une mesure)
+TAILLE_LOT_BENCH = 100000
+
+# Durée de mesure visée par opération (s) et bornes du nombre d'appels
+DUREE_OPERATION = 2.0
+MIN_APPELS = 3
+MAX_APPELS = 50
+
+# Ralentissement de la médiane toléré avant de signaler une régression
+TOLERANCE = 0.10
+
+# Écart absolu (s) en deçà duquel une différence de médiane est du bruit
+ECART_MINIMAL = 0.0005
+
+VERSION_RESULTATS = 1
+
+
+# ============================================================================
+# MÉMOIRE
+# ============================================================================
+
+def reinitialiser_pic_rss() -> bool:
+    """Remettre le pic de RSS du processus à sa valeur courante (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def pic_rss_mo() -> Optional[float]:
+    """Pic de RSS (Mo) depuis la dernière réinitialisation, ou du processus"""
+    try:
+        with open('/proc/self/status') as f:
+            for ligne in f:
+                if ligne.startswith('VmHWM:'):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic / 1024 ** 2 if sys.platform == 'darwin' else pic / 1024
+
+
+# ============================================================================
+# MESURES
+# ============================================================================
+
+def centile(valeurs: List[float], q: float) -> float:
+    """Centile q (entre 0 et 1) d'une liste triée, au rang le plus proche"""
+    rang = min(len(valeurs), max(1, math.ceil(q * len(valeurs))))
+    return valeurs[rang - 1]
+
+
+def resumer(operation: str, durees: List[float], unites_par_appel: float,
+            unite: str, rss: Optional[float]) -> Dict[str, Any]:
+    """Latences, débit et mémoire d'une opération"""
+    premier = durees[0]  # Appel à froid (index construits à la première requête)
+    durees = sorted(durees)
+    total = sum(durees)
+    return {
+        'operation': operation,
+        'nb_mesures': len(durees),
+        'premier': premier,
+        'moyenne': total / len(durees),
+        'p50': centile(durees, 0.5),
+        'p90': centile(durees, 0.9),
+        'p99': centile(durees, 0.99),
+        'max': durees[-1],
+        'debit': unites_par_appel * len(durees) / total if total else 0.0,
+        'unite': unite,
+        'rss_pic_mo': rss,
+    }
+
+
+def mesurer_ingestion(agent: AgentProduitUniversel, nb: int, graine: int) -> Dict[str, Any]:
+    """Ajouter nb produits par lots ; seule l'ingestion est chronométrée"""
+    produits = generer_produits(nb, graine)
+    durees = []
+    reinitialiser_pic_rss()
+    while True:
+        lot = list(islice(produits, TAILLE_LOT_BENCH))
+        if not lot:
+            break
+        debut = time.perf_counter()
+        agent.ajouter_produits_depuis_dict(lot)
+        durees.append(time.perf_counter() - debut)
+    return resumer('ajouter_produits_depuis_dict', durees, nb / max(len(durees), 1),
+                   'produits/s', pic_rss_mo())
+
+
+def mesurer_operation(nom: str, appel: Callable[[random.Random], Any], graine: int,
+                      duree: float) -> Dict[str, Any]:
+    """
+    Appeler une opération jusqu'à `duree` secondes (MIN_APPELS à
+    MAX_APPELS appels), avec des paramètres tirés d'une graine fixe
+    """
+    r = random.Random(graine)
+    durees = []
+    reinitialiser_pic_rss()
+    while len(durees) < MIN_APPELS or (len(durees) < MAX_APPELS and sum(durees) < duree):
+        debut = time.perf_counter()
+        appel(r)
+        durees.append(time.perf_counter() - debut)
+    return resumer(nom, durees, 1, 'appels/s', pic_rss_mo())
+
+
+def operations(agent: AgentProduitUniversel,
+               dossier: str) -> List[Tuple[str, Callable[[random.Random], Any]]]:
+    """
+    Opérations mesurées, et le tirage de leurs paramètres
+
+    Les filtres sont sélectifs (quelques % du catalogue) : au-delà, le
+    coût mesuré serait surtout celui de la liste de résultats.
+    """
+    export = os.path.join(dossier, 'export.jsonl')
+    silence = io.StringIO()
+
+    def exporter(r):
+        with contextlib.redirect_stdout(silence):
+            agent.exporter_json(export, format='jsonl')
+        silence.seek(0)
+        silence.truncate()
+
+    prix = agent._stockage.acces('prix')
+
+    def mettre_a_jour(r):
+        i = r.randrange(len(agent))
+        agent.mettre_a_jour(i, prix=round(prix(i) * r.uniform(0.95, 1.05), 2))
+
+    return [
+        ('filtrer_par_budget', lambda r: agent.filtrer_par_budget(r.uniform(20, 60))),
+        ('filtrer_par_marque', lambda r: agent.filtrer_par_marque([r.choice(MARQUES[-6:])])),
+        ('filtrer_par_note', lambda r: agent.filtrer_par_note(r.choice([4.9, 5.0]))),
+        ('filtrer_par_caracteristique',
+         lambda r: agent.filtrer_par_caracteristique(r.choice(CARACTERISTIQUES))),
+        ('obtenir_top', lambda r: agent.obtenir_top(10, budget_max=r.uniform(100, 1000))),
+        ('obtenir_recommandations',
+         lambda r: agent.obtenir_recommandations(budget_max=r.uniform(100, 1000),
+                                                 marques_preferees=r.sample(MARQUES, 3))),
+        ('generer_rapport_texte',
+         lambda r: agent.generer_rapport_texte(budget_max=r.uniform(100, 1000))),
+        ('exporter_json', exporter),
+        # En dernier : modifie le catalogue (variation de prix d'un relevé)
+        ('mettre_a_jour', mettre_a_jour),
+    ]
+
+
+def executer(nb: int, stockage: str, graine: int, duree: float,
+             selection: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Mesurer toutes les opérations sur un catalogue de nb produits"""
+    agent = AgentProduitUniversel('benchmark', stockage=stockage)
+    resultats = [mesurer_ingestion(agent, nb, graine)]
+    with tempfile.TemporaryDirectory() as dossier:
+        for k, (nom, appel) in enumerate(operations(agent, dossier)):
+            if selection and nom not in selection:
+                continue
+            resultats.append(mesurer_operation(nom, appel, graine + k, duree))
+    for resultat in resultats:
+        resultat.update(nb=nb, stockage=stockage)
+    return resultats
+
+
+# ============================================================================
+# COMPARAISON DE DEUX EXÉCUTIONS
+# ============================================================================
+
+def comparer(resultats: List[Dict], reference: List[Dict],
+             tolerance: float = TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Comparer les médianes aux mesures de référence
+
+    Une médiane est en régression si elle dépasse la référence de plus
+    de `tolerance` (en proportion) et de plus de ECART_MINIMAL.
+
+    Returns:
+        Une ligne par mesure présente dans les deux exécutions :
+        nb, stockage, operation, p50, p50_reference, rapport, regression
+    """
+    index = {(r['nb'], r['stockage'], r['operation']): r for r in reference}
+    lignes = []
+    for r in resultats:
+        ref = index.get((r['nb'], r['stockage'], r['operation']))
+        if ref is None:
+            continue
+        rapport = r['p50'] / ref['p50'] if ref['p50'] else float('inf')
+        lignes.append({
+            'nb': r['nb'], 'stockage': r['stockage'], 'operation': r['operation'],
+            'p50': r['p50'], 'p50_reference': ref['p50'], 'rapport': rapport,
+            'regression': (rapport > 1 + tolerance
+                           and r['p50'] - ref['p50'] > ECART_MINIMAL),
+        })
+    return lignes
+
+
+# ============================================================================
+# AFFICHAGE
+# ============================================================================
+
+def _ms(secondes: float) -> str:
+    return f"{secondes * 1000:,.2f}"
+
+
+def afficher(resultats: List[Dict]):
+    print(f"{'opération':<30} {'n':>4} {'1er ms':>11} {'p50 ms':>11} {'p90 ms':>11} "
+          f"{'p99 ms':>11} {'débit':>16} {'RSS Mo':>8}")
+    for r in resultats:
+        rss = '-' if r['rss_pic_mo'] is None else f"{r['rss_pic_mo']:,.0f}"
+        print(f"{r['operation']:<30} {r['nb_mesures']:>4} {_ms(r['premier']):>11} "
+              f"{_ms(r['p50']):>11} {_ms(r['p90']):>11} {_ms(r['p99']):>11} "
+              f"{r['debit']:>9,.0f} {r['unite']:<6} {rss:>8}")
+
+
+def afficher_comparaison(lignes: List[Dict], tolerance: float):
+    print(f"\nComparaison à la référence (médianes, tolérance {tolerance:.0%})")
+    print(f"{'taille':>10} {'stockage':<9} {'opération':<30} {'réf. ms':>11} "
+          f"{'ms':>11} {'écart':>8}")
+    for l in lignes:
+        marque = '  RÉGRESSION' if l['regression'] else ''
+        print(f"{l['nb']:>10,} {l['stockage']:<9} {l['operation']:<30} "
+              f"{_ms(l['p50_reference']):>11} {_ms(l['p50']):>11} "
+              f"{l['rapport'] - 1:>+8.1%}{marque}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--nb', type=int, nargs='+', default=[10000, 1000000],
+                        help="tailles de catalogue (ex. 10000 1000000 10000000)")
+    parser.add_argument('--stockage', nargs='+', default=['colonnes'],
+                        choices=['liste', 'colonnes', 'sqlite'])
+    parser.add_argument('--operations', nargs='+', help="opérations à mesurer (défaut : toutes)")
+    parser.add_argument('--duree', type=float, default=DUREE_OPERATION,
+                        help="durée de mesure visée par opération (s)")
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--sortie', help="fichier JSON où enregistrer les résultats")
+    parser.add_argument('--comparer', help="résultats JSON de référence")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()}, {os.cpu_count()} cœur(s)")
+    resultats = []
+    for nb in args.nb:
+        for stockage in args.stockage:
+            print(f"\n{nb:,} produits, stockage {stockage}")
+            mesures = executer(nb, stockage, args.graine, args.duree, args.operations)
+            afficher(mesures)
+            resultats.extend(mesures)
+
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': VERSION_RESULTATS,
+                'date': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'plateforme': platform.platform(),
+                'nb_coeurs': os.cpu_count(),
+                'resultats': resultats,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats enregistrés : {args.sortie}")
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as f:
+            reference = json.load(f)['resultats']
+        lignes = comparer(resultats, reference, args.tolerance)
+        afficher_comparaison(lignes, args.tolerance)
+        if any(l['regression'] for l in lignes):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
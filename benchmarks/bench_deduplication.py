@@ -0,0 +1,85 @@
+"""
+BENCHMARK - DÉDUPLICATION
+=========================
+
+Mesure le débit et la qualité de la déduplication sur un flux synthétique
+de fiches multi-sites dont les vrais groupes sont connus
+(cf. generateur.generer_flux_doublons).
+
+Utilisation (depuis la racine du projet) :
+    python -m benchmarks.bench_deduplication --nb 1000000
+
+Qualité mesurée sur les fusions :
+- précision : fusions vers une fiche du même produit réel / fusions
+- rappel    : fusions correctes / doublons réels
+"""
+
+import argparse
+import time
+
+from agents import AgentProduitUniversel
+from agents.deduplication import Deduplicateur
+from agents.produit import Produit
+
+from .generateur import generer_flux_doublons
+
+
+def mesurer_qualite(nb: int, seuil: float):
+    """Déduplication seule (sans agent) : débit, précision, rappel"""
+    deduplicateur = Deduplicateur(seuil=seuil)
+    groupe_retenu = []      # identifiant retenu -> groupe réel
+    groupes_vus = set()
+    nb_doublons_reels = nb_correctes = 0
+    duree = 0.0
+
+    for data, groupe in generer_flux_doublons(nb):
+        produit = Produit(**data)
+        debut = time.perf_counter()
+        i = deduplicateur.identifier(produit, len(groupe_retenu))
+        duree += time.perf_counter() - debut
+
+        if groupe in groupes_vus:
+            nb_doublons_reels += 1
+        groupes_vus.add(groupe)
+        if i == len(groupe_retenu):
+            groupe_retenu.append(groupe)
+        elif groupe_retenu[i] == groupe:
+            nb_correctes += 1
+
+    nb_fusions = deduplicateur.nb_fusions
+    print(f"{nb} fiches, {len(groupes_vus)} produits réels, {len(groupe_retenu)} retenus")
+    print(f"déduplication : {duree:.1f} s ({nb / duree:,.0f} fiches/s)")
+    print(f"précision : {nb_correctes / max(nb_fusions, 1):.4f} "
+          f"({nb_fusions - nb_correctes} fusions erronées)")
+    print(f"rappel    : {nb_correctes / max(nb_doublons_reels, 1):.4f} "
+          f"({nb_doublons_reels - nb_correctes} doublons manqués)")
+
+
+def mesurer_ingestion(nb: int, deduplication: bool) -> float:
+    """Durée (s) de l'ajout du flux à un agent colonnaire"""
+    fiches = [data for data, _ in generer_flux_doublons(nb)]
+    agent = AgentProduitUniversel(stockage='colonnes', deduplication=deduplication)
+    debut = time.perf_counter()
+    agent.ajouter_produits_depuis_dict(fiches)
+    duree = time.perf_counter() - debut
+    print(f"ingestion {'avec' if deduplication else 'sans'} déduplication : "
+          f"{duree:.1f} s, {len(agent)} produits au catalogue")
+    return duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--nb', type=int, default=200000, help="nombre de fiches")
+    parser.add_argument('--seuil', type=float, default=Deduplicateur().seuil)
+    parser.add_argument('--ingestion', action='store_true',
+                        help="mesurer aussi l'ingestion par un agent, avec et sans déduplication")
+    args = parser.parse_args()
+
+    mesurer_qualite(args.nb, args.seuil)
+    if args.ingestion:
+        mesurer_ingestion(args.nb, False)
+        mesurer_ingestion(args.nb, True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+BENCHMARK - INGESTION PARALLÈLE
+===============================
+
+Mesure le débit de chargement d'un fichier JSON Lines selon le nombre de
+processus, et l'accélération par rapport au chargement séquentiel.
+
+Utilisation (depuis la racine du projet) :
+    python -m benchmarks.bench_ingestion --nb 1000000 --processus 1 2 4 8
+
+L'accélération dépend du nombre de cœurs réellement disponibles : le
+processus principal lit les lignes et intègre les lots, les autres
+décodent, construisent et scorent les produits. Une mesure prise avec
+plus de processus que de cœurs disponibles est marquée « (> cœurs) » :
+elle ne dit rien du passage à l'échelle.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from agents import AgentProduitUniversel
+from agents.flux import charger_fichier
+
+from .generateur import ecrire_jsonl
+
+
+def nb_coeurs() -> int:
+    """Cœurs utilisables par ce processus (affinité comprise)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def mesurer(fichier: str, nb_processus: int, stockage: str, taille_lot: int) -> float:
+    """Durée (s) du chargement complet du fichier"""
+    agent = AgentProduitUniversel(stockage=stockage)
+    debut = time.perf_counter()
+    rapport = charger_fichier(agent, fichier, taille_lot, nb_processus=nb_processus)
+    duree = time.perf_counter() - debut
+    assert rapport.nb_ajoutes == rapport.nb_lus, rapport.erreurs[:3]
+    return duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--nb', type=int, default=200000, help="nombre de produits")
+    parser.add_argument('--processus', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--stockage', default='colonnes', choices=['liste', 'colonnes'])
+    parser.add_argument('--taille-lot', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        fichier = ecrire_jsonl(os.path.join(dossier, 'catalogue.jsonl'), args.nb)
+        coeurs = nb_coeurs()
+        print(f"{args.nb} produits, stockage {args.stockage}, {coeurs} cœur(s)")
+        print(f"{'processus':>10} {'durée (s)':>10} {'produits/s':>12} {'accélération':>13}")
+
+        reference = None
+        for nb_processus in args.processus:
+            duree = mesurer(fichier, nb_processus, args.stockage, args.taille_lot)
+            reference = reference or duree
+            print(f"{nb_processus:>10} {duree:>10.2f} {args.nb / duree:>12,.0f} "
+                  f"{reference / duree:>12.2f}x"
+                  + ("  (> cœurs)" if nb_processus > coeurs else ""))
+
+
+if __name__ == '__main__':
+    main()
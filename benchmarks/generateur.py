@@ -0,0 +1,135 @@
+"""
+GÉNÉRATEUR DE CATALOGUES SYNTHÉTIQUES
+=====================================
+
+Produits aléatoires mais reproductibles (graine fixe), pour les
+benchmarks.
+"""
+
+from itertools import accumulate
+import json
+import random
+from typing import Dict, Iterator, Tuple
+
+
+MARQUES = ['Samsung', 'Apple', 'LG', 'Sony', 'Xiaomi', 'Google', 'Philips',
+           'Bosch', 'Whirlpool', 'Panasonic', 'Lenovo', 'Asus']
+CARACTERISTIQUES = ['5G', '128GB', '256GB', 'OLED', 'WiFi 6', 'Bluetooth 5.3',
+                    'USB-C', 'Écran 6.7"', 'Charge rapide', 'Étanche IP68']
+SOURCES = ['amazon', 'fnac', 'darty', 'boulanger', 'cdiscount']
+
+# Part de marché des marques : loi de Zipf (la 1re marque pèse 12 fois la 12e)
+POIDS_MARQUES = [1 / rang for rang in range(1, len(MARQUES) + 1)]
+
+# Niveau de prix des marques (décalage du logarithme du prix)
+NIVEAUX_PRIX = {'Apple': 0.6, 'Sony': 0.3, 'Bosch': 0.3, 'Samsung': 0.2,
+                'Google': 0.1, 'Xiaomi': -0.4, 'Philips': -0.2, 'Asus': -0.1}
+
+
+def generer_produits(n: int, graine: int = 42) -> Iterator[Dict]:
+    """
+    Générer n produits (dicts) de façon déterministe
+
+    Marques inégalement représentées (POIDS_MARQUES), prix log-normaux
+    décalés selon la marque (NIVEAUX_PRIX), popularité à longue traîne
+    (Pareto), 0 à 5 caractéristiques.
+
+    Args:
+        n: Nombre de produits
+        graine: Graine du générateur aléatoire
+    """
+    r = random.Random(graine)
+    cumuls = list(accumulate(POIDS_MARQUES))
+    for i in range(n):
+        marque = r.choices(MARQUES, cum_weights=cumuls)[0]
+        yield {
+            'nom': f"Produit {i}",
+            'marque': marque,
+            'prix': round(r.lognormvariate(5.5 + NIVEAUX_PRIX.get(marque, 0.0), 0.8), 2),
+            'note': round(r.uniform(2.5, 5.0), 1),
+            'nb_avis': int(r.paretovariate(1.2) * 10),
+            'caracteristiques': r.sample(CARACTERISTIQUES, r.randint(0, 5)),
+            'url': f"https://example.com/{marque.lower()}/{i}",
+            'source': r.choice(SOURCES),
+        }
+
+
+GAMMES = ['Galaxy', 'Pixel', 'Xperia', 'Redmi', 'ThinkPad', 'ZenBook',
+          'Bravia', 'Serie', 'Lumix', 'Airfryer', 'Optimum', 'Supreme']
+VARIANTES = ['', '', '', 'Pro', 'Max', 'Lite', 'Ultra', 'Plus']
+CAPACITES = ['', '64GB', '128GB', '256GB', '512GB']
+MOTS_PARASITES = ['Neuf', 'Noir', 'Blanc', 'Officiel', '2024', 'Garantie 2 ans']
+
+
+def _variante_nom(r: random.Random, marque: str, gamme: str, modele: str,
+                  variante: str, capacite: str) -> str:
+    """Nom d'un produit tel qu'un site pourrait l'écrire"""
+    if capacite and r.random() < 0.5:
+        capacite = capacite.replace('GB', r.choice([' Go', ' GB', 'Go', ' go']))
+    if capacite and r.random() < 0.3:
+        capacite = f"({capacite})"
+    morceaux = [gamme, modele, variante]
+    if r.random() < 0.5:
+        morceaux.insert(0, marque)
+    separateur = r.choice([' ', ' ', ' - ', ', '])
+    nom = ' '.join(m for m in morceaux if m) + (separateur + capacite if capacite else '')
+    if r.random() < 0.15:
+        nom += ' ' + r.choice(MOTS_PARASITES[:2])
+    if r.random() < 0.2:
+        nom = r.choice([nom.upper(), nom.lower()])
+    return nom
+
+
+def generer_flux_doublons(nb_fiches: int, graine: int = 42) -> Iterator[Tuple[Dict, int]]:
+    """
+    Générer un flux de fiches produits de plusieurs sites, avec doublons
+
+    Chaque produit réel (groupe) est publié par 1 à 4 sites, sous des noms
+    légèrement différents (casse, marque en préfixe, « 128 Go » / « 128GB »,
+    séparateurs, mots parasites) et à des prix différents. Des produits
+    distincts ont des noms voisins (« S23 » / « S24 », « Pro »...). Le flux
+    est émis site par site, comme une collecte.
+
+    Returns:
+        Itérateur de (dict produit, numéro du groupe réel)
+    """
+    r = random.Random(graine)
+    groupes = []
+    nb = 0
+    while nb < nb_fiches:
+        g = len(groupes)
+        marque = MARQUES[g % len(MARQUES)]
+        modele = f"{chr(65 + (g // len(MARQUES)) % 26)}{g // (26 * len(MARQUES))}"
+        sources = r.sample(SOURCES, r.choices([1, 2, 3, 4], [4, 3, 2, 1])[0])
+        sources = sources[:nb_fiches - nb]
+        nb += len(sources)
+        groupes.append((marque, r.choice(GAMMES), modele, r.choice(VARIANTES),
+                        r.choice(CAPACITES), r.sample(CARACTERISTIQUES, r.randint(2, 4)),
+                        round(r.lognormvariate(5.5, 0.8), 2), sources))
+
+    for source in SOURCES:
+        for g, (marque, gamme, modele, variante, capacite, caracteristiques,
+                prix, sources) in enumerate(groupes):
+            if source not in sources:
+                continue
+            caracs = list(caracteristiques)
+            if len(caracs) > 2 and r.random() < 0.2:
+                caracs.pop(r.randrange(len(caracs)))
+            yield {
+                'nom': _variante_nom(r, marque, gamme, modele, variante, capacite),
+                'marque': r.choice([marque, marque.upper(), marque.lower()]),
+                'prix': round(prix * r.uniform(0.9, 1.1), 2),
+                'note': round(r.uniform(2.5, 5.0), 1),
+                'nb_avis': int(r.paretovariate(1.2) * 10),
+                'caracteristiques': caracs,
+                'url': f"https://{source}.example.com/p/{g}",
+                'source': source,
+            }, g
+
+
+def ecrire_jsonl(fichier: str, n: int, graine: int = 42) -> str:
+    """Écrire n produits générés dans un fichier JSON Lines"""
+    with open(fichier, 'w', encoding='utf-8') as f:
+        for produit in generer_produits(n, graine):
+            f.write(json.dumps(produit, ensure_ascii=False) + '\n')
+    return fichier
@@ -9,6 +9,9 @@ Utilisez-le comme point de départ pour votre projet !
 """
 
 from agents import AgentProduitUniversel, analyser_produits
+from agents.collecte import collecter
+from agents.recuperation import CacheConditionnel, RecuperateurHTTP
+from agents.suivi_prix import SuiviPrix
 
 
 # ============================================================================
@@ -106,13 +109,15 @@ def exemple_scraper_simple():
 # EXEMPLE 2 : FONCTION RÉUTILISABLE
 # ============================================================================
 
-def scraper_et_analyser(type_produit, budget_max=500):
+def scraper_et_analyser(type_produit, budget_max=500, urls=None, analyser_page=None):
     """
     Fonction réutilisable pour scraper et analyser
     
     Args:
         type_produit: Type de produit à scraper
         budget_max: Budget maximum
+        urls: Pages à scraper (optionnel, sinon données simulées)
+        analyser_page: Fonction Page -> dicts produits (requise avec urls)
     
     Returns:
         Dict avec les résultats de l'analyse
@@ -121,12 +126,14 @@ def scraper_et_analyser(type_produit, budget_max=500):
     print(f"\n🔍 Scraping de {type_produit}...")
     
     # 1. SCRAPING
-    # Ici, remplacez par votre vrai code de scraping
-    produits = []
-    
-    # Exemple : scraper plusieurs sites
-    # for site in ['site1.com', 'site2.com', 'site3.com']:
-    #     produits.extend(scraper_site(site, type_produit))
+    if urls:
+        # Tous les sites en parallèle (cf. agents/collecte.py) : les
+        # produits sont ajoutés à l'agent au fil de l'eau, par lots
+        agent = AgentProduitUniversel(type_produit=type_produit)
+        rapport = collecter(agent, urls, analyser_page, max_par_hote=4)
+        print(f"✅ {rapport.nb_pages} pages, {rapport.nb_ajoutes} produits "
+              f"en {rapport.duree:.1f}s ({rapport.nb_echecs} échec(s))")
+        return agent.obtenir_recommandations(budget_max=budget_max)
     
     # Pour l'exemple, on simule :
     produits = [
@@ -189,11 +196,27 @@ def votre_fonction_avec_agent():
 # EXEMPLE 4 : SURVEILLANCE DE PRIX QUOTIDIENNE
 # ============================================================================
 
-def surveiller_prix_quotidien():
+def surveiller_prix_quotidien(analyser_page=None):
     """
     Exemple de surveillance quotidienne des prix
     
     Lancez cette fonction chaque jour (cron, scheduler, etc.)
+    
+    Les prix observés vont directement au suivi (SuiviPrix), qui garde
+    le dernier prix de chaque produit d'un jour à l'autre : aucun agent
+    n'est nécessaire.
+    
+    Args:
+        analyser_page: Fonction Page -> dicts produits ; si elle est
+                       donnée, les pages (clé 'url') sont re-scrapées en
+                       parallèle, sinon les prix du fichier sont utilisés.
+                       Chaque produit doit porter l'URL suivie
+                       ('url': page.url).
+    
+    Les pages inchangées depuis la veille (304 ou même contenu) ne sont
+    pas analysées et n'apportent aucun prix : leurs produits gardent le
+    dernier prix connu, sans alerte. Une page n'est marquée comme vue
+    qu'une fois ses prix enregistrés par le suivi.
     """
     import json
     from datetime import datetime
@@ -211,35 +234,38 @@ def surveiller_prix_quotidien():
         print("❌ Créez d'abord data/produits_surveilles.json")
         return
     
-    # 2. Scraper les prix actuels
-    agent = AgentProduitUniversel(type_produit="produit")
-    
-    for produit in produits_suivi:
-        # Scraper le prix actuel (à adapter selon votre code)
-        # prix_actuel = scraper_prix(produit['url'])
-        prix_actuel = produit['prix']  # Exemple
-        
-        agent.ajouter_produit(
-            nom=produit['nom'],
-            marque=produit['marque'],
-            prix=prix_actuel,
-            extra={'prix_reference': produit.get('prix_reference', prix_actuel)}
-        )
-    
-    # 3. Détecter les baisses de prix
+    # 2. Mémoire des prix : le prix de référence sert de point de départ
+    #    aux produits suivis pour la première fois
+    suivi = SuiviPrix('data/suivi_prix.sqlite', seuil_baisse=0.10)
+    suivi.initialiser(produits_suivi)
+    
+    # 3. Scraper les prix actuels et les comparer aux précédents, au fil
+    #    de l'eau (seuls les produits modifiés sont écrits)
     alertes = []
-    for p in agent.produits:
-        prix_ref = p.extra.get('prix_reference', 0)
-        if prix_ref > 0 and p.prix < prix_ref * 0.9:  # Baisse > 10%
-            alertes.append(p)
-            print(f"🔔 ALERTE : {p.nom} a baissé à {p.prix}€ (-{((prix_ref-p.prix)/prix_ref*100):.0f}%)")
+    
+    if analyser_page is not None:
+        urls = [p['url'] for p in produits_suivi if p.get('url')]
+        recuperer = RecuperateurHTTP(cache=CacheConditionnel('data/cache_http.json'))
+        # Pas d'agent : chaque lot de prix va au suivi
+        rapport = collecter(None, urls, analyser_page, recuperer=recuperer,
+                            apres_lot=lambda lot: alertes.extend(suivi.observer(lot)))
+        recuperer.cache.sauvegarder()
+        recuperer.fermer()
+        print(f"{rapport.nb_pages} page(s) modifiée(s), {rapport.nb_inchangees} inchangée(s)")
+    else:
+        # Exemple : prix du fichier
+        alertes = suivi.observer(produits_suivi)
+    suivi.fermer()
+    
+    for alerte in alertes:
+        print(f"🔔 ALERTE : {alerte}")
     
     # 4. Envoyer notifications si nécessaire
     if alertes:
         print(f"\n✉️  {len(alertes)} alerte(s) de prix détectée(s)")
         # Envoyez un email, une notif Telegram, etc.
     else:
-        print("\n✅ Aucune baisse de prix significative")
+        print("\n✅ Aucune variation de prix significative")
 
 
 # ============================================================================
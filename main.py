@@ -141,46 +141,21 @@ def lancer_recherche(params):
         print("Ajoutez vos produits dans data/produits_exemple.json")
         return
 
-    # Appliquer les filtres
-    produits_filtres = list(agent.produits)
+    # Appliquer les filtres (requete paresseuse, sans recopier les produits)
+    selection = agent.requete().prix(min=params["prix_min"], max=params["prix_max"])
 
-    if params["prix_min"] is not None:
-        produits_filtres = [
-            p for p in produits_filtres if p.prix >= params["prix_min"]
-        ]
-
-    if params["prix_max"] is not None:
-        produits_filtres = [
-            p for p in produits_filtres if p.prix <= params["prix_max"]
-        ]
-
-    if not produits_filtres:
+    if not len(selection):
         print("\nAucun produit ne correspond a vos criteres.")
         return
 
-    # Creer un nouvel agent avec les produits filtres
-    agent_filtre = AgentProduitUniversel(type_produit=params["produit"])
-    for p in produits_filtres:
-        agent_filtre.ajouter_produit(
-            nom=p.nom,
-            marque=p.marque,
-            prix=p.prix,
-            note=p.note,
-            nb_avis=p.nb_avis,
-            caracteristiques=p.caracteristiques,
-            url=p.url,
-            source=p.source,
-            stock=p.stock,
-        )
-
     # Generer rapport
-    rapport = agent_filtre.generer_rapport_texte(budget_max=params["prix_max"])
+    rapport = agent.generer_rapport_texte(budget_max=params["prix_max"], selection=selection)
     print(rapport)
 
     # Exporter les resultats
     os.makedirs("data", exist_ok=True)
     fichier_export = os.path.join("data", f"resultats_{params['produit'].replace(' ', '_').lower()}.json")
-    agent_filtre.exporter_json(fichier_export, budget_max=params["prix_max"])
+    agent.exporter_json(fichier_export, budget_max=params["prix_max"], selection=selection)
 
     # Afficher les infos de localisation si pertinentes
     if not params["livrable"] and params["lieu"]:
@@ -0,0 +1,87 @@
+"""Tests du cache de résultats (agents/cache.py)"""
+
+import pytest
+
+from agents import AgentProduitUniversel, analyser_produits
+from agents.cache import CacheResultats
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+DONNEES = [dict(nom=f'P{i}', marque='ABC'[i % 3], prix=50 + i * 7 % 900,
+                note=3 + (i % 20) / 10, nb_avis=i)
+           for i in range(300)]
+
+REQUETE = dict(budget_max=400, marques_preferees=['A', 'b'])
+
+
+def agents(stockage: str):
+    """Un agent avec cache et un agent témoin, sur le même catalogue"""
+    avec_cache = AgentProduitUniversel(stockage=stockage, cache_resultats=True)
+    temoin = AgentProduitUniversel(stockage=stockage)
+    for agent in (avec_cache, temoin):
+        agent.ajouter_produits_depuis_dict(DONNEES)
+    return avec_cache, temoin
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_requete_equivalente_servie_par_le_cache(stockage):
+    agent, temoin = agents(stockage)
+    premier = agent.obtenir_recommandations(**REQUETE)
+    second = agent.obtenir_recommandations(budget_max=400.0, marques_preferees=['B', 'a'])
+    assert second['top_recommandations'] is premier['top_recommandations']
+    assert second['criteres']['marques_preferees'] == ['B', 'a']
+    assert premier == temoin.obtenir_recommandations(**REQUETE)
+    assert agent.cache_resultats.stats()['succes'] == 1
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_invalide_apres_ajout(stockage):
+    agent, temoin = agents(stockage)
+    agent.obtenir_recommandations(**REQUETE)
+    for cible in (agent, temoin):
+        cible.ajouter_produit('Z', 'A', 60, note=5, nb_avis=1000)
+
+    resultat = agent.obtenir_recommandations(**REQUETE)
+    assert resultat['meilleur_produit']['nom'] == 'Z'
+    assert resultat == temoin.obtenir_recommandations(**REQUETE)
+    assert agent.cache_resultats.stats()['succes'] == 0
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_invalide_apres_mise_a_jour(stockage):
+    agent, temoin = agents(stockage)
+    avant = agent.obtenir_recommandations(**REQUETE)
+    id_ = next(i for i, p in enumerate(agent.produits)
+               if p.nom == avant['meilleur_prix']['nom'])
+    for cible in (agent, temoin):
+        cible.mettre_a_jour(id_, prix=500.0)
+
+    resultat = agent.obtenir_recommandations(**REQUETE)
+    assert resultat['meilleur_prix']['nom'] != avant['meilleur_prix']['nom']
+    assert resultat == temoin.obtenir_recommandations(**REQUETE)
+
+    # Le vidage aussi périme les résultats
+    agent.vider()
+    assert agent.obtenir_recommandations(**REQUETE)['nb_produits_trouves'] == 0
+
+
+def test_lru_et_duree_de_vie():
+    temps = [0.0]
+    cache = CacheResultats(taille_max=2, duree=10, horloge=lambda: temps[0])
+    cache.obtenir('a', 0, lambda: 1)
+    cache.obtenir('b', 0, lambda: 2)
+    assert cache.obtenir('a', 0, lambda: 9) == 1
+    cache.obtenir('c', 0, lambda: 3)              # évince 'b', le moins récent
+    assert cache.obtenir('b', 0, lambda: 'B') == 'B'
+
+    temps[0] = 11
+    assert cache.obtenir('c', 0, lambda: 'C') == 'C'   # expiré
+    assert cache.obtenir('c', 1, lambda: 'D') == 'D'   # autre version
+    assert len(cache) == 2
+
+
+def test_analyser_produits_en_cache():
+    premier = analyser_produits(DONNEES, 300, cache=True)
+    assert analyser_produits(DONNEES, 300, cache=True) is premier
+    assert premier == analyser_produits(DONNEES, 300)
@@ -0,0 +1,273 @@
+"""Tests de la collecte asynchrone (agents/collecte.py)"""
+
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.collecte import PipelineCollecte, collecter
+from agents.recuperation import Page
+from agents.stockage_sqlite import StockageSQLite
+from agents.suivi_prix import SuiviPrix
+
+
+def produits_page(url: str, nb: int = 3):
+    return [{'nom': f'{url} #{k}', 'marque': 'Marque', 'prix': 10.0 + k} for k in range(nb)]
+
+
+async def recuperer_stub(url: str) -> Page:
+    """Récupération sans réseau : chaque page porte 3 produits"""
+    await asyncio.sleep(0)
+    return Page(url, 200, json.dumps(produits_page(url)))
+
+
+def analyser_json(page: Page):
+    return json.loads(page.contenu)
+
+
+def executer(pipeline: PipelineCollecte, urls, delai: float = 10.0):
+    """Exécuter la collecte ; un blocage fait échouer le test au lieu de le figer"""
+    return asyncio.run(asyncio.wait_for(pipeline.executer(urls), delai))
+
+
+class AgentDefaillant:
+    """Agent dont certains ajouts échouent"""
+
+    def __init__(self, echecs):
+        self.echecs = set(echecs)
+        self.nb_appels = 0
+        self.produits = []
+
+    def ajouter_produits_depuis_dict(self, lot):
+        self.nb_appels += 1
+        if self.nb_appels in self.echecs:
+            raise RuntimeError(f"ajout {self.nb_appels} impossible")
+        self.produits.extend(lot)
+        return len(lot)
+
+
+# ============================================================================
+# SERVEUR LOCAL
+# ============================================================================
+
+@pytest.fixture
+def serveurs():
+    """Deux sites locaux, l'un lent, l'autre rapide"""
+    def demarrer(delai):
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(delai)
+                if self.path.endswith('404'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                corps = json.dumps(produits_page(self.path)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        serveur = ThreadingHTTPServer(('127.0.0.1', 0), Gestionnaire)
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+        return serveur
+
+    lances = [demarrer(0.2), demarrer(0.0)]
+    yield [f'http://127.0.0.1:{s.server_port}' for s in lances]
+    for serveur in lances:
+        serveur.shutdown()
+        serveur.server_close()
+
+
+def test_collecte_serveur_local(serveurs):
+    lent, rapide = serveurs
+    urls = ([f'{lent}/{i}' for i in range(4)] + [f'{rapide}/{i}' for i in range(40)]
+            + [f'{rapide}/404'])
+    agent = AgentProduitUniversel()
+    rapport = collecter(agent, urls, analyser_json, max_par_hote=4, taille_lot=25)
+
+    assert rapport.nb_pages == 44
+    assert rapport.nb_produits_lus == rapport.nb_ajoutes == len(agent) == 132
+    assert rapport.nb_echecs == 1
+    assert rapport.erreurs == [(f'{rapide}/404', 'HTTP 404')]
+    # Sites traités en parallèle : le site lent (4 pages de 0,2 s, 4
+    # requêtes simultanées) ne retarde pas l'autre
+    assert rapport.durees_hotes[lent.split('//')[1]] < 0.6
+
+
+@pytest.mark.parametrize('stockage', ['colonnes', 'sqlite'])
+def test_collecte_vers_un_stockage(stockage, tmp_path):
+    # Les lots sont ajoutés depuis le thread de la collecte
+    if stockage == 'sqlite':
+        stockage = StockageSQLite(str(tmp_path / 'catalogue.sqlite'))
+    agent = AgentProduitUniversel(stockage=stockage)
+    urls = [f'http://site/{i}' for i in range(30)]
+    rapport = executer(PipelineCollecte(agent, analyser_json, recuperer=recuperer_stub,
+                                        taille_lot=20), urls)
+
+    assert rapport.nb_echecs == 0
+    assert rapport.nb_ajoutes == len(agent) == 90
+    assert sorted(p.nom for p in agent.produits) == sorted(
+        d['nom'] for url in urls for d in produits_page(url))
+    assert len(agent.filtrer_par_budget(11)) == 60
+
+
+# ============================================================================
+# ERREURS
+# ============================================================================
+
+def test_echec_d_un_lot_signale_sans_bloquer():
+    urls = [f'http://site/{i}' for i in range(40)]
+    agent = AgentDefaillant(echecs={2})
+    # File courte : si l'ajout s'arrêtait, les collecteurs resteraient bloqués
+    pipeline = PipelineCollecte(agent, analyser_json, recuperer=recuperer_stub,
+                                taille_file=5, taille_lot=10)
+    rapport = executer(pipeline, urls)
+
+    assert rapport.nb_produits_lus == 120
+    assert rapport.nb_ajoutes == len(agent.produits) == 110
+    assert rapport.nb_echecs == 1
+    assert 'ajout 2 impossible' in rapport.erreurs[0][1]
+
+
+def test_echec_apres_lot_signale():
+    appels = []
+
+    def apres_lot(lot):
+        appels.append(len(lot))
+        if len(appels) == 1:
+            raise ValueError("suivi indisponible")
+
+    agent = AgentProduitUniversel()
+    pipeline = PipelineCollecte(agent, analyser_json, recuperer=recuperer_stub,
+                                taille_file=5, taille_lot=10, apres_lot=apres_lot)
+    rapport = executer(pipeline, [f'http://site/{i}' for i in range(20)])
+
+    assert len(agent) == rapport.nb_ajoutes == 60
+    assert sum(appels) == 60
+    assert rapport.nb_echecs == 1
+
+
+def test_echec_analyse_signale():
+    def analyser(page):
+        if page.url.endswith('/3'):
+            raise ValueError("page illisible")
+        return analyser_json(page)
+
+    agent = AgentProduitUniversel()
+    rapport = executer(PipelineCollecte(agent, analyser, recuperer=recuperer_stub),
+                       [f'http://site/{i}' for i in range(6)])
+
+    assert rapport.nb_pages == 5
+    assert len(agent) == 15
+    assert rapport.erreurs == [('http://site/3', 'page illisible')]
+
+
+def test_arret_de_l_ajout_interrompt_la_collecte():
+    class PipelineInterrompu(PipelineCollecte):
+        async def _ajouter(self, file, rapport, executeur):
+            raise RuntimeError("ajout interrompu")
+
+    pipeline = PipelineInterrompu(AgentProduitUniversel(), analyser_json,
+                                  recuperer=recuperer_stub, taille_file=2)
+    with pytest.raises(RuntimeError, match="ajout interrompu"):
+        executer(pipeline, [f'http://site/{i}' for i in range(50)])
+
+
+def test_analyse_et_ajout_hors_de_la_boucle():
+    threads = set()
+
+    def analyser(page):
+        threads.add(threading.current_thread())
+        return analyser_json(page)
+
+    executer(PipelineCollecte(AgentProduitUniversel(), analyser, recuperer=recuperer_stub),
+             [f'http://site/{i}' for i in range(10)])
+
+    assert len(threads) == 1
+    assert threading.main_thread() not in threads
+
+
+# ============================================================================
+# CONFIRMATION DES PAGES (CACHE CONDITIONNEL)
+# ============================================================================
+
+class RecuperateurConfirmant:
+    """Récupération sans réseau qui note les pages confirmées"""
+
+    def __init__(self, journal):
+        self.journal = journal
+
+    async def __call__(self, url: str) -> Page:
+        return await recuperer_stub(url)
+
+    def confirmer(self, page: Page):
+        self.journal.append(('confirmee', page.url))
+
+
+class AgentJournalise(AgentDefaillant):
+    """Agent qui note les pages dont il a ajouté des produits"""
+
+    def __init__(self, journal, echecs=()):
+        super().__init__(echecs)
+        self.journal = journal
+
+    def ajouter_produits_depuis_dict(self, lot):
+        nb = super().ajouter_produits_depuis_dict(lot)
+        self.journal.extend(('ajoutee', p['nom'].split(' #')[0]) for p in lot)
+        return nb
+
+
+def test_page_confirmee_apres_l_ajout_de_ses_produits():
+    journal = []
+    urls = [f'http://site/{i}' for i in range(12)]
+    pipeline = PipelineCollecte(AgentJournalise(journal), analyser_json,
+                                recuperer=RecuperateurConfirmant(journal),
+                                taille_file=4, taille_lot=5)
+    executer(pipeline, urls)
+
+    confirmees = [url for evenement, url in journal if evenement == 'confirmee']
+    assert sorted(confirmees) == sorted(urls)
+    for url in urls:
+        position = journal.index(('confirmee', url))
+        ajouts = [i for i, evenement in enumerate(journal) if evenement == ('ajoutee', url)]
+        assert len(ajouts) == 3
+        assert max(ajouts) < position
+
+
+def test_page_non_confirmee_si_son_lot_echoue():
+    journal = []
+    agent = AgentJournalise(journal, echecs={1})
+    # Pages de 3 produits, lots de 6 : le premier lot porte les pages 0 et 1
+    pipeline = PipelineCollecte(agent, analyser_json, recuperer=RecuperateurConfirmant(journal),
+                                max_par_hote=1, taille_lot=6)
+    rapport = executer(pipeline, [f'http://site/{i}' for i in range(4)])
+
+    assert rapport.nb_echecs == 1
+    assert [url for evenement, url in journal if evenement == 'confirmee'] == [
+        'http://site/2', 'http://site/3']
+
+
+def test_collecte_sans_agent_vers_le_suivi_des_prix():
+    journal, alertes = [], []
+    urls = [f'http://site/{i}' for i in range(6)]
+    with SuiviPrix(seuil_baisse=0.05) as suivi:
+        suivi.initialiser([dict(p, prix_reference=20.0) for url in urls[:2]
+                           for p in produits_page(url)])
+        # Suivi créé dans ce thread, alimenté depuis celui de la collecte
+        pipeline = PipelineCollecte(None, analyser_json, recuperer=RecuperateurConfirmant(journal),
+                                    taille_lot=5,
+                                    apres_lot=lambda lot: alertes.extend(suivi.observer(lot)))
+        rapport = executer(pipeline, urls)
+
+        assert rapport.nb_echecs == 0 and rapport.nb_produits_lus == 18
+        assert len(suivi) == 18
+        assert len(alertes) == 6 and {a.type for a in alertes} == {'baisse'}
+    assert sorted(url for _, url in journal) == urls
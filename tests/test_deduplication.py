@@ -0,0 +1,80 @@
+"""Tests de la déduplication multi-sites (agents/deduplication.py)"""
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.deduplication import Deduplicateur, jetons_produit
+from agents.produit import Produit
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+SITE_A = [
+    {'nom': 'Samsung Galaxy S23 128 Go', 'marque': 'Samsung', 'prix': 799,
+     'source': 'amazon', 'url': 'a1', 'caracteristiques': ['5G']},
+    {'nom': 'iPhone 15 128GB', 'marque': 'Apple', 'prix': 969, 'source': 'amazon', 'url': 'a2'},
+    {'nom': 'iPhone 15 256GB', 'marque': 'Apple', 'prix': 1099, 'source': 'amazon', 'url': 'a3'},
+]
+
+SITE_B = [
+    # Mêmes produits, autrement libellés
+    {'nom': 'GALAXY S23 - 128GB', 'marque': 'SAMSUNG', 'prix': 749,
+     'source': 'fnac', 'url': 'b1', 'caracteristiques': ['5G']},
+    {'nom': 'Apple iPhone 15 (128 Go)', 'marque': 'apple', 'prix': 949, 'source': 'fnac', 'url': 'b2'},
+    # Autre modèle : « Pro » le distingue
+    {'nom': 'iPhone 15 Pro 128GB', 'marque': 'Apple', 'prix': 1229, 'source': 'fnac', 'url': 'b3'},
+    {'nom': 'iPhone 15 128GB', 'marque': 'Apple', 'prix': 959, 'source': 'darty', 'url': 'c2'},
+]
+
+
+@pytest.mark.parametrize('nb_processus', [None, 2])
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_fusion_entre_sites(stockage, nb_processus):
+    agent = AgentProduitUniversel(stockage=stockage, deduplication=True)
+    assert agent.ajouter_produits_depuis_dict(SITE_A, nb_processus=nb_processus) == 3
+    assert agent.ajouter_produits_depuis_dict(SITE_B, nb_processus=nb_processus) == 4
+
+    assert [p.nom for p in agent.produits] == [
+        'Samsung Galaxy S23 128 Go', 'iPhone 15 128GB', 'iPhone 15 256GB', 'iPhone 15 Pro 128GB']
+    assert agent.deduplicateur.nb_fusions == 3
+    galaxy, iphone, iphone_256, iphone_pro = agent.produits
+    assert galaxy.extra['offres'] == {
+        'amazon': {'prix': 799, 'url': 'a1', 'note': 4.0, 'nb_avis': 0, 'stock': True},
+        'fnac': {'prix': 749, 'url': 'b1', 'note': 4.0, 'nb_avis': 0, 'stock': True},
+    }
+    assert {source: offre['prix'] for source, offre in iphone.extra['offres'].items()} == {
+        'amazon': 969, 'fnac': 949, 'darty': 959}
+    assert 'offres' not in iphone_256.extra and 'offres' not in iphone_pro.extra
+
+
+def test_fusion_dans_un_meme_lot_et_a_l_unite():
+    agent = AgentProduitUniversel(deduplication=True)
+    agent.ajouter_produits_depuis_dict(SITE_A + SITE_B)
+    assert len(agent) == 4
+
+    agent.ajouter_produit('iPhone 15 - 128 GB', 'APPLE', 900, source='boulanger')
+    assert len(agent) == 4
+    assert set(agent.produits[1].extra['offres']) == {'amazon', 'fnac', 'darty', 'boulanger'}
+
+    agent.vider()
+    assert len(agent.deduplicateur) == 0
+
+
+@pytest.mark.parametrize('nom, autre, fusion', [
+    ('iPhone 15', 'Apple iPhone 15', True),
+    ('iPhone 15', 'iPhone 15 Pro', False),
+    ('iPhone 15 Pro', 'iPhone 15 Pro Max', False),
+    ('Galaxy S23 128 Go', 'Galaxy S23 256 Go', False),
+    ('Galaxy S23 128 Go', 'GALAXY S23 - 128GB', True),
+])
+def test_jetons_distinctifs(nom, autre, fusion):
+    deduplicateur = Deduplicateur()
+    assert deduplicateur.identifier(Produit(nom, 'Apple', 100.0), 0) == 0
+    assert (deduplicateur.identifier(Produit(autre, 'Apple', 90.0), 1) == 0) is fusion
+
+
+def test_marques_distinctes_jamais_fusionnees():
+    deduplicateur = Deduplicateur()
+    assert jetons_produit('Galaxy S23', 'Samsung', []) == jetons_produit('Galaxy S23', 'Apple', [])
+    assert deduplicateur.identifier(Produit('Galaxy S23', 'Samsung', 100.0), 0) == 0
+    assert deduplicateur.identifier(Produit('Galaxy S23', 'Apple', 100.0), 1) == 1
@@ -0,0 +1,152 @@
+"""Tests de la lecture en flux (agents/flux.py)"""
+
+import gzip
+import json
+import tracemalloc
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.flux import (
+    MAX_ERREURS_AFFICHEES, ErreurFormat, charger_fichier, detecter_format, ecrire_export,
+    iterer_produits
+)
+
+
+PRODUITS = [
+    {'nom': f'Produit {i}', 'marque': 'Marque', 'prix': 10.0 + i, 'note': 4.0}
+    for i in range(50)
+]
+
+
+def ecrire(chemin, texte: str) -> str:
+    chemin.write_text(texte, encoding='utf-8')
+    return str(chemin)
+
+
+# ============================================================================
+# DÉTECTION DU FORMAT
+# ============================================================================
+
+@pytest.mark.parametrize('texte, attendu', [
+    (json.dumps(PRODUITS), 'tableau'),
+    (json.dumps(PRODUITS, indent=2), 'tableau'),
+    ('\n\n   ' + json.dumps(PRODUITS), 'tableau'),
+    (json.dumps({'produits': PRODUITS}), 'objet'),
+    (json.dumps({'produits': PRODUITS}, indent=2), 'objet'),
+    ('{"produits": [\n' + ',\n'.join(map(json.dumps, PRODUITS)) + '\n]}\n', 'objet'),
+    ('\n'.join(map(json.dumps, PRODUITS)) + '\n', 'lignes'),
+    (json.dumps({'metadata': {}}) + '\n' + '\n'.join(map(json.dumps, PRODUITS)), 'lignes'),
+])
+def test_detecter_format(tmp_path, texte, attendu):
+    assert detecter_format(ecrire(tmp_path / 'produits.json', texte)) == attendu
+
+
+def test_detecter_format_extension_et_compression(tmp_path):
+    chemin = tmp_path / 'produits.jsonl.gz'
+    with gzip.open(chemin, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(PRODUITS))  # l'extension prime sur le contenu
+    assert detecter_format(str(chemin)) == 'lignes'
+
+
+def test_detecter_format_longue_premiere_ligne(tmp_path):
+    long = {'nom': 'Long', 'marque': 'M', 'prix': 1, 'description': 'x' * 100_000}
+    lignes = json.dumps(long) + '\n' + json.dumps(PRODUITS[0]) + '\n'
+    assert detecter_format(ecrire(tmp_path / 'a.json', lignes)) == 'lignes'
+    objet = json.dumps({'infos': 'x' * 100_000, 'produits': PRODUITS}) + '\n'
+    assert detecter_format(ecrire(tmp_path / 'b.json', objet)) == 'objet'
+
+
+def test_detecter_format_invalide(tmp_path):
+    with pytest.raises(ErreurFormat):
+        detecter_format(ecrire(tmp_path / 'a.json', 'pas du json'))
+    with pytest.raises(ErreurFormat):
+        detecter_format(ecrire(tmp_path / 'vide.json', '  \n'))
+
+
+@pytest.mark.parametrize('racine', ['tableau', 'objet'])
+def test_detecter_format_memoire_bornee(tmp_path, racine):
+    # Fichier minifié d'une seule ligne (~5 Mo) : ni lu ni décodé en entier
+    produits = [dict(p, description='d' * 500) for p in PRODUITS] * 200
+    donnees = produits if racine == 'tableau' else {'produits': produits}
+    chemin = ecrire(tmp_path / 'minifie.json', json.dumps(donnees))
+
+    tracemalloc.start()
+    try:
+        assert detecter_format(chemin) == racine
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert pic < 1 << 20
+
+
+# ============================================================================
+# LECTURE ET CHARGEMENT
+# ============================================================================
+
+@pytest.mark.parametrize('format_export', ['json', 'jsonl'])
+def test_relire_un_export(tmp_path, format_export):
+    chemin = str(tmp_path / f'export.{format_export}')
+    ecrire_export(chemin, {'metadata': {'type': 'test'}}, PRODUITS, format=format_export)
+    agent = AgentProduitUniversel('test')
+    rapport = charger_fichier(agent, chemin, taille_lot=7)
+    assert (rapport.nb_lus, rapport.nb_ajoutes, rapport.nb_erreurs) == (50, 50, 0)
+    assert [p.nom for p in agent.produits] == [p['nom'] for p in PRODUITS]
+
+
+def test_lignes_invalides_signalees(tmp_path):
+    texte = json.dumps(PRODUITS[0]) + '\n{pas du json\n' + json.dumps(PRODUITS[1]) + '\n[1]\n'
+    agent = AgentProduitUniversel('test')
+    rapport = charger_fichier(agent, ecrire(tmp_path / 'p.jsonl', texte))
+    assert rapport.nb_ajoutes == 2
+    assert [numero for numero, _, _ in rapport.erreurs] == [2, 4]
+
+
+def enregistrements_avec_rejets(nb: int = 30):
+    """Produits valides, prix non numériques (rejet au scoring) et prix absents
+    (rejet à la construction), entremêlés"""
+    for i in range(nb):
+        if i % 7 == 3:
+            yield {'nom': f'Produit {i}', 'marque': 'Marque', 'prix': 'gratuit'}
+        elif i % 7 == 5:
+            yield {'nom': f'Produit {i}', 'marque': 'Marque'}
+        else:
+            yield {'nom': f'Produit {i}', 'marque': 'Marque', 'prix': 10.0 + i}
+
+
+@pytest.mark.parametrize('nb_processus', [None, 2])
+def test_rejets_signales_dans_l_ordre(tmp_path, nb_processus):
+    lignes = [json.dumps(p) for p in enregistrements_avec_rejets()]
+    lignes[1], lignes[2] = '{pas du json', '[1]'
+    agent = AgentProduitUniversel('test')
+    rapport = charger_fichier(agent, ecrire(tmp_path / 'p.jsonl', '\n'.join(lignes) + '\n'),
+                              taille_lot=8, nb_processus=nb_processus)
+
+    numeros = [numero for numero, _, _ in rapport.erreurs]
+    assert numeros == [2, 3, 4, 6, 11, 13, 18, 20, 25, 27]
+    assert rapport.nb_ajoutes == len(agent) == 20
+
+
+def test_rejets_affiches_en_bilan(capsys):
+    agent = AgentProduitUniversel('test')
+    assert agent.ajouter_produits_depuis_dict(enregistrements_avec_rejets(100), taille_lot=8) == 72
+    lignes = capsys.readouterr().out.splitlines()
+    assert lignes[0] == '28 produit(s) ignoré(s)'
+    assert len(lignes) == 1 + MAX_ERREURS_AFFICHEES
+    assert [ligne.split()[0] for ligne in lignes[1:4]] == ['n°4', 'n°6', 'n°11']
+
+    # Rescoring : un bilan, pas une ligne par produit
+    agent._stockage.scorer = lambda profil: [(i, ValueError('illisible')) for i in range(50)]
+    agent.appliquer_profil({'prix_reference': 100})
+    lignes = capsys.readouterr().out.splitlines()
+    assert lignes[0] == '50 produit(s) non rescoré(s)'
+    assert len(lignes) == 1 + MAX_ERREURS_AFFICHEES
+
+
+def test_tableau_tronque(tmp_path):
+    texte = json.dumps(PRODUITS)[:-40]
+    assert len(list(iterer_produits(ecrire(tmp_path / 'ok.json', json.dumps(PRODUITS))))) == 50
+    agent = AgentProduitUniversel('test')
+    rapport = charger_fichier(agent, ecrire(tmp_path / 'tronque.json', texte))
+    assert rapport.erreur_fatale is not None
+    assert 0 < rapport.nb_ajoutes < 50
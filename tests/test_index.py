@@ -0,0 +1,109 @@
+"""Tests des index de l'agent (agents/index.py) et de leur synchronisation"""
+
+import pytest
+
+from agents import AgentProduitUniversel
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+
+def remplir(agent, n: int = 60):
+    for i in range(n):
+        agent.ajouter_produit(f'Produit {i}', f'Marque {i % 4}', 100.0 + 7 * i,
+                              note=round(3.0 + (i % 9) * 0.2, 1), nb_avis=10 * i,
+                              caracteristiques=['5G'] if i % 3 == 0 else [])
+
+
+def noms(produits):
+    return [p.nom for p in produits]
+
+
+def attendu_budget(agent, budget: float):
+    return [p.nom for p in agent.produits if p.prix <= budget]
+
+
+def attendu_top(agent, n: int):
+    classes = sorted(agent.produits, key=lambda p: p.score_qualite_prix, reverse=True)
+    return [p.nom for p in classes[:n]]
+
+
+# ============================================================================
+# AJOUTS ET MISES À JOUR
+# ============================================================================
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_index_apres_ajouts(stockage):
+    agent = AgentProduitUniversel('produit', stockage=stockage)
+    remplir(agent, 30)
+    assert noms(agent.filtrer_par_budget(200)) == attendu_budget(agent, 200)
+    # Ajouts après une première lecture des index : intégrés à la suivante
+    remplir(agent, 60)
+    assert noms(agent.filtrer_par_budget(200)) == attendu_budget(agent, 200)
+    assert noms(agent.obtenir_top(n=10)) == attendu_top(agent, 10)
+    assert noms(agent.filtrer_par_marque(['Marque 1'])) == [
+        p.nom for p in agent.produits if p.marque == 'Marque 1']
+    assert noms(agent.filtrer_par_caracteristique('5G')) == [
+        p.nom for p in agent.produits if '5G' in p.caracteristiques]
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_index_apres_mettre_a_jour(stockage):
+    agent = AgentProduitUniversel('produit', stockage=stockage)
+    remplir(agent)
+    assert agent.filtrer_par_budget(50) == []
+    agent.obtenir_top(n=5)
+
+    agent.mettre_a_jour(20, prix=10.0)
+    agent.mettre_a_jour(3, prix=450.0, note=4.9, nb_avis=5000)
+    assert noms(agent.filtrer_par_budget(50)) == ['Produit 20']
+    assert noms(agent.filtrer_par_prix(400, 460)) == [
+        p.nom for p in agent.produits if 400 <= p.prix <= 460]
+    assert noms(agent.obtenir_top(n=10)) == attendu_top(agent, 10)
+    stats = agent.statistiques_courantes()
+    assert stats.prix_min == 10.0
+    assert stats.nb == len(agent)
+
+
+def test_mettre_a_jour_valide_les_champs():
+    agent = AgentProduitUniversel('produit')
+    remplir(agent, 5)
+    with pytest.raises(ValueError):
+        agent.mettre_a_jour(0, nom='Autre')
+    with pytest.raises(IndexError):
+        agent.mettre_a_jour(5, prix=1.0)
+
+
+# ============================================================================
+# PRODUITS EN LECTURE SEULE
+# ============================================================================
+
+@pytest.mark.parametrize('modification', [
+    lambda produits: produits.pop(),
+    lambda produits: produits.append(produits[0]),
+    lambda produits: produits.insert(0, produits[1]),
+    lambda produits: produits.__setitem__(0, produits[1]),
+    lambda produits: produits.__delitem__(0),
+    lambda produits: produits.sort(key=lambda p: p.prix),
+    lambda produits: produits.clear(),
+])
+def test_produits_en_lecture_seule(modification):
+    agent = AgentProduitUniversel('produit')
+    remplir(agent, 10)
+    agent.filtrer_par_budget(150)
+    with pytest.raises(TypeError):
+        modification(agent.produits)
+    assert len(agent) == 10
+    assert noms(agent.filtrer_par_budget(150)) == attendu_budget(agent, 150)
+
+
+def test_retirer_des_produits_par_reaffectation():
+    agent = AgentProduitUniversel('produit')
+    remplir(agent, 20)
+    assert noms(agent.filtrer_par_budget(130)) == ['Produit 0', 'Produit 1', 'Produit 2',
+                                                   'Produit 3', 'Produit 4']
+    agent.produits = [p for p in agent.produits if p.prix > 110]
+    agent.ajouter_produit('Nouveau', 'Marque 9', 10.0)
+    assert noms(agent.filtrer_par_budget(130)) == ['Produit 2', 'Produit 3', 'Produit 4',
+                                                   'Nouveau']
+    assert noms(agent.obtenir_top(n=5)) == attendu_top(agent, 5)
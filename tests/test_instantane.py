@@ -0,0 +1,65 @@
+"""Tests des instantanés binaires (agents/instantane.py)"""
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.instantane import ErreurInstantane, ouvrir_instantane
+from benchmarks.generateur import generer_produits
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+# Catalogue synthétique ; quelques fiches avec caractéristiques accentuées et extra
+DONNEES = [dict(d, caracteristiques=['5G', 'Écran OLED'], extra={'origine': 'é'})
+           if i % 50 == 0 else d
+           for i, d in enumerate(generer_produits(500, graine=3))]
+
+CRITERES = ('score', 'prix', 'note', 'popularite')
+
+
+def dicts(produits):
+    return [p.to_dict() for p in produits]
+
+
+def comparer(agent, reference):
+    assert len(agent) == len(reference)
+    assert dicts(agent.produits) == dicts(reference.produits)
+    for critere in CRITERES:
+        for budget in (None, 60, 400):
+            assert dicts(agent.obtenir_top(6, budget, critere)) == dicts(
+                reference.obtenir_top(6, budget, critere)), (critere, budget)
+    assert dicts(agent.filtrer_par_caracteristique('oled')) == dicts(
+        reference.filtrer_par_caracteristique('oled'))
+    assert dicts(agent.filtrer_par_marque(['apple'])) == dicts(
+        reference.filtrer_par_marque(['apple']))
+    assert agent.obtenir_statistiques() == pytest.approx(reference.obtenir_statistiques())
+    assert agent.obtenir_recommandations(300) == reference.obtenir_recommandations(300)
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_rechargement_identique(stockage, tmp_path):
+    agent = AgentProduitUniversel('smartphone', stockage=stockage, profil='smartphone')
+    agent.ajouter_produits_depuis_dict(DONNEES)
+    agent.obtenir_top(5)  # index trié sauvegardé avec l'instantané
+    fichier = str(tmp_path / 'catalogue.inst')
+    agent.sauvegarder_instantane(fichier)
+
+    rouvert = AgentProduitUniversel.depuis_instantane(fichier)
+    assert rouvert.type_produit == 'smartphone'
+    assert rouvert.profil == agent.profil
+    comparer(rouvert, agent)
+
+    # Ajouts après réouverture, puis nouvel instantané
+    for cible in (agent, rouvert):
+        cible.ajouter_produits_depuis_dict(DONNEES[:3])
+        cible.ajouter_produit('Z', 'Apple', 1.0)
+    comparer(rouvert, agent)
+    rouvert.sauvegarder_instantane(str(tmp_path / 'suite.inst'))
+    comparer(AgentProduitUniversel.depuis_instantane(str(tmp_path / 'suite.inst')), agent)
+
+
+def test_fichier_invalide(tmp_path):
+    chemin = tmp_path / 'faux.inst'
+    chemin.write_bytes(b'pas un instantane' * 10)
+    with pytest.raises(ErreurInstantane):
+        ouvrir_instantane(str(chemin))
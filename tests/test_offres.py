@@ -0,0 +1,82 @@
+"""Tests des offres regroupées par produit (agents/offres.py)"""
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.offres import cle_produit
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+# Le même Galaxy S23 sur trois sites (épuisé chez darty), l'iPhone 15 sur deux
+RELEVES = [
+    dict(nom='Galaxy S23 128 Go', marque='Samsung', prix=799, note=4.5, nb_avis=300,
+         source='amazon', url='a1'),
+    dict(nom='SAMSUNG GALAXY S23 - 128GB', marque='SAMSUNG', prix=749, note=4.2, nb_avis=50,
+         source='fnac', url='b1'),
+    dict(nom='Galaxy S23 128GB', marque='samsung', prix=699, note=4.8, nb_avis=10,
+         source='darty', url='c1', stock=False),
+    dict(nom='iPhone 15', marque='Apple', prix=969, note=4.6, nb_avis=1000,
+         source='amazon', url='a2'),
+    dict(nom='iPhone 15', marque='Apple', prix=949, note=4.4, nb_avis=200,
+         source='fnac', url='b2'),
+    dict(nom='iPhone 15 Pro', marque='Apple', prix=1229, note=4.7, nb_avis=500,
+         source='fnac', url='b3'),
+]
+
+
+def charger(stockage: str, deduplication: bool = False) -> AgentProduitUniversel:
+    agent = AgentProduitUniversel(stockage=stockage, deduplication=deduplication)
+    agent.ajouter_produits_depuis_dict(RELEVES)
+    return agent
+
+
+def resume(groupes):
+    return [(g.marque.lower(), g.prix_min, g.prix_median, g.meilleure_source, g.sources)
+            for g in groupes]
+
+
+def test_cle_produit():
+    assert cle_produit('Galaxy S23 - 128 Go', 'SAMSUNG') == cle_produit('Samsung S23 Galaxy 128GB',
+                                                                        'Samsung')
+    assert cle_produit('iPhone 15', 'Apple') != cle_produit('iPhone 15 Pro', 'Apple')
+
+
+@pytest.mark.parametrize('deduplication', [False, True])
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_offres_regroupees(stockage, deduplication):
+    agent = charger(stockage, deduplication)
+    groupes = agent.obtenir_offres()
+    assert resume(groupes) == [
+        ('samsung', 749, 774.0, 'amazon', ['fnac', 'amazon']),
+        ('apple', 949, 959.0, 'amazon', ['fnac', 'amazon']),
+        ('apple', 1229, 1229, 'fnac', ['fnac']),
+    ]
+    assert [g.nom for g in groupes][1:] == ['iPhone 15', 'iPhone 15 Pro']
+    assert groupes[0].to_dict()['meilleure_offre'] == {'source': 'fnac', 'prix': 749, 'url': 'b1'}
+
+    # Offres épuisées comprises : toutes les lignes relevées
+    tous = agent.obtenir_offres(en_stock=False)
+    assert sum(len(g.offres) for g in tous) == len(RELEVES)
+    assert tous[0].prix_min == 699 and tous[0].meilleure_source == 'darty'
+
+    # Restreint à une sélection
+    assert resume(agent.obtenir_offres(agent.requete().marques(['apple']))) == resume(groupes[1:])
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_classement_par_offre(stockage):
+    agent = charger(stockage)
+    # Sans regroupement, le Galaxy S23 occupe trois places du top
+    assert [p.url for p in agent.obtenir_top(3, critere='prix')] == ['c1', 'b1', 'a1']
+
+    assert [p.url for p in agent.obtenir_top(5, critere='prix', par_offre=True)] == [
+        'b1', 'b2', 'b3']
+    assert [p.url for p in agent.obtenir_top(5, critere='popularite', par_offre=True)] == [
+        'b2', 'b3', 'b1']
+    assert [p.url for p in agent.obtenir_top(5, budget_max=800, par_offre=True)] == ['b1']
+
+    recommandations = agent.obtenir_recommandations(budget_max=800, par_offre=True)
+    assert recommandations['nb_produits_trouves'] == 1
+    assert recommandations['meilleur_prix']['offres']['prix_min'] == 749
+    assert agent.obtenir_recommandations(budget_max=800)['nb_produits_trouves'] == 3
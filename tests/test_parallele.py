@@ -0,0 +1,57 @@
+"""Tests de l'ingestion multi-processus (agents/parallele.py)"""
+
+import json
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.flux import charger_fichier
+from benchmarks.generateur import generer_produits
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+# Catalogue synthétique, avec quelques fiches rejetées (prix illisible,
+# prix absent) et un prix de référence propre au produit
+DONNEES = list(generer_produits(600, graine=5))
+DONNEES[5] = {'nom': 'Prix illisible', 'marque': 'X', 'prix': 'abc'}
+DONNEES[7] = {'nom': 'Sans prix', 'marque': 'X'}
+DONNEES[400] = dict(DONNEES[400], extra={'prix_reference': 50})
+
+
+def contenu(agent):
+    return [(p.to_dict(), p.date_ajout is not None) for p in agent.produits]
+
+
+def comparer(agent, reference):
+    assert len(agent) == len(reference) == len(DONNEES) - 2
+    assert contenu(agent) == contenu(reference)
+    assert agent.obtenir_statistiques() == pytest.approx(reference.obtenir_statistiques())
+    for critere in ('score', 'prix', 'note', 'popularite'):
+        assert ([p.nom for p in agent.obtenir_top(10, 500, critere)]
+                == [p.nom for p in reference.obtenir_top(10, 500, critere)]), critere
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_dicts_comme_en_sequentiel(stockage):
+    sequentiel = AgentProduitUniversel(stockage=stockage)
+    assert sequentiel.ajouter_produits_depuis_dict(DONNEES, taille_lot=100) == 598
+    parallele = AgentProduitUniversel(stockage=stockage)
+    assert parallele.ajouter_produits_depuis_dict(DONNEES, taille_lot=100, nb_processus=3) == 598
+    comparer(parallele, sequentiel)
+
+
+@pytest.mark.parametrize('stockage', ['liste', 'colonnes'])
+def test_fichier_comme_en_sequentiel(stockage, tmp_path):
+    chemin = tmp_path / 'produits.jsonl'
+    chemin.write_text(''.join(json.dumps(d) + '\n' for d in DONNEES) + 'pas du json\n')
+
+    sequentiel = AgentProduitUniversel(stockage=stockage)
+    attendu = charger_fichier(sequentiel, str(chemin), taille_lot=150)
+    parallele = AgentProduitUniversel(stockage=stockage)
+    rapport = charger_fichier(parallele, str(chemin), taille_lot=150, nb_processus=2)
+
+    comparer(parallele, sequentiel)
+    assert (rapport.nb_lus, rapport.nb_ajoutes) == (attendu.nb_lus, attendu.nb_ajoutes)
+    assert [numero for numero, _, _ in rapport.erreurs] == [
+        numero for numero, _, _ in attendu.erreurs] == [6, 8, 601]
@@ -0,0 +1,95 @@
+"""Tests des agents partitionnés (agents/partitions.py)"""
+
+import json
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.partitions import AgentPartitionne, Partition, fusionner_top
+from benchmarks.generateur import generer_produits
+
+
+DONNEES = list(generer_produits(400, graine=11))
+
+PARTITIONNEMENTS = [
+    dict(nb_partitions=4, cle='marque'),
+    dict(nb_partitions=3, cle='source'),
+    dict(nb_partitions=4, cle='prix', bornes_prix=[100, 300, 800]),
+]
+
+
+def noms(produits):
+    return [p.nom for p in produits]
+
+
+@pytest.fixture(scope='module')
+def unique():
+    agent = AgentProduitUniversel()
+    agent.ajouter_produits_depuis_dict(DONNEES)
+    return agent
+
+
+# ============================================================================
+# ÉQUIVALENCE AVEC UN AGENT UNIQUE
+# ============================================================================
+
+@pytest.mark.parametrize('options', PARTITIONNEMENTS)
+@pytest.mark.parametrize('stockage', ['liste', 'colonnes'])
+def test_memes_resultats_qu_un_agent_unique(options, stockage, unique):
+    agent = AgentPartitionne(stockage=stockage, **options)
+    assert agent.ajouter_produits_depuis_dict(DONNEES, taille_lot=50) == len(agent) == 400
+
+    for n, budget, critere in [(10, None, 'score'), (5, 300, 'score'), (8, None, 'prix'),
+                               (8, 500, 'note'), (6, None, 'popularite')]:
+        assert noms(agent.obtenir_top(n, budget, critere)) == noms(
+            unique.obtenir_top(n, budget, critere)), (n, budget, critere)
+
+    stats, attendu = agent.obtenir_statistiques(), unique.obtenir_statistiques()
+    for cle, valeur in attendu.items():
+        if cle == 'marques':
+            assert sorted(stats[cle]) == sorted(valeur)
+        else:
+            assert stats[cle] == pytest.approx(valeur), cle
+
+    recommandations = agent.obtenir_recommandations(budget_max=400, marques_preferees=['Apple'])
+    attendues = unique.obtenir_recommandations(budget_max=400, marques_preferees=['Apple'])
+    assert recommandations['nb_produits_trouves'] == attendues['nb_produits_trouves']
+    for cle in ('meilleur_produit', 'meilleur_prix', 'meilleure_note'):
+        assert recommandations[cle]['nom'] == attendues[cle]['nom'], cle
+    assert [p['nom'] for p in recommandations['top_recommandations']] == [
+        p['nom'] for p in attendues['top_recommandations']]
+
+
+def test_partiels_serialisables(unique):
+    partitions = [Partition(k) for k in range(3)]
+    for k, data in enumerate(DONNEES):
+        partitions[k % 3].ajouter_produits_depuis_dict([data], [k])
+    partiels = [json.loads(json.dumps(p.partiel_top(n=7))) for p in partitions]
+    assert [d['nom'] for d in fusionner_top(partiels, 7)] == noms(unique.obtenir_top(7))
+
+
+# ============================================================================
+# AJOUTS ET REJETS
+# ============================================================================
+
+def test_ajouter_produit_retourne_le_produit(capsys):
+    agent = AgentPartitionne(3)
+    produit = agent.ajouter_produit('Galaxy S24', 'Samsung', 899.0, note=4.6, nb_avis=300)
+    assert produit.nom == 'Galaxy S24' and produit.prix == 899.0
+    assert produit.score_qualite_prix > 0
+    assert agent.ajouter_produit('Illisible', 'Samsung', 'gratuit') is None
+    assert len(agent) == 1
+    assert capsys.readouterr().out.startswith('1 produit(s) ignoré(s)')
+
+
+def test_rejets_dans_l_ordre_des_donnees(capsys):
+    donnees = [dict(d) for d in DONNEES[:40]]
+    for k in (3, 9, 17, 30):
+        donnees[k]['prix'] = 'gratuit'
+    donnees[22] = 'pas un produit'
+
+    agent = AgentPartitionne(4, cle='source')
+    assert agent.ajouter_produits_depuis_dict(donnees, taille_lot=3) == 35
+    lignes = capsys.readouterr().out.splitlines()
+    assert lignes[0] == '5 produit(s) ignoré(s)'
+    assert [ligne.split()[0] for ligne in lignes[1:]] == ['n°4', 'n°10', 'n°18', 'n°23', 'n°31']
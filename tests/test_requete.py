@@ -0,0 +1,97 @@
+"""Tests des requêtes composables (agents/requete.py)"""
+
+import pytest
+
+from agents import AgentProduitUniversel
+from benchmarks.generateur import generer_produits
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+DONNEES = list(generer_produits(800, graine=9))
+
+# Clés de tri de référence (tri stable : ordre d'insertion à égalité)
+CLES = {
+    'score': lambda p: -p.score_qualite_prix,
+    'prix': lambda p: p.prix,
+    'note': lambda p: -p.note,
+    'popularite': lambda p: -p.nb_avis,
+}
+
+# (filtres, top) : chaque filtre est (méthode, arguments, prédicat de référence)
+CAS = [
+    ([('prix', dict(max=300), lambda p: p.prix <= 300)], None),
+    ([('prix', dict(min=100, max=700), lambda p: 100 <= p.prix <= 700),
+      ('marques', dict(marques=['samsung', 'APPLE', 'inconnue']),
+       lambda p: p.marque.lower() in ('samsung', 'apple'))], None),
+    ([('note_min', dict(note=4.5), lambda p: p.note >= 4.5)], (5, 'score')),
+    ([('caracteristique', dict(sous_chaine='5g'),
+       lambda p: any('5g' in c.lower() for c in p.caracteristiques)),
+      ('prix', dict(max=1200), lambda p: p.prix <= 1200)], (10, 'prix')),
+    ([('filtre', dict(fonction=lambda p: p.nb_avis > 100), lambda p: p.nb_avis > 100),
+      ('note_min', dict(note=4.0), lambda p: p.note >= 4.0)], (8, 'popularite')),
+    ([('marques', dict(marques=['Google']), lambda p: p.marque.lower() == 'google')],
+     (3, 'note')),
+    ([], (20, 'score')),
+    ([('prix', dict(min=5000), lambda p: p.prix >= 5000)], (5, 'score')),
+]
+
+
+@pytest.fixture(scope='module', params=STOCKAGES)
+def agent(request):
+    agent = AgentProduitUniversel(stockage=request.param)
+    agent.ajouter_produits_depuis_dict(DONNEES)
+    return agent
+
+
+@pytest.mark.parametrize('filtres, top', CAS)
+def test_resultat_comme_un_filtrage_direct(agent, filtres, top):
+    requete = agent.requete()
+    attendus = list(agent.produits)
+    for methode, arguments, predicat in filtres:
+        requete = getattr(requete, methode)(**arguments)
+        attendus = [p for p in attendus if predicat(p)]
+    if top is not None:
+        n, critere = top
+        requete = requete.top(n, critere)
+        attendus = sorted(attendus, key=CLES[critere])[:n]
+
+    noms = [p.nom for p in attendus]
+    assert [p.nom for p in requete] == noms, requete.expliquer()
+    assert [p.nom for p in requete.produits()] == noms
+    assert len(requete) == len(noms)
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_requete_immuable_et_resultat_a_jour(stockage):
+    agent = AgentProduitUniversel(stockage=stockage)
+    agent.ajouter_produits_depuis_dict(DONNEES)
+    base = agent.requete().prix(max=200)
+    economiques = base.note_min(4.5)
+    avant = sum(p.prix <= 200 for p in agent.produits)
+    assert len(base) == avant
+    assert len(economiques) == sum(p.prix <= 200 and p.note >= 4.5 for p in agent.produits)
+
+    # Le résultat suit les ajouts et mises à jour du catalogue
+    agent.ajouter_produit('Nouveau', 'Marque', 150.0, note=5.0)
+    assert len(base) == avant + 1
+    assert 'Nouveau' in [p.nom for p in economiques]
+    agent.mettre_a_jour(len(agent) - 1, prix=10_000.0)
+    assert len(base) == avant
+    assert 'Nouveau' not in [p.nom for p in economiques]
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_selection_comme_un_catalogue_reduit(stockage):
+    agent = AgentProduitUniversel(stockage=stockage)
+    agent.ajouter_produits_depuis_dict(DONNEES)
+    selection = agent.requete().prix(min=100, max=700)
+    temoin = AgentProduitUniversel()
+    temoin.ajouter_produits_depuis_dict(d for d in DONNEES if 100 <= d['prix'] <= 700)
+
+    for critere in CLES:
+        assert ([p.nom for p in agent.obtenir_top(5, 500, critere, selection=selection)]
+                == [p.nom for p in temoin.obtenir_top(5, 500, critere)]), critere
+    stats, attendu = agent.obtenir_statistiques(selection), temoin.obtenir_statistiques()
+    assert sorted(stats.pop('marques')) == sorted(attendu.pop('marques'))
+    assert stats == pytest.approx(attendu)
@@ -0,0 +1,79 @@
+"""Tests des profils de scoring (agents/scoring.py)"""
+
+import pytest
+
+from agents import AgentProduitUniversel, ProfilScoring
+from agents.produit import categorie_prix
+from agents.scoring import PROFIL_DEFAUT, PROFILS, score_produit
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+
+def remplir(agent, n: int = 40):
+    for i in range(n):
+        agent.ajouter_produit(f'Produit {i}', f'Marque {i % 4}', 50.0 + 37 * i,
+                              note=round(3.0 + (i % 9) * 0.2, 1), nb_avis=15 * i,
+                              caracteristiques=['5G'] * (i % 3))
+
+
+# ============================================================================
+# PROFIL PAR DÉFAUT
+# ============================================================================
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+@pytest.mark.parametrize('type_produit', ['produit', 'smartphone', 'ordinateur', 'TV',
+                                          'accessoire'])
+def test_formule_historique_par_defaut(type_produit, stockage):
+    agent = AgentProduitUniversel(type_produit, stockage=stockage)
+    remplir(agent)
+
+    assert agent.profil is PROFIL_DEFAUT
+    for p in agent.produits:
+        assert p.score_qualite_prix == score_produit(p.note, p.prix, p.nb_avis,
+                                                     len(p.caracteristiques))
+        assert p.categorie_prix == categorie_prix(p.prix)
+
+
+def test_top_inchange_selon_le_type():
+    agents = [AgentProduitUniversel(t) for t in ('produit', 'smartphone', 'accessoire')]
+    for agent in agents:
+        remplir(agent)
+    tops = [[p.nom for p in agent.obtenir_top(n=10)] for agent in agents]
+    assert tops[0] == tops[1] == tops[2]
+
+
+# ============================================================================
+# PROFILS SUR DEMANDE
+# ============================================================================
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_profil_par_type_sur_demande(stockage):
+    agent = AgentProduitUniversel('smartphone', stockage=stockage, profil='SmartPhone')
+    remplir(agent)
+
+    profil = PROFILS['smartphone']
+    assert agent.profil is profil
+    for p in agent.produits:
+        assert p.score_qualite_prix == profil.score(p.note, p.prix, p.nb_avis,
+                                                    len(p.caracteristiques))
+    assert agent.produits[5].categorie_prix == profil.categorie(agent.produits[5].prix)
+
+
+def test_profil_enregistre_et_appliquer_profil(monkeypatch):
+    monkeypatch.setitem(PROFILS, 'aspirateur', ProfilScoring(prix_reference=300))
+    agent = AgentProduitUniversel('aspirateur')
+    remplir(agent, 10)
+    assert agent.profil is PROFIL_DEFAUT
+
+    assert agent.appliquer_profil('aspirateur') == 10
+    assert agent.profil is PROFILS['aspirateur']
+    assert [p.score_qualite_prix for p in agent.produits] == [
+        PROFILS['aspirateur'].score(p.note, p.prix, p.nb_avis, len(p.caracteristiques))
+        for p in agent.produits]
+
+
+def test_type_inconnu_profil_par_defaut():
+    assert AgentProduitUniversel('x', profil='inconnu').profil is PROFIL_DEFAUT
+    with pytest.raises(TypeError):
+        AgentProduitUniversel('x', profil=42)
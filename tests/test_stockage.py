@@ -0,0 +1,173 @@
+"""Tests de parité des stockages (liste, colonnes, SQLite)"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+import pytest
+
+from agents import AgentProduitUniversel
+from agents.stockage_sqlite import StockageSQLite
+from benchmarks.generateur import generer_produits
+
+
+STOCKAGES = ['liste', 'colonnes', 'sqlite']
+
+# Catalogue synthétique ; un produit sur dix porte stock et image
+DONNEES = [dict(d, stock=bool(i % 20), image_url=f'https://example.com/{i}.jpg')
+           if i % 10 == 0 else d
+           for i, d in enumerate(generer_produits(300, graine=7))]
+
+CHAMPS = ('nom', 'marque', 'prix', 'note', 'nb_avis', 'caracteristiques', 'url',
+          'source', 'image_url', 'stock', 'score_qualite_prix', 'categorie_prix')
+
+
+def charger(stockage: str, par_lots: bool = True) -> AgentProduitUniversel:
+    agent = AgentProduitUniversel('smartphone', stockage=stockage)
+    if par_lots:
+        agent.ajouter_produits_depuis_dict(DONNEES, taille_lot=64)
+    else:
+        for d in DONNEES:
+            agent.ajouter_produit(**d)
+    return agent
+
+
+def resume(produits):
+    return [tuple(getattr(p, champ) for champ in CHAMPS) for p in produits]
+
+
+def comparer_statistiques(obtenu, attendu):
+    """Mêmes agrégats, aux arrondis de sommation près (ordre des marques libre)"""
+    assert obtenu.keys() == attendu.keys()
+    for cle, valeur in attendu.items():
+        if cle == 'marques':
+            assert sorted(obtenu[cle]) == sorted(valeur)
+        else:
+            assert obtenu[cle] == pytest.approx(valeur), cle
+
+
+@pytest.fixture(scope='module')
+def agents():
+    return {stockage: charger(stockage) for stockage in STOCKAGES}
+
+
+@pytest.fixture(scope='module')
+def reference(agents):
+    return agents['liste']
+
+
+# ============================================================================
+# CONTENU
+# ============================================================================
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_ajout_unitaire_et_par_lots(stockage, reference):
+    agent = charger(stockage, par_lots=False)
+    assert len(agent) == len(reference) == len(DONNEES)
+    assert resume(agent.produits) == resume(reference.produits)
+
+
+@pytest.mark.parametrize('stockage', ['colonnes', 'sqlite'])
+def test_produits_et_exports_identiques(stockage, agents, reference):
+    agent = agents[stockage]
+    assert resume(agent.produits) == resume(reference.produits)
+    for i in (0, 1, 10, 150, len(DONNEES) - 1):
+        assert agent._stockage.dict_produit(i) == reference._stockage.dict_produit(i)
+        assert (json.loads(agent._stockage.json_produit(i))
+                == json.loads(reference._stockage.json_produit(i)))
+    for champ in ('prix', 'note', 'nb_avis', 'marque', 'score'):
+        assert list(agent._stockage.colonne(champ)) == list(reference._stockage.colonne(champ))
+        assert list(agent._stockage.colonne(champ, 250)) == list(
+            reference._stockage.colonne(champ, 250))
+    assert sorted(agent._stockage.marques_distinctes()) == sorted(
+        reference._stockage.marques_distinctes())
+
+
+@pytest.mark.parametrize('stockage', ['colonnes', 'sqlite'])
+def test_export_json_identique(stockage, agents, reference, tmp_path):
+    exports = []
+    for nom, agent in (('ref', reference), (stockage, agents[stockage])):
+        chemin = tmp_path / f'{nom}.jsonl'
+        agent.exporter_json(str(chemin), budget_max=400, format='jsonl')
+        exports.append(chemin.read_text(encoding='utf-8').splitlines())
+    obtenu, attendu = exports[1], exports[0]
+    # En-tête : date d'export et agrégats ; puis les produits, ligne à ligne
+    comparer_statistiques(json.loads(obtenu[0])['statistiques'],
+                          json.loads(attendu[0])['statistiques'])
+    assert obtenu[1:] == attendu[1:]
+
+
+# ============================================================================
+# FILTRES, CLASSEMENTS ET AGRÉGATS
+# ============================================================================
+
+@pytest.mark.parametrize('stockage', ['colonnes', 'sqlite'])
+@pytest.mark.parametrize('requete', [
+    lambda a: a.filtrer_par_budget(150),
+    lambda a: a.filtrer_par_prix(200, 600),
+    lambda a: a.filtrer_par_marque(['Apple', 'Sony']),
+    lambda a: a.filtrer_par_note(4.5),
+    lambda a: a.filtrer_par_caracteristique('oled'),
+    lambda a: a.obtenir_top(n=15),
+    lambda a: a.obtenir_top(n=5, budget_max=300, critere='prix'),
+    lambda a: a.obtenir_top(n=5, critere='popularite'),
+])
+def test_filtres_et_top_identiques(stockage, requete, agents, reference):
+    assert resume(requete(agents[stockage])) == resume(requete(reference))
+
+
+@pytest.mark.parametrize('stockage', ['colonnes', 'sqlite'])
+def test_statistiques_et_recommandations_identiques(stockage, agents, reference):
+    agent = agents[stockage]
+    comparer_statistiques(agent.obtenir_statistiques(), reference.obtenir_statistiques())
+
+    recommandations = agent.obtenir_recommandations(budget_max=500, marques_preferees=['LG'])
+    attendues = reference.obtenir_recommandations(budget_max=500, marques_preferees=['LG'])
+    assert json.dumps(recommandations, sort_keys=True, default=str) == json.dumps(
+        attendues, sort_keys=True, default=str)
+
+
+@pytest.mark.parametrize('stockage', STOCKAGES)
+def test_mettre_a_jour_identique(stockage):
+    agent, reference = charger(stockage), charger('liste')
+    for a in (agent, reference):
+        a.mettre_a_jour(5, prix=1.5, note=5.0, stock=False)
+        a.mettre_a_jour(120, nb_avis=10000)
+    assert resume(agent.produits) == resume(reference.produits)
+    assert resume(agent.obtenir_top(n=5)) == resume(reference.obtenir_top(n=5))
+
+    agent.vider()
+    assert len(agent) == 0 and agent.filtrer_par_budget(10 ** 6) == []
+
+
+def test_sqlite_partage_entre_threads(tmp_path):
+    stockage = StockageSQLite(str(tmp_path / 'catalogue.sqlite'))
+    produits = list(charger('liste').produits)
+    lots = [produits[k:k + 30] for k in range(0, len(produits), 30)]
+    with ThreadPoolExecutor(4) as executeur:
+        assert sum(executeur.map(stockage.ajouter_lot, lots)) == len(produits)
+        # Lectures pendant les ajouts
+        list(executeur.map(lambda _: stockage.compter(), range(20)))
+
+    assert len(stockage) == stockage.compter() == len(produits)
+    assert sorted(stockage.colonne('nom')) == sorted(p.nom for p in produits)
+
+
+def test_sqlite_rouvert_avec_un_autre_profil(tmp_path):
+    fichier = str(tmp_path / 'catalogue.sqlite')
+    agent = AgentProduitUniversel(stockage=StockageSQLite(fichier), profil='smartphone')
+    agent.ajouter_produits_depuis_dict(DONNEES[:50])
+    agent._stockage.fermer()
+
+    # Même profil : rien n'est recalculé
+    agent = AgentProduitUniversel(stockage=StockageSQLite(fichier), profil='smartphone')
+    assert agent.version == 0
+    agent._stockage.fermer()
+
+    # Autre profil : toute la base est rescorée, ajouts compris
+    agent = AgentProduitUniversel(stockage=StockageSQLite(fichier), profil='ordinateur')
+    agent.ajouter_produits_depuis_dict(DONNEES[50:60])
+    reference = AgentProduitUniversel(profil='ordinateur')
+    reference.ajouter_produits_depuis_dict(DONNEES[:60])
+    assert resume(agent.produits) == resume(reference.produits)
+    assert resume(agent.obtenir_top(n=10)) == resume(reference.obtenir_top(n=10))
+    assert agent._stockage.profil_base == reference.profil
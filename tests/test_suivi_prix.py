@@ -0,0 +1,57 @@
+"""Tests du suivi des prix (agents/suivi_prix.py)"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agents.suivi_prix import SuiviPrix, identite
+
+
+def releve(i: int, prix: float):
+    return {'nom': f'Produit {i}', 'marque': 'Marque', 'prix': prix,
+            'url': f'https://site/{i}'}
+
+
+@pytest.fixture
+def suivi():
+    with SuiviPrix(seuil_baisse=0.10, seuil_hausse=0.20) as suivi:
+        yield suivi
+
+
+def test_alertes_au_dela_des_seuils(suivi):
+    assert suivi.observer([releve(i, 100.0) for i in range(4)]) == []
+
+    alertes = suivi.observer([releve(0, 89.0),    # -11% : alerte
+                              releve(1, 91.0),    # -9% : sous le seuil
+                              releve(2, 125.0),   # +25% : alerte
+                              releve(3, 100.0)])  # inchangé
+    assert [(a.identite, a.type) for a in alertes] == [('https://site/0', 'baisse'),
+                                                       ('https://site/2', 'hausse')]
+    assert alertes[0].prix_precedent == 100.0 and alertes[0].prix == 89.0
+    assert alertes[0].variation == pytest.approx(-0.11)
+
+    # La comparaison suivante part du dernier prix connu
+    assert suivi.observer([releve(1, 81.0)])[0].prix_precedent == 91.0
+    assert suivi.prix(releve(1, 0)) == 81.0
+    assert [prix for _, prix in suivi.historique('https://site/1')] == [100.0, 91.0, 81.0]
+    assert [prix for _, prix in suivi.historique('https://site/3')] == [100.0]
+
+
+def test_prix_de_reference_initial(suivi):
+    produits = [dict(releve(0, 0), prix_reference=200.0),
+                {'nom': 'Sans URL', 'marque': 'M', 'source': 'site', 'prix_reference': 50}]
+    assert suivi.initialiser(produits) == 2
+    assert suivi.initialiser(produits) == 0
+    assert suivi.prix(identite(produits[1])) == 50.0
+
+    alertes = suivi.observer([releve(0, 150.0)])
+    assert [(a.prix_precedent, a.type) for a in alertes] == [(200.0, 'baisse')]
+
+
+def test_observer_depuis_un_autre_thread(suivi):
+    with ThreadPoolExecutor(4) as executeur:
+        list(executeur.map(lambda k: suivi.observer([releve(k * 50 + i, 10.0)
+                                                     for i in range(50)]), range(8)))
+        alertes = executeur.submit(suivi.observer, [releve(7, 5.0)]).result()
+    assert len(suivi) == 400
+    assert [a.type for a in alertes] == ['baisse']